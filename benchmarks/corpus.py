@@ -0,0 +1,73 @@
+import random
+
+SALUTATIONS = ["Mr.", "Mrs.", "Ms.", "Capt.", "Captain", "Skipper", "CPT", "Cap'n"]
+FIRST_NAMES = ["John", "Mary", "Bob", "Lee-Ann", "Travis", "Rosa", "Dale", "Kim"]
+LAST_NAMES = ["Smith", "Jones", "O'Neil", "Garza", "Nguyen", "Baker", "Reyes", "Cole"]
+FILLER = ["Fishing", "Redfish and trout", "Half day trips", "&amp;", "Book now", "Galveston Bay", "call or text"]
+CONTACT_LINKS = [
+    '<a href="/contact" title="Contact us">Contact</a>',
+    '<a href="contact-me.html"><span>Reach <em>us</em></span></a>',
+    '<a href="/about" title="Get in touch">About</a>',
+    '<a href="mailto:info@example.com">contact</a>',
+]
+
+
+def random_contact(rng):
+    return {
+        'phone': f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+        'email': f"{rng.choice(FIRST_NAMES).lower()}{rng.randint(0, 999)}@{rng.choice(['bayguides', 'coastcharters', 'redfishtx'])}.com",
+        'salutation': rng.choice(SALUTATIONS),
+        'first_name': rng.choice(FIRST_NAMES),
+        'last_name': rng.choice(LAST_NAMES),
+    }
+
+
+def random_inline(rng, depth=0):
+    parts = []
+    for _ in range(rng.randint(1, 3)):
+        roll = rng.random()
+        if roll < 0.15:
+            contact = random_contact(rng)
+            parts.append(f"{contact['salutation']} {contact['first_name']} {contact['last_name']} {contact['email']} {contact['phone']}")
+        elif roll < 0.3:
+            parts.append(random_contact(rng)['email'])
+        elif roll < 0.4:
+            parts.append("<b>Capt.</b> " + rng.choice(FIRST_NAMES) + " " + rng.choice(LAST_NAMES))
+        elif roll < 0.45:
+            parts.append("<script>var owner = 'x@y.com Capt. Hidden Person';</script>")
+        elif roll < 0.5:
+            parts.append("<!-- Capt. Hidden Person hidden@example.com -->")
+        elif roll < 0.6:
+            parts.append(rng.choice(CONTACT_LINKS))
+        elif roll < 0.7 and depth < 2:
+            parts.append(f"<span>{random_inline(rng, depth + 1)}</span>")
+        else:
+            parts.append(rng.choice(FILLER))
+    return " ".join(parts)
+
+
+def random_block(rng, depth=0, max_depth=5):
+    if depth >= max_depth or rng.random() < 0.3:
+        return f"<p>{random_inline(rng)}</p>" if rng.random() < 0.5 else random_inline(rng)
+    tag = rng.choice(['div', 'section', 'footer', 'article', 'header', 'aside', 'ul', 'table'])
+    if tag == 'ul':
+        items = "".join(f"<li>{random_block(rng, depth + 1, max_depth)}</li>" for _ in range(rng.randint(1, 3)))
+        return f"<ul>{items}</ul>"
+    if tag == 'table':
+        rows = "".join(
+            "<tr>" + "".join(f"<td>{random_block(rng, depth + 1, max_depth)}</td>" for _ in range(2)) + "</tr>"
+            for _ in range(rng.randint(1, 2))
+        )
+        return f"<table><tbody>{rows}</tbody></table>"
+    children = "".join(random_block(rng, depth + 1, max_depth) for _ in range(rng.randint(1, 4)))
+    return f"<{tag}>{children}</{tag}>"
+
+
+def random_page(rng, blocks=5, max_depth=5):
+    body = "".join(random_block(rng, max_depth=max_depth) for _ in range(rng.randint(1, blocks)))
+    return f"<!DOCTYPE html><html><head><title>Guide</title></head><body>{body}</body></html>"
+
+
+def random_corpus(size, seed=0, blocks=5, max_depth=5):
+    rng = random.Random(seed)
+    return [random_page(rng, blocks, max_depth) for _ in range(size)]
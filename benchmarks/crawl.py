@@ -0,0 +1,192 @@
+import argparse
+import datetime
+import functools
+import json
+import logging
+import os
+import subprocess
+import time
+
+from benchmarks.fixture_server import SITE_KINDS, build_fixture_sites, start_fixture_sites, stop_fixture_sites
+from src.async_engine import get_contact_info_from_urls_async
+from src.contact_information_web_scraper import (
+    URLProcessingManager,
+    fetch_page,
+    get_contact_info_from_urls,
+    get_contact_info_from_urls_pipelined,
+    timed_extract_page,
+)
+from src.data_processing import parse_page, proximity_based_extraction
+from src.metrics import metrics
+from src.near_duplicates import NearDuplicateIndex
+from src.page_memory import PageMemoryTracker, get_peak_rss_bytes, get_stream_threshold
+from src.web_interface import DriverPool, HttpClient, PageFetcher, robots_cache
+
+
+def get_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def phone_digits(phone):
+    return ''.join(character for character in phone if character.isdigit())
+
+
+def precision_recall(found, expected):
+    true_positives = len(found & expected)
+    return {
+        'found': len(found),
+        'expected': len(expected),
+        'precision': true_positives / len(found) if found else 1.0,
+        'recall': true_positives / len(expected) if expected else 1.0,
+    }
+
+
+def score_contacts(contacts, truth, render_javascript):
+    def is_expected(contact):
+        return contact.reachable and (render_javascript or contact.kind != 'js_rendered')
+
+    found_emails = {contact['email'].lower() for contact in contacts}
+    found_contacts = {
+        (contact['email'].lower(), contact['first_name'], contact['last_name'], phone_digits(contact['phone']))
+        for contact in contacts
+    }
+    expected = [contact for contact in truth if is_expected(contact)]
+    scores = {
+        'emails': precision_recall(found_emails, {contact.email for contact in expected}),
+        'contacts': precision_recall(
+            found_contacts,
+            {(contact.email, contact.first_name, contact.last_name, phone_digits(contact.phone)) for contact in expected},
+        ),
+        'recall_by_kind': {},
+        'unreachable_found': sorted(found_emails & {contact.email for contact in truth if not contact.reachable}),
+    }
+    for kind in sorted({contact.kind for contact in truth}):
+        kind_emails = {contact.email for contact in truth if contact.kind == kind}
+        scores['recall_by_kind'][kind] = len(found_emails & kind_emails) / len(kind_emails)
+    return scores
+
+
+def run_crawl(start_urls, args):
+    manager = URLProcessingManager(
+        start_urls,
+        max_per_host=args.max_per_host,
+        min_host_delay=args.min_host_delay,
+        crawl_delay_lookup=robots_cache.peek_crawl_delay,
+        max_depth=args.max_depth,
+        max_pages_per_host=args.max_pages_per_host,
+        max_pages=args.max_pages,
+        stop_on_complete_contact=args.stop_on_complete_contact,
+        duplicate_index=NearDuplicateIndex() if args.skip_near_duplicates else None,
+        memory_tracker=PageMemoryTracker(warn_bytes=args.worker_memory_budget),
+    )
+    driver_pool = DriverPool(args.workers) if args.render_javascript else None
+    http_client = HttpClient(timeout=args.timeout, pool_size=args.workers)
+    fetcher = PageFetcher(driver_pool, http_client, timeout=args.timeout, render_javascript=args.render_javascript)
+    stream_above = get_stream_threshold(args.worker_memory_budget, args.parser_backend)
+    start_time = time.perf_counter()
+    try:
+        if args.engine == 'asyncio':
+            contacts = get_contact_info_from_urls_async(
+                args.workers,
+                manager,
+                fetch=functools.partial(fetch_page, manager=manager, fetcher=fetcher),
+                parse=functools.partial(parse_page, parser_backend=args.parser_backend, prefilter=args.prefilter,
+                                        stream_above=stream_above),
+                extract=lambda page, url: proximity_based_extraction(page, url, manager),
+                extract_page=functools.partial(timed_extract_page, parser_backend=args.parser_backend, prefilter=args.prefilter,
+                                               stream_above=stream_above),
+                extract_workers=args.extract_workers,
+            )
+        elif args.extract_workers:
+            contacts = get_contact_info_from_urls_pipelined(
+                args.workers, args.extract_workers, manager, fetcher, args.parser_backend, prefilter=args.prefilter,
+                stream_above=stream_above,
+            )
+        else:
+            contacts = get_contact_info_from_urls(
+                args.workers, manager, fetcher, args.parser_backend, prefilter=args.prefilter, stream_above=stream_above
+            )
+    finally:
+        if driver_pool:
+            driver_pool.close()
+        http_client.close()
+    return manager, contacts, time.perf_counter() - start_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Crawl a local fixture corpus and report throughput, latency and extraction quality")
+    parser.add_argument('--sites', type=int, default=70)
+    parser.add_argument('--kinds', nargs='+', choices=SITE_KINDS, default=SITE_KINDS)
+    parser.add_argument('--engine', choices=['threads', 'asyncio'], default='threads')
+    parser.add_argument('--parser-backend', default='html.parser')
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--extract-workers', type=int, default=0, help="Extract processes, 0 parses in the fetch threads")
+    parser.add_argument('--max-per-host', type=int, default=2)
+    parser.add_argument('--min-host-delay', type=float, default=0.0)
+    parser.add_argument('--timeout', type=float, default=5.0, help="HTTP read timeout, hanging hosts sleep three times this")
+    parser.add_argument('--slow-delay', type=float, default=1.0)
+    parser.add_argument('--render-javascript', action='store_true', help="Escalate to Chrome, needs a local chromedriver")
+    parser.add_argument('--max-depth', type=int, default=None)
+    parser.add_argument('--max-pages-per-host', type=int, default=None)
+    parser.add_argument('--max-pages', type=int, default=None)
+    parser.add_argument('--stop-on-complete-contact', action='store_true')
+    parser.add_argument('--skip-near-duplicates', action='store_true')
+    parser.add_argument('--no-prefilter', dest='prefilter', action='store_false', help="Fully parse every page")
+    parser.add_argument('--worker-memory-budget', type=int, default=64 * 1024 * 1024,
+                        help="Bytes one page's parse may take before it is streamed instead, 0 never streams")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--metrics', action='store_true', help="Enable stage metrics and include a snapshot in the results")
+    parser.add_argument('--output', default=None, help="JSON results path, defaults to benchmarks/results/")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.ERROR)
+    metrics.enabled = args.metrics
+
+    sites, truth = build_fixture_sites(args.sites, args.seed, args.slow_delay, args.timeout * 3, args.kinds)
+    start_urls = start_fixture_sites(sites)
+    try:
+        manager, contacts, seconds = run_crawl(start_urls, args)
+    finally:
+        stop_fixture_sites(sites)
+
+    results = {
+        'commit': get_commit(),
+        'run_at': datetime.datetime.now().isoformat(timespec='seconds'),
+        'options': vars(args),
+        'pages': manager.processed_count,
+        'seconds': seconds,
+        'pages_per_second': manager.processed_count / seconds if seconds else 0.0,
+        'latency': manager.latency_stats(),
+        'peak_rss_mb': get_peak_rss_bytes() / 1024 ** 2 if get_peak_rss_bytes() is not None else None,
+        'tiers': dict(manager.tier_counts),
+        'frontier': {'dispatched': manager.dispatched_count, 'skipped': dict(manager.skipped)},
+        'prefilter': manager.prefilter_stats(),
+        'page_memory': dict(manager.memory_tracker.stats(), worst=manager.memory_tracker.worst_pages()),
+        'extraction': score_contacts(contacts, truth, args.render_javascript),
+    }
+    if manager.duplicate_index is not None:
+        duplicates = manager.duplicate_index.stats['duplicates']
+        results['near_duplicates'] = {
+            'skipped': duplicates,
+            'fingerprinted': manager.duplicate_index.count + duplicates,
+            'too_short': manager.duplicate_index.stats['too_short'],
+            'fingerprint_seconds': manager.duplicate_index.stats['fingerprint_seconds'],
+            'extract_seconds_saved': duplicates * manager.mean_latency('extract'),
+        }
+    if args.metrics:
+        results['metrics'] = metrics.snapshot()
+
+    output = args.output or os.path.join(
+        'benchmarks', 'results', f"crawl_{results['commit'] or 'unknown'}_{datetime.datetime.now():%Y%m%d_%H%M%S}.json"
+    )
+    os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+    with open(output, 'w') as file:
+        json.dump(results, file, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Saved to {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import collections
+import http.server
+import json
+import random
+import threading
+import time
+
+from benchmarks.corpus import FILLER, FIRST_NAMES, LAST_NAMES, SALUTATIONS
+
+SITE_KINDS = ['static', 'chain', 'deep', 'js', 'robots', 'slow', 'hanging', 'mirror']
+
+GroundTruth = collections.namedtuple('GroundTruth', ['email', 'salutation', 'first_name', 'last_name', 'phone', 'kind', 'reachable'])
+
+
+class FixtureSite:
+    def __init__(self, index, kind, pages, robots_txt='', delay=0.0):
+        self.index = index
+        self.kind = kind
+        self.pages = pages
+        self.robots_txt = robots_txt
+        self.delay = delay
+        self.server = None
+        self.thread = None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def make_handler(self):
+        site = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                if self.path == '/robots.txt':
+                    return self.respond(200, site.robots_txt, 'text/plain')
+                if site.delay:
+                    time.sleep(site.delay)
+                page = site.pages.get(self.path.split('?')[0])
+                if page is None:
+                    return self.respond(404, '<html><body>Not found</body></html>', 'text/html')
+                self.respond(200, page, 'text/html; charset=utf-8')
+
+            def respond(self, status, body, content_type):
+                encoded = body.encode('utf-8')
+                try:
+                    self.send_response(status)
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(encoded)))
+                    self.end_headers()
+                    self.wfile.write(encoded)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), self.make_handler())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name=f"fixture-site-{self.index}", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+class SiteBuilder:
+    def __init__(self, rng, index, kind):
+        self.rng = rng
+        self.index = index
+        self.kind = kind
+        self.truth = []
+
+    def contact(self, kind=None, reachable=True):
+        rng = self.rng
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        truth = GroundTruth(
+            email=f"{first_name.lower().replace('-', '')}{self.index}x{len(self.truth)}@site{self.index}guides.com",
+            salutation=rng.choice(SALUTATIONS),
+            first_name=first_name,
+            last_name=last_name,
+            phone=f"({rng.randint(200, 999)}) {rng.randint(200, 999)}-{rng.randint(1000, 9999)}",
+            kind=kind or self.kind,
+            reachable=reachable,
+        )
+        self.truth.append(truth)
+        return (
+            f"<div class=\"guide\"><p>{truth.salutation} {truth.first_name} {truth.last_name}</p>"
+            f"<p>Email: <a href=\"mailto:{truth.email}\">{truth.email}</a></p><p>Call {truth.phone}</p></div>"
+        )
+
+    def filler(self, paragraphs=3):
+        rng = self.rng
+        parts = [f"<p>{' '.join(rng.choice(FILLER) for _ in range(rng.randint(3, 12)))}</p>" for _ in range(paragraphs)]
+        # Decoys that must not be extracted
+        parts.append(f"<script>var owner = 'Capt. Hidden Person hidden{self.index}@decoy.com';</script>")
+        parts.append(f"<!-- Mr. Commented Out comment{self.index}@decoy.com -->")
+        return "".join(parts)
+
+    @staticmethod
+    def page(body, head=''):
+        return f"<!DOCTYPE html><html><head><title>Guide</title>{head}</head><body>{body}</body></html>"
+
+    def build(self, chain_depth=3, nesting_depth=100):
+        nav = '<nav><a href="/about">About</a> <a href="/contact" title="Contact us">Contact</a></nav>'
+        pages = {'/': self.page(nav + self.filler() + self.contact()), '/about': self.page(nav + self.filler(5))}
+        if self.kind == 'deep':
+            pages['/contact'] = self.page(
+                nav + '<div>' * nesting_depth + self.filler(1) + self.contact() + '</div>' * nesting_depth
+            )
+        elif self.kind == 'js':
+            # Contacts only exist once the script runs, the static HTML is an empty shell
+            rendered = json.dumps(self.contact(kind='js_rendered') + self.contact(kind='js_rendered'))
+            pages['/contact'] = self.page(
+                '<noscript>You need to enable JavaScript to run this app.</noscript><div id="root"></div>'
+                f"<script>document.getElementById('root').innerHTML = {rendered};</script>"
+            )
+        elif self.kind == 'mirror':
+            # The same contact page under a tracking parameter and as a print view, only the first should be extracted
+            body = self.filler(8) + self.contact() + self.contact()
+            pages['/contact'] = self.page(nav + body)
+            pages['/contact/print'] = self.page(body)
+            pages['/'] = pages['/'].replace('</nav>', ' <a href="/contact?utm_source=nav">Contact us today</a>'
+                                                      ' <a href="/contact/print">Contact sheet (print)</a></nav>')
+        else:
+            pages['/contact'] = self.page(nav + self.filler(1) + self.contact() + self.contact())
+
+        if self.kind == 'chain':
+            path = '/contact'
+            for depth in range(chain_depth):
+                next_path = f"{path}/team{depth}"
+                pages[path] = pages[path].replace('</body>', f'<a href="{next_path}">Get in touch with our team</a></body>')
+                pages[next_path] = self.page(self.filler(1) + self.contact())
+                path = next_path
+        elif self.kind == 'robots':
+            pages['/'] = pages['/'].replace('</nav>', ' <a href="/private/staff">Contact our staff</a></nav>')
+            pages['/private/staff'] = self.page(self.filler(1) + self.contact(kind='disallowed', reachable=False))
+        elif self.kind == 'hanging':
+            self.truth = [contact._replace(reachable=False) for contact in self.truth]
+        return pages
+
+
+def build_fixture_sites(num_sites, seed=0, slow_delay=1.0, hang_delay=60.0, kinds=None):
+    rng = random.Random(seed)
+    kinds = kinds or SITE_KINDS
+    sites, truth = [], []
+    for index in range(num_sites):
+        kind = kinds[index % len(kinds)]
+        builder = SiteBuilder(rng, index, kind)
+        pages = builder.build()
+        robots_txt = "User-agent: *\nDisallow: /private/\n" if kind == 'robots' else "User-agent: *\nDisallow:\n"
+        delay = {'slow': slow_delay, 'hanging': hang_delay}.get(kind, 0.0)
+        sites.append(FixtureSite(index, kind, pages, robots_txt, delay))
+        truth.extend(builder.truth)
+    return sites, truth
+
+
+def start_fixture_sites(sites):
+    for site in sites:
+        site.start()
+    return [f"{site.base_url}/" for site in sites]
+
+
+def stop_fixture_sites(sites):
+    for site in sites:
+        site.stop()
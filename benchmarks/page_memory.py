@@ -0,0 +1,52 @@
+import argparse
+import concurrent.futures
+import time
+
+from benchmarks.corpus import random_corpus
+from src.data_processing import extract_page
+from src.html_parser import get_available_backends
+
+
+def directory_page(num_listings, seed=0):
+    # One huge directory page: many listing pages' worth of blocks inside a single wrapper
+    return '<html><body><div id="directory">' + ''.join(random_corpus(num_listings, seed=seed, blocks=8)) + '</div></body></html>'
+
+
+def run_extract(num_listings, seed, parser_backend, stream):
+    # Runs in a fresh process so RSS growth belongs to this page alone
+    html_content = directory_page(num_listings, seed)
+    start_time = time.perf_counter()
+    contacts, links, mode, rss_growth = extract_page(
+        html_content, 'http://example.com/directory', parser_backend, False, 0 if stream else None
+    )
+    return len(html_content), mode, rss_growth, time.perf_counter() - start_time, contacts, links
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare memory and time of a full and a streamed parse of one huge page")
+    parser.add_argument('--listings', type=int, nargs='+', default=[100, 500, 1500])
+    parser.add_argument('--parser-backends', nargs='+', default=get_available_backends())
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    failed = False
+    for num_listings in args.listings:
+        results = {}
+        for parser_backend in args.parser_backends + ['stream']:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+                results[parser_backend] = executor.submit(
+                    run_extract, num_listings, args.seed, args.parser_backends[0] if parser_backend == 'stream' else parser_backend,
+                    parser_backend == 'stream',
+                ).result()
+        expected = results[args.parser_backends[0]][4:]
+        for name, (page_bytes, mode, rss_growth, seconds, contacts, links) in results.items():
+            matches = (contacts, links) == expected
+            failed = failed or not matches
+            growth = f"+{rss_growth / 1024 ** 2:7.1f} MB RSS" if rss_growth is not None else f"{'RSS n/a':>16}"
+            print(f"{page_bytes / 1024 ** 2:6.1f} MB page  {name:12} {growth}  {seconds:7.2f}s  "
+                  f"{len(contacts)} contacts, {len(links)} links{'' if matches else '  DIFFERS'}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import argparse
+import time
+
+from benchmarks.corpus import random_corpus
+from src.data_processing import find_contact_us_links, proximity_based_extraction
+from src.html_parser import get_available_backends, parse_html
+
+
+def extract_with_backend(html_content, url, backend):
+    start_time = time.perf_counter()
+    page = parse_html(html_content, backend)
+    parse_seconds = time.perf_counter() - start_time
+    links = find_contact_us_links(page, url)
+    contacts = proximity_based_extraction(page, url)
+    return contacts, links, parse_seconds
+
+
+def compare_parser_backends(pages, backends=None, reference='html.parser'):
+    backends = backends or get_available_backends()
+    report = {backend: {'parse_seconds': 0.0, 'mismatched_pages': []} for backend in backends}
+    for index, html_content in enumerate(pages):
+        url = f"http://example.com/page/{index}"
+        expected_contacts, expected_links, _ = extract_with_backend(html_content, url, reference)
+        for backend in backends:
+            contacts, links, parse_seconds = extract_with_backend(html_content, url, backend)
+            report[backend]['parse_seconds'] += parse_seconds
+            if contacts != expected_contacts or links != expected_links:
+                report[backend]['mismatched_pages'].append(index)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check contacts/link parity and parse time across HTML parser backends")
+    parser.add_argument('files', nargs='*', help="HTML files to compare, a synthetic corpus is used when omitted")
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    if args.files:
+        pages = []
+        for filepath in args.files:
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as file:
+                pages.append(file.read())
+    else:
+        pages = random_corpus(args.pages, seed=args.seed)
+
+    report = compare_parser_backends(pages)
+    failed = False
+    for backend, result in report.items():
+        mismatches = result['mismatched_pages']
+        failed = failed or bool(mismatches)
+        print(f"{backend:12} parse {result['parse_seconds'] * 1000 / len(pages):8.3f} ms/page, "
+              f"{len(mismatches)}/{len(pages)} pages differ from html.parser")
+        if mismatches:
+            print(f"{'':12} first mismatching pages: {mismatches[:10]}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import argparse
+import time
+
+from benchmarks.corpus import random_corpus
+from benchmarks.fixture_server import build_fixture_sites
+from src.data_processing import extract_page
+
+
+def timed_extract(html_content, url, parser_backend, prefilter):
+    start_time = time.perf_counter()
+    contacts, links, mode, _ = extract_page(html_content, url, parser_backend, prefilter)
+    return contacts, links, mode == 'links', time.perf_counter() - start_time
+
+
+def compare_prefilter(pages, parser_backend='html.parser'):
+    # Every page is extracted with and without the prefilter, any difference in contacts or links is a regression
+    report = {'pages': len(pages), 'links_only': 0, 'full_seconds': 0.0, 'prefilter_seconds': 0.0, 'mismatched_pages': []}
+    for index, html_content in enumerate(pages):
+        url = f"http://example.com/page/{index}"
+        expected_contacts, expected_links, _, full_seconds = timed_extract(html_content, url, parser_backend, False)
+        contacts, links, links_only, seconds = timed_extract(html_content, url, parser_backend, True)
+        report['full_seconds'] += full_seconds
+        report['prefilter_seconds'] += seconds
+        report['links_only'] += links_only
+        if contacts != expected_contacts or links != expected_links:
+            report['mismatched_pages'].append(index)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check the raw-HTML prefilter loses no contacts or links and report its skip ratio")
+    parser.add_argument('files', nargs='*', help="HTML files to check as well as the synthetic and fixture corpora")
+    parser.add_argument('--pages', type=int, default=500)
+    parser.add_argument('--sites', type=int, default=70)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--parser-backend', default='html.parser')
+    args = parser.parse_args()
+
+    corpora = {
+        'synthetic': random_corpus(args.pages, seed=args.seed),
+        'fixture': [page for site in build_fixture_sites(args.sites, args.seed)[0] for page in site.pages.values()],
+    }
+    if args.files:
+        corpora['files'] = []
+        for filepath in args.files:
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as file:
+                corpora['files'].append(file.read())
+
+    failed = False
+    for name, pages in corpora.items():
+        report = compare_prefilter(pages, args.parser_backend)
+        mismatches = report['mismatched_pages']
+        failed = failed or bool(mismatches)
+        print(f"{name:10} {report['links_only']}/{report['pages']} pages link-only ({report['links_only'] / report['pages']:.0%}), "
+              f"{report['full_seconds'] * 1000 / report['pages']:.3f} -> {report['prefilter_seconds'] * 1000 / report['pages']:.3f} ms/page, "
+              f"{len(mismatches)} pages differ")
+        if mismatches:
+            print(f"{'':10} first mismatching pages: {mismatches[:10]}")
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
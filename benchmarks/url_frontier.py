@@ -0,0 +1,85 @@
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+from src.contact_information_web_scraper import SharedURLProcessingManager, URLProcessingManager
+from src.frontier import SQLiteFrontier
+from src.url_cleaning import URLCleaner
+
+NAV_PATHS = ['/', '/about', '/contact', '/contact-us', '/team', '/rates', '/gallery', '/blog', '/faq', '/book-now']
+TRACKING = ['utm_source=nav', 'utm_medium=email&utm_campaign=spring', 'fbclid=IwAR0x', 'gclid=Cj0KCQ', 'sid=42']
+
+
+def random_pages(num_pages, num_hosts, links_per_page, seed=0):
+    # Each page links back to its site's navigation, plus a few deeper pages, some with tracking parameters
+    rng = random.Random(seed)
+    pages = []
+    for index in range(num_pages):
+        host = f"http://www.site{rng.randrange(num_hosts)}guides.com"
+        links = [(f"{host}{path}", 'Contact' if 'contact' in path else path.strip('/')) for path in NAV_PATHS]
+        for _ in range(links_per_page - len(links)):
+            url = f"{host}/trips/{rng.randrange(200)}"
+            if rng.random() < 0.3:
+                url += f"?{rng.choice(TRACKING)}"
+            links.append((url, 'Trip details'))
+        pages.append((f"{host}/page/{index}", links))
+    return pages
+
+
+def make_manager(frontier, cache_size, directory):
+    options = {'max_per_host': 2, 'min_host_delay': 0.0, 'url_cleaner': URLCleaner(cache_size=cache_size)}
+    if frontier == 'sqlite':
+        backend = SQLiteFrontier(os.path.join(directory, f"frontier_{time.perf_counter_ns()}.sqlite"), 'benchmark')
+        return SharedURLProcessingManager(backend, **options)
+    return URLProcessingManager([], **options)
+
+
+def run(pages, threads, batched, cache_size, frontier, directory):
+    manager = make_manager(frontier, cache_size, directory)
+
+    def add_pages(thread_pages):
+        for parent, links in thread_pages:
+            if batched:
+                manager.add_links(links, parent=parent)
+            else:
+                for url, anchor_text in links:
+                    manager.add_url(url, parent=parent, anchor_text=anchor_text)
+
+    workers = [threading.Thread(target=add_pages, args=(pages[index::threads],)) for index in range(threads)]
+    start_time = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    seconds = time.perf_counter() - start_time
+    queued = manager.total_count
+    if frontier == 'sqlite':
+        queued = manager.backend.counts()['queued']
+        manager.backend.close()
+    return sum(len(links) for _, links in pages) / seconds, queued
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure frontier adds per second from several threads at once")
+    parser.add_argument('--pages', type=int, default=2000)
+    parser.add_argument('--hosts', type=int, default=100)
+    parser.add_argument('--links-per-page', type=int, default=30)
+    parser.add_argument('--threads', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--frontier', choices=['local', 'sqlite'], default='local')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    pages = random_pages(args.pages, args.hosts, args.links_per_page, args.seed)
+    modes = [('per URL, no cache', False, 0), ('per URL, cached', False, 50000), ('per page, cached', True, 50000)]
+    with tempfile.TemporaryDirectory() as directory:
+        for threads in args.threads:
+            for name, batched, cache_size in modes:
+                adds_per_second, queued = run(pages, threads, batched, cache_size, args.frontier, directory)
+                print(f"{threads:3} threads  {name:18} {adds_per_second:10.0f} adds/s  {queued} URLs queued")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,167 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+
+from src.data_processing import create_extract_executor
+from src.metrics import metrics
+from src.page_memory import PageStats, measured
+from src.web_interface import AccessDeniedException, InvalidURLException
+
+
+class AsyncCrawlEngine:
+    def __init__(self, manager, fetch, parse, extract, concurrency=16, parse_workers=2, queue_size=None, sink=None,
+                 extract_page=None, extract_workers=0):
+        self.manager = manager
+        self.sink = sink
+        self.fetch = fetch
+        self.parse = parse
+        self.extract = extract
+        # A picklable (html, url) -> (contacts, links, page stats, stage seconds) function run in a process pool instead
+        # of parse and extract
+        self.extract_page = extract_page
+        self.extract_workers = extract_workers if extract_page else 0
+        self.concurrency = concurrency
+        self.parse_workers = parse_workers
+        self.queue_size = queue_size or concurrency
+        self.pending = 0
+        self.all_contacts = []
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        self.fetch_slots = asyncio.Semaphore(self.concurrency)
+        self.frontier_changed = asyncio.Event()
+        # Bounded queues between stages: a full queue stalls the stage in front of it
+        self.parse_queue = asyncio.Queue(maxsize=self.queue_size)
+        self.extract_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        if self.extract_workers:
+            cpu_executor = create_extract_executor(self.extract_workers)
+        else:
+            cpu_executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.parse_workers)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.concurrency) as fetch_executor, cpu_executor:
+            stage_tasks = []
+            if self.extract_workers:
+                logging.debug(f"Async engine started with {self.concurrency} fetches and {self.extract_workers} extract processes")
+                for _ in range(self.extract_workers):
+                    stage_tasks.append(asyncio.create_task(self.extract_page_stage(loop, cpu_executor)))
+            else:
+                logging.debug(f"Async engine started with {self.concurrency} fetches and {self.parse_workers} parse workers")
+                for _ in range(self.parse_workers):
+                    stage_tasks.append(asyncio.create_task(self.parse_stage(loop, cpu_executor)))
+                    stage_tasks.append(asyncio.create_task(self.extract_stage(loop, cpu_executor)))
+
+            fetch_tasks = set()
+            while True:
+                url = self.manager.get_next_url()
+                if url is None:
+                    if self.pending == 0 and not self.manager.has_queued():
+                        break
+                    # Wait for a finished URL, or for a cooling-down host to become available again
+                    self.frontier_changed.clear()
+                    try:
+                        await asyncio.wait_for(self.frontier_changed.wait(), self.manager.seconds_until_ready())
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                await self.fetch_slots.acquire()
+                self.pending += 1
+                task = asyncio.create_task(self.fetch_stage(loop, fetch_executor, url))
+                fetch_tasks.add(task)
+                task.add_done_callback(fetch_tasks.discard)
+
+            for task in stage_tasks:
+                task.cancel()
+            await asyncio.gather(*stage_tasks, return_exceptions=True)
+        return self.all_contacts
+
+    async def fetch_stage(self, loop, executor, url):
+        try:
+            html_content = await loop.run_in_executor(executor, self.fetch, url)
+            if html_content:
+                await self.parse_queue.put((url, html_content))
+            else:
+                self.finish(url)
+        except Exception as e:
+            self.finish(url, e)
+        finally:
+            self.fetch_slots.release()
+
+    async def parse_stage(self, loop, executor):
+        while True:
+            url, html_content = await self.parse_queue.get()
+            try:
+                page, seconds, rss_growth = await loop.run_in_executor(executor, measured, self.parse, html_content)
+                await self.extract_queue.put((url, page, PageStats(page.mode, seconds, len(html_content), rss_growth)))
+            except Exception as e:
+                self.finish(url, e)
+
+    async def extract_stage(self, loop, executor):
+        while True:
+            url, page, page_stats = await self.extract_queue.get()
+            try:
+                contacts, seconds = await loop.run_in_executor(executor, self.timed, self.extract, page, url)
+                self.manager.record_page(url, page_stats._replace(seconds=page_stats.seconds + seconds))
+                await self.record_contacts(loop, url, contacts)
+                self.finish(url)
+            except Exception as e:
+                self.finish(url, e)
+
+    async def extract_page_stage(self, loop, executor):
+        while True:
+            url, html_content = await self.parse_queue.get()
+            try:
+                contacts, links, page_stats, stage_seconds = await loop.run_in_executor(
+                    executor, self.extract_page, html_content, url
+                )
+                metrics.observe_stages(stage_seconds)
+                self.manager.record_page(url, page_stats)
+                self.manager.add_links(links, parent=url)
+                await self.record_contacts(loop, url, contacts)
+                self.finish(url)
+            except Exception as e:
+                self.finish(url, e)
+
+    async def record_contacts(self, loop, url, contacts):
+        self.manager.record_contacts(url, contacts)
+        if contacts:
+            metrics.inc('contacts_found_total', len(contacts))
+            if self.sink:
+                await loop.run_in_executor(None, self.sink.write, contacts)
+            else:
+                self.all_contacts.extend(contacts)
+            logging.debug(f"Added contacts: {url}")
+        else:
+            logging.debug(f"No contacts found: {url}")
+
+    @staticmethod
+    def timed(function, *args):
+        start_time = time.perf_counter()
+        result = function(*args)
+        return result, time.perf_counter() - start_time
+
+    def finish(self, url, error=None):
+        if error is not None:
+            metrics.count_error('process_url', error)
+        if isinstance(error, (InvalidURLException, AccessDeniedException)):
+            logging.debug(error)
+        elif isinstance(error, asyncio.TimeoutError):
+            logging.warning(f"Timeout occurred processing: {url}")
+        elif error is not None:
+            logging.warning(f"Error retrieving result: {url}: {str(error)}")
+        self.manager.increment_processed(url)
+        self.pending -= 1
+        self.frontier_changed.set()
+
+
+def get_contact_info_from_urls_async(workers, manager, fetch, parse, extract, parse_workers=2, sink=None,
+                                     extract_page=None, extract_workers=0, queue_size=None):
+    engine = AsyncCrawlEngine(
+        manager, fetch, parse, extract, concurrency=workers, parse_workers=parse_workers, queue_size=queue_size, sink=sink,
+        extract_page=extract_page, extract_workers=extract_workers,
+    )
+    try:
+        asyncio.run(engine.run())
+    except Exception as e:
+        logging.critical(f"Function get_contact_info_from_urls_async failure! {e}")
+    return engine.all_contacts
@@ -0,0 +1,70 @@
+import gzip
+import json
+import logging
+import os
+import threading
+import time
+
+
+def write_checkpoint(filepath, state):
+    temp_filepath = f"{filepath}.tmp"
+    with gzip.open(temp_filepath, 'wt', encoding='utf-8') as file:
+        json.dump(state, file)
+        file.flush()
+        os.fsync(file.fileno())
+    # The rename is atomic, so a crash mid-write leaves the previous checkpoint intact
+    os.replace(temp_filepath, filepath)
+
+
+def load_checkpoint(filepath):
+    if not os.path.exists(filepath):
+        logging.warning(f"No checkpoint to resume from at {filepath}")
+        return None
+    try:
+        with gzip.open(filepath, 'rt', encoding='utf-8') as file:
+            state = json.load(file)
+        logging.info(f"Loaded checkpoint from {filepath}, written {time.ctime(state['written_at'])}")
+        return state
+    except Exception as e:
+        logging.critical(f"Loading checkpoint {filepath} failed with error: {e}")
+        return None
+
+
+class Checkpointer:
+    def __init__(self, filepath, manager, extra_state=None, interval=60):
+        self.filepath = filepath
+        self.manager = manager
+        self.extra_state = extra_state or {}
+        self.interval = interval
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.write_count = 0
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="checkpointer", daemon=True)
+        self.thread.start()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.checkpoint()
+
+    def checkpoint(self):
+        # The manager only holds its lock while copying its state, serialising and writing happen here
+        try:
+            state = dict(self.extra_state, manager=self.manager.snapshot(), written_at=time.time())
+            write_checkpoint(self.filepath, state)
+            self.write_count += 1
+            logging.debug(f"Checkpoint {self.write_count} written to {self.filepath}")
+        except Exception as e:
+            logging.warning(f"Writing checkpoint failed with error: {e}")
+
+    def stop(self, completed=False):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        if completed:
+            if os.path.exists(self.filepath):
+                os.remove(self.filepath)
+            logging.info(f"Crawl completed, removed checkpoint {self.filepath}")
+        else:
+            self.checkpoint()
@@ -0,0 +1,208 @@
+import logging
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+from src.contact_store import CONTACT_COLUMNS, count_filled_fields
+
+
+class ContactIndex:
+    # Contacts and crawled URLs kept across runs, so a new run can skip pages crawled recently and report only what
+    # changed. A contact is found by its standardized email and by its phone, both keys lead to one record, so one
+    # first seen without an email joins it once it shows up with one; each remembers when every source page first
+    # and last showed it
+    def __init__(self, filepath, crawl_flush_size=500):
+        self.filepath = filepath
+        self.crawl_flush_size = crawl_flush_size
+        self.lock = threading.Lock()
+        self.pending_crawls = {}
+        self.connection = sqlite3.connect(filepath, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = ', '.join(f"{column} TEXT NOT NULL DEFAULT ''" for column in CONTACT_COLUMNS)
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS index_contacts (key TEXT PRIMARY KEY, {columns}, completeness INTEGER, "
+                f"first_seen REAL, last_seen REAL, updated_at REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS index_contacts_phone ON index_contacts (phone)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS index_contacts_updated ON index_contacts (updated_at)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS contact_sources (key TEXT, source TEXT, first_seen REAL, last_seen REAL, "
+                "PRIMARY KEY (key, source))"
+            )
+            # Records are named by the key they were first stored under, indexes from before this table get both keys
+            self.connection.execute("CREATE TABLE IF NOT EXISTS contact_keys (key TEXT PRIMARY KEY, record TEXT)")
+            self.connection.execute("INSERT OR IGNORE INTO contact_keys (key, record) SELECT key, key FROM index_contacts")
+            self.connection.execute(
+                "INSERT OR IGNORE INTO contact_keys (key, record) SELECT 'phone:' || phone, key FROM index_contacts "
+                "WHERE phone != ''"
+            )
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS crawled_urls (url TEXT PRIMARY KEY, last_crawled REAL, contacts INTEGER)"
+            )
+
+    @staticmethod
+    def get_keys(contact):
+        keys = [contact['email']] if contact['email'] else []
+        return keys + [f"phone:{contact['phone']}"] if contact['phone'] else keys
+
+    def find_record(self, contact):
+        # Called with lock held. Returns the contact's record and a phone-only record to fold into it. The phone only
+        # leads to a record without an email, or from a row without one, so two people sharing an office phone stay apart
+        email_record = self.get_record(contact['email']) if contact['email'] else None
+        phone_record = self.get_record(f"phone:{contact['phone']}") if contact['phone'] else None
+        if phone_record is not None and contact['email'] and self.get_stored(phone_record)['email']:
+            phone_record = None
+        if email_record is None or phone_record in (None, email_record):
+            return email_record or phone_record, None
+        return email_record, phone_record
+
+    def get_record(self, key):
+        row = self.connection.execute("SELECT record FROM contact_keys WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def get_stored(self, record):
+        row = self.connection.execute(
+            "SELECT email, phone, completeness FROM index_contacts WHERE key = ?", (record,)
+        ).fetchone()
+        return {'email': row[0], 'phone': row[1], 'completeness': row[2]}
+
+    def fold(self, record, other):
+        # Called with lock held. The phone-only record other becomes part of record, keeping its sources and first_seen
+        self.connection.execute("UPDATE OR IGNORE contact_sources SET key = ? WHERE key = ?", (record, other))
+        self.connection.execute("DELETE FROM contact_sources WHERE key = ?", (other,))
+        self.connection.execute("UPDATE contact_keys SET record = ? WHERE record = ?", (record, other))
+        self.connection.execute(
+            "UPDATE index_contacts SET first_seen = MIN(first_seen, (SELECT first_seen FROM index_contacts WHERE key = ?)) "
+            "WHERE key = ?",
+            (other, record),
+        )
+        self.connection.execute("DELETE FROM index_contacts WHERE key = ?", (other,))
+
+    def get_recent_urls(self, max_age):
+        # URLs crawled within max_age seconds, loaded once so the frontier checks them without touching the database
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT url FROM crawled_urls WHERE last_crawled >= ?", (time.time() - max_age,)
+            ).fetchall()
+        return {url for url, in rows}
+
+    def record_crawl(self, url, contacts=0):
+        # Buffered and written in batches, this runs once per page from the worker threads
+        with self.lock:
+            self.pending_crawls[url] = (time.time(), contacts)
+            if len(self.pending_crawls) < self.crawl_flush_size:
+                return
+            self.flush_crawls()
+
+    def flush(self):
+        with self.lock:
+            self.flush_crawls()
+
+    def flush_crawls(self):
+        # Called with lock held
+        if not self.pending_crawls:
+            return
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO crawled_urls (url, last_crawled, contacts) VALUES (?, ?, ?)",
+                [(url, crawled_at, contacts) for url, (crawled_at, contacts) in self.pending_crawls.items()],
+            )
+        self.pending_crawls.clear()
+
+    def merge(self, contact_info, seen_at=None):
+        # contact_info holds this run's cleaned contacts, one row per source. A stored contact is only replaced by a more
+        # complete row and ties keep the one seen first, ranked by count_filled_fields as cleaning ranks within a run.
+        # Rows read back from the contact store bring the completeness it computed before NaN became ''
+        seen_at = seen_at or time.time()
+        stats = {'new': 0, 'updated': 0, 'unchanged': 0}
+        if contact_info is None or contact_info.empty:
+            return stats
+        if 'completeness' in contact_info:
+            completeness = contact_info['completeness']
+        else:
+            completeness = count_filled_fields(contact_info[CONTACT_COLUMNS])
+        rows = contact_info[CONTACT_COLUMNS].fillna('').astype(str).assign(completeness=completeness)
+        rows = rows.sort_values('completeness', ascending=False, kind='stable')
+        placeholders = ', '.join('?' * (len(CONTACT_COLUMNS) + 5))
+        assignments = ', '.join(f"{column} = ?" for column in CONTACT_COLUMNS)
+        with self.lock, self.connection:
+            merged_records = set()
+            for contact in rows.to_dict('records'):
+                keys = self.get_keys(contact)
+                if not keys:
+                    continue
+                record, other = self.find_record(contact)
+                if other is not None:
+                    self.fold(record, other)
+                values = [contact[column] for column in CONTACT_COLUMNS]
+                if record is None:
+                    record = keys[0]
+                    self.connection.execute(
+                        f"INSERT INTO index_contacts (key, {', '.join(CONTACT_COLUMNS)}, completeness, first_seen, last_seen, "
+                        f"updated_at) VALUES ({placeholders})",
+                        [record] + values + [contact['completeness'], seen_at, seen_at, seen_at],
+                    )
+                    stats['new'] += 1
+                else:
+                    stored = self.get_stored(record)
+                    # The record's email and phone are kept, and a row that brings one the record lacks fills it in
+                    identity = {column: contact[column] or stored[column] for column in ('email', 'phone')}
+                    added = sum(bool(identity[column] and not stored[column]) for column in identity)
+                    # Rows come most complete first, the rest of this run's rows for a record only add sources and keys
+                    if record not in merged_records and contact['completeness'] > stored['completeness']:
+                        values = [identity.get(column, contact[column]) for column in CONTACT_COLUMNS]
+                        kept = sum(bool(stored[column] and not contact[column]) for column in identity)
+                        self.connection.execute(
+                            f"UPDATE index_contacts SET {assignments}, completeness = ?, last_seen = ?, updated_at = ? WHERE key = ?",
+                            values + [contact['completeness'] + kept, seen_at, seen_at, record],
+                        )
+                        stats['updated'] += 1
+                    elif added:
+                        self.connection.execute(
+                            "UPDATE index_contacts SET email = ?, phone = ?, completeness = completeness + ?, last_seen = ?, "
+                            "updated_at = ? WHERE key = ?",
+                            (identity['email'], identity['phone'], added, seen_at, seen_at, record),
+                        )
+                        if record not in merged_records:
+                            stats['updated'] += 1
+                    elif record not in merged_records:
+                        self.connection.execute("UPDATE index_contacts SET last_seen = ? WHERE key = ?", (seen_at, record))
+                        stats['unchanged'] += 1
+                merged_records.add(record)
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO contact_keys (key, record) VALUES (?, ?)", [(key, record) for key in keys]
+                )
+                self.connection.execute(
+                    "INSERT INTO contact_sources (key, source, first_seen, last_seen) VALUES (?, ?, ?, ?) "
+                    "ON CONFLICT (key, source) DO UPDATE SET last_seen = excluded.last_seen",
+                    (record, contact['source'], seen_at, seen_at),
+                )
+        logging.info(f"Contact index: {stats['new']} new, {stats['updated']} more complete, {stats['unchanged']} already known")
+        return stats
+
+    def read_contacts(self, since=None):
+        # The full merged set, or with since only contacts added or made more complete from then on
+        query = (
+            f"SELECT {', '.join(CONTACT_COLUMNS)}, first_seen, last_seen FROM index_contacts "
+            f"{'WHERE updated_at >= ? ' if since is not None else ''}ORDER BY completeness DESC, first_seen"
+        )
+        with self.lock:
+            contacts = pd.read_sql_query(query, self.connection, params=(since,) if since is not None else None)
+        for column in ('first_seen', 'last_seen'):
+            contacts[column] = pd.to_datetime(contacts[column], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S')
+        return contacts
+
+    def stats(self):
+        with self.lock:
+            contacts = self.connection.execute("SELECT COUNT(*) FROM index_contacts").fetchone()[0]
+            urls = self.connection.execute("SELECT COUNT(*) FROM crawled_urls").fetchone()[0]
+        return {'contacts': contacts, 'crawled_urls': urls}
+
+    def close(self):
+        with self.lock:
+            self.flush_crawls()
+            self.connection.close()
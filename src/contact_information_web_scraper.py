@@ -1,75 +1,460 @@
 import collections
 import concurrent.futures
+import csv
+import functools
+import heapq
 import logging
 import os
+import re
 import threading
+import time
 from datetime import datetime
-from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
-from url_normalize import url_normalize
+from src.async_engine import get_contact_info_from_urls_async
+from src.checkpoint import Checkpointer, load_checkpoint
+from src.contact_index import ContactIndex
+from src.contact_store import ContactSink
+from src.data_processing import (
+    CONTACT_LINK_PATTERN,
+    clean_contact_store,
+    configure_email_validation,
+    create_extract_executor,
+    find_contact_us_links,
+    parse_page,
+    proximity_based_extraction,
+    save_to_csv,
+)
+from src.frontier import SQLiteFrontier, get_worker_id
+from src.metrics import MetricsReporter, Reservoir, metrics
+from src.near_duplicates import NearDuplicateIndex
+from src.page_cache import PageCache
+from src.page_memory import PageMemoryTracker, PageStats, get_stream_threshold, measured
+from src.search_producer import SearchProducer, SearchResultCache
+from src.seen_set import ExactSeenSet, create_seen_set, load_seen_set
+from src.url_cleaning import TRACKING_PARAMETERS, URLCleaner
+from src.web_interface import (
+    BLOCKED_URL_PATTERNS,
+    AccessDeniedException,
+    DriverPool,
+    HostTimeouts,
+    HttpClient,
+    InvalidURLException,
+    PageFetcher,
+    robots_cache,
+)
 
-from src.data_processing import clean_contact_information, proximity_based_extraction, save_to_csv
-from src.web_interface import AccessDeniedException, InvalidURLException, fetch_html, get_gigablast_search_results
+
+CONTACT_PATH_PATTERN = re.compile(r'contact|reach|get-in-touch|book')
+ABOUT_PATH_PATTERN = re.compile(r'about|team|staff|captain|guide|crew|people')
+COMPLETE_CONTACT_KEYS = ('phone', 'email', 'first_name', 'last_name')
+PRODUCER_POLL_SECONDS = 0.2
+# Wait after a lease comes back empty, doubling up to the maximum while the shared queue stays empty
+MIN_LEASE_BACKOFF_SECONDS = 0.05
+MAX_LEASE_BACKOFF_SECONDS = 2.0
+# Latency stage each parse mode is timed under
+PAGE_STAGES = {'full': 'extract', 'links': 'links', 'stream': 'stream'}
 
 
 class URLProcessingManager:
-    def __init__(self, initial_urls):
-        self.url_queue = collections.deque()
-        self.all_urls = set()
+    def __init__(self, initial_urls, max_per_host=2, min_host_delay=1.0, crawl_delay_lookup=None, seen_set=None,
+                 max_depth=None, max_pages_per_host=None, max_pages=None, stop_on_complete_contact=False,
+                 duplicate_index=None, url_cleaner=None, recently_crawled=None, contact_index=None,
+                 memory_tracker=None):
+        # One priority queue per host, hosts served round-robin so a single site cannot take every worker
+        self.host_queues = collections.OrderedDict()
+        self.host_active = collections.Counter()
+        self.host_next_time = {}
+        self.host_dispatched = collections.Counter()
+        self.host_first_dispatch = {}
+        self.max_per_host = max_per_host
+        self.min_host_delay = min_host_delay
+        self.crawl_delay_lookup = crawl_delay_lookup
+        self.max_depth = max_depth
+        self.max_pages_per_host = max_pages_per_host
+        self.max_pages = max_pages
+        self.stop_on_complete_contact = stop_on_complete_contact
+        self.duplicate_index = duplicate_index
+        self.url_cleaner = url_cleaner or URLCleaner()
+        # URLs an earlier run crawled recently are not fetched again, and every page crawled now is recorded
+        self.recently_crawled = recently_crawled if recently_crawled is not None else set()
+        self.contact_index = contact_index
+        self.memory_tracker = memory_tracker or PageMemoryTracker()
+        self.url_depths = {}
+        self.contact_hosts = set()
+        self.complete_hosts = set()
+        self.skipped = collections.Counter()
+        self.push_count = 0
+        self.dispatched_count = 0
+        self.queued_count = 0
+        self.all_urls = seen_set if seen_set is not None else ExactSeenSet()
+        self.in_flight = set()
         self.total_count = 0
         self.processed_count = 0
+        self.url_tiers = {}
+        self.tier_counts = collections.Counter()
+        self.latencies = collections.defaultdict(Reservoir)
+        self.producers = []
         self.count_lock = threading.Lock()
 
-        for url in initial_urls: self.add_url(url)
+        self.add_urls(initial_urls)
 
-    def clean_url(self, url):
-        try:
-            normalized_url = url_normalize(url)
-            parsed_url = urlparse(normalized_url)
-            query_params = parse_qs(parsed_url.query)
-            query_params.pop('sid', None)
-            new_query = urlencode(query_params, doseq=True)
-            cleaned_url = urlunparse((
-                parsed_url.scheme,
-                parsed_url.netloc,
-                parsed_url.path,
-                parsed_url.params,
-                new_query,
-                parsed_url.fragment
-            ))
-        except Exception as e:
-            raise e
-        return cleaned_url
+    @classmethod
+    def from_checkpoint(cls, state, **kwargs):
+        manager = cls([], **kwargs)
+        manager.all_urls = load_seen_set(state['all_urls'])
+        for entry in state['url_queue']:
+            # Checkpoints written before the frontier was prioritised stored bare URLs
+            url, score, depth = (entry, 0.0, 0) if isinstance(entry, str) else entry
+            manager.enqueue(url, score, depth)
+        # URLs that were in flight when the checkpoint was taken go back to the front of their host queue, once
+        for url in state['in_flight']:
+            manager.enqueue(url, depth=state.get('url_depths', {}).get(url, 0), front=True)
+        manager.total_count = state['total_count']
+        manager.processed_count = state['processed_count']
+        manager.dispatched_count = state.get('dispatched_count', manager.processed_count)
+        manager.host_dispatched.update(state.get('host_dispatched', {}))
+        manager.contact_hosts.update(state.get('contact_hosts', []))
+        manager.complete_hosts.update(state.get('complete_hosts', []))
+        if manager.duplicate_index is not None:
+            manager.duplicate_index.load_state(state.get('fingerprints', []))
+        logging.info(f"Resumed at {manager.processed_count}/{manager.total_count} URLs, "
+                     f"{len(state['in_flight'])} re-queued from in flight, {manager.queued_count} queued")
+        return manager
 
-    def add_url(self, url):
+    def snapshot(self):
+        # Producers first: a query they report finished has already added its URLs, so the queue below holds them
+        producers = [producer.snapshot() for producer in self.producers]
         with self.count_lock:
+            return {
+                'producers': producers,
+                'url_queue': [
+                    [url, -negative_score, self.url_depths.get(url, 0)]
+                    for host_queue in self.host_queues.values() for negative_score, _, url in host_queue
+                ],
+                'url_depths': {url: self.url_depths.get(url, 0) for url in self.in_flight},
+                'all_urls': self.all_urls.to_state(),
+                'in_flight': list(self.in_flight),
+                'total_count': self.total_count,
+                'processed_count': self.processed_count,
+                'dispatched_count': self.dispatched_count,
+                'host_dispatched': dict(self.host_dispatched),
+                'contact_hosts': list(self.contact_hosts),
+                'complete_hosts': list(self.complete_hosts),
+                'fingerprints': self.duplicate_index.to_state() if self.duplicate_index is not None else [],
+            }
+
+    def clean_url(self, url):
+        return self.url_cleaner.clean(url)
+
+    @staticmethod
+    def get_host(url):
+        return urlparse(url).netloc.lower()
+
+    @staticmethod
+    def score_link(url, anchor_text):
+        # The part of a URL's score that depends only on the link itself, worked out before taking count_lock
+        score = 0.0
+        if anchor_text and CONTACT_LINK_PATTERN.search(anchor_text):
+            score += 3
+        path = urlparse(url).path.lower()
+        if CONTACT_PATH_PATTERN.search(path):
+            score += 3
+        elif ABOUT_PATH_PATTERN.search(path):
+            score += 1.5
+        return score
+
+    def score_url(self, host, link_score, depth):
+        # Called with count_lock held. Higher is fetched sooner: likely contact pages first, deep pages and sites that
+        # already gave a contact last
+        score = link_score - float(depth)
+        if host in self.contact_hosts:
+            score -= 2
+        return score
+
+    def enqueue(self, url, score=0.0, depth=0, front=False):
+        host_queue = self.host_queues.get(self.get_host(url))
+        if host_queue is None:
+            host_queue = self.host_queues[self.get_host(url)] = []
+        # Heap of (-score, insertion order, url): best score first, FIFO among equal scores
+        self.push_count += 1
+        heapq.heappush(host_queue, (-float('inf') if front else -score, self.push_count, url))
+        self.url_depths[url] = depth
+        self.queued_count += 1
+
+    def add_url(self, url, parent=None, anchor_text=''):
+        self.add_links([(url, anchor_text)], parent)
+
+    def add_urls(self, urls, parent=None):
+        self.add_links([(url, '') for url in urls], parent)
+
+    def add_links(self, links, parent=None):
+        # (url, anchor_text) pairs, usually every link found on one page. Cleaning and scoring happen before
+        # count_lock is taken, then the whole batch goes into the frontier under a single acquisition
+        candidates = []
+        for url, anchor_text in links:
             try:
                 normal_url = self.clean_url(url)
-                if normal_url not in self.all_urls:
-                    self.url_queue.append(normal_url)
-                    self.all_urls.add(normal_url)
-                    self.total_count += 1
-                    logging.debug(f"Added: {url}")
-                    if url != normal_url:
-                        logging.debug(f"Cleaned URL\nBefore cleaning: {url}\nAfter  cleaning: {normal_url}")
-                else:
-                    logging.debug(f"Did not add, already added: {normal_url}")
+                candidates.append((url, normal_url, self.get_host(normal_url), self.score_link(normal_url, anchor_text)))
             except Exception as e:
                 logging.warning(f"Failed to add: {url}, because of {e}")
+        if not candidates:
+            return
+
+        outcomes = []
+        with self.count_lock:
+            depth = self.url_depths.get(parent, 0) + 1 if parent else 0
+            entries = []
+            for url, normal_url, host, link_score in candidates:
+                if normal_url in self.recently_crawled:
+                    reason = 'recently_crawled'
+                elif self.max_depth is not None and depth > self.max_depth:
+                    reason = 'max_depth'
+                elif host in self.complete_hosts:
+                    reason = 'complete_host'
+                elif self.max_pages_per_host is not None and self.host_dispatched[host] >= self.max_pages_per_host:
+                    reason = 'max_pages_per_host'
+                else:
+                    entries.append((url, normal_url, self.score_url(host, link_score, depth)))
+                    continue
+                self.skipped[reason] += 1
+                outcomes.append((url, normal_url, reason))
+            try:
+                added = self.push_many([(normal_url, score, depth) for _, normal_url, score in entries])
+                outcomes.extend(
+                    (url, normal_url, 'added' if was_added else 'seen') for (url, normal_url, _), was_added in zip(entries, added)
+                )
+            except Exception as e:
+                logging.warning(f"Failed to add {len(entries)} URLs, because of {e}")
+
+        # Logged once the lock is released, formatting these messages is string work too
+        for url, normal_url, outcome in outcomes:
+            if outcome == 'added':
+                logging.debug(f"Added: {url}")
+                if url != normal_url:
+                    logging.debug(f"Cleaned URL\nBefore cleaning: {url}\nAfter  cleaning: {normal_url}")
+            elif outcome == 'seen':
+                logging.debug(f"Did not add, already added: {normal_url}")
+            elif outcome == 'max_depth':
+                logging.debug(f"Did not add, deeper than {self.max_depth}: {normal_url}")
+            elif outcome == 'complete_host':
+                logging.debug(f"Did not add, site already gave a complete contact: {normal_url}")
+            elif outcome == 'recently_crawled':
+                logging.debug(f"Did not add, crawled by a recent run: {normal_url}")
+            else:
+                logging.debug(f"Did not add, page budget for {self.get_host(normal_url)} spent: {normal_url}")
+
+    def push(self, url, score, depth):
+        # Called with count_lock held; False when the URL was seen before
+        if not self.all_urls.add(url):
+            return False
+        self.enqueue(url, score, depth)
+        self.total_count += 1
+        return True
+
+    def push_many(self, entries):
+        # Called with count_lock held; entries are (url, score, depth), returns whether each one was new
+        return [self.push(url, score, depth) for url, score, depth in entries]
+
+    def run_task(self, name, start):
+        # start() begins a one-off job such as the search; a shared frontier runs it on one worker only
+        return start()
+
+    def add_producer(self, producer):
+        # Anything with is_running() that keeps adding URLs, the crawl waits for it before finishing
+        self.producers.append(producer)
+
+    def is_producing(self):
+        return any(producer.is_running() for producer in self.producers)
+
+    def drop_host_queue(self, host, reason):
+        # Called with count_lock held
+        host_queue = self.host_queues.pop(host, None)
+        if host_queue:
+            self.queued_count -= len(host_queue)
+            self.skipped[reason] += len(host_queue)
+            for _, _, url in host_queue:
+                self.url_depths.pop(url, None)
+            logging.debug(f"Dropped {len(host_queue)} queued URLs for {host}: {reason}")
+
+    def record_contacts(self, url, contacts):
+        if self.contact_index is not None:
+            self.contact_index.record_crawl(url, len(contacts))
+        if not contacts:
+            return
+        host = self.get_host(url)
+        complete = any(all(contact.get(key) for key in COMPLETE_CONTACT_KEYS) for contact in contacts)
+        with self.count_lock:
+            self.contact_hosts.add(host)
+            if complete and self.stop_on_complete_contact and host not in self.complete_hosts:
+                self.complete_hosts.add(host)
+                self.drop_host_queue(host, 'complete_host')
+
+    def get_host_delay(self, host):
+        crawl_delay = self.crawl_delay_lookup(host) if self.crawl_delay_lookup else 0
+        return max(self.min_host_delay, crawl_delay or 0)
+
+    def has_queued(self):
+        # URLs still to come from a running producer count as queued, so crawl loops wait for them
+        return self.queued_count > 0 or self.is_producing()
 
     def get_next_url(self):
+        # Returns None when nothing is queued or every host with queued URLs is busy or cooling down
         with self.count_lock:
-            if self.url_queue:
-                return self.url_queue.popleft()
-            return None
+            if self.max_pages is not None and self.dispatched_count >= self.max_pages:
+                for host in list(self.host_queues):
+                    self.drop_host_queue(host, 'max_pages')
+                return None
+            now = time.time()
+            # The host with the best queued URL wins, ties go to the host that has waited longest
+            best_host = None
+            for host, host_queue in self.host_queues.items():
+                if self.host_active[host] >= self.max_per_host or self.host_next_time.get(host, 0) > now:
+                    continue
+                if best_host is None or host_queue[0][0] < self.host_queues[best_host][0][0]:
+                    best_host = host
+            if best_host is None:
+                return None
+            host, host_queue = best_host, self.host_queues[best_host]
+            _, _, url = heapq.heappop(host_queue)
+            self.queued_count -= 1
+            self.dispatched_count += 1
+            self.host_active[host] += 1
+            self.host_dispatched[host] += 1
+            self.host_first_dispatch.setdefault(host, now)
+            self.host_next_time[host] = now + self.get_host_delay(host)
+            if not host_queue:
+                del self.host_queues[host]
+            elif self.max_pages_per_host is not None and self.host_dispatched[host] >= self.max_pages_per_host:
+                self.drop_host_queue(host, 'max_pages_per_host')
+            else:
+                self.host_queues.move_to_end(host)
+            self.in_flight.add(url)
+            return url
 
-    def increment_processed(self):
+    def seconds_until_ready(self):
+        # How long until a cooling-down host can be served again, or until a producer may have added URLs;
+        # None if only busy hosts have queued URLs
         with self.count_lock:
+            now = time.time()
+            waits = [
+                self.host_next_time.get(host, 0) - now
+                for host, host_queue in self.host_queues.items()
+                if host_queue and self.host_active[host] < self.max_per_host
+            ]
+        if waits:
+            return max(min(waits), 0.01)
+        return PRODUCER_POLL_SECONDS if self.is_producing() else None
+
+    def host_stats(self):
+        with self.count_lock:
+            now = time.time()
+            stats = {}
+            for host in set(self.host_queues) | set(self.host_dispatched):
+                elapsed = now - self.host_first_dispatch.get(host, now)
+                stats[host] = {
+                    'queued': len(self.host_queues.get(host, ())),
+                    'active': self.host_active[host],
+                    'dispatched': self.host_dispatched[host],
+                    'per_minute': self.host_dispatched[host] * 60 / elapsed if elapsed > 0 else 0.0,
+                }
+        return stats
+
+    def log_host_stats(self, top=10):
+        stats = self.host_stats()
+        busiest_hosts = sorted(stats.items(), key=lambda item: (item[1]['queued'], item[1]['dispatched']), reverse=True)[:top]
+        for host, host_stats in busiest_hosts:
+            logging.info(f"Host {host}: {host_stats['queued']} queued, {host_stats['active']} active, "
+                         f"{host_stats['dispatched']} dispatched, {host_stats['per_minute']:.1f}/min")
+
+    def seen_stats(self):
+        return self.all_urls.stats()
+
+    def log_frontier_stats(self):
+        with self.count_lock:
+            skipped = dict(self.skipped)
+            complete_hosts = len(self.complete_hosts)
+        logging.info(f"Frontier: {self.dispatched_count} URLs dispatched, {complete_hosts} sites stopped on a complete contact, "
+                     f"skipped {skipped}, URL cleaning cache {self.url_cleaner.stats()}")
+
+    def increment_processed(self, url=None):
+        with self.count_lock:
+            if url in self.in_flight:
+                self.in_flight.discard(url)
+                self.host_active[self.get_host(url)] -= 1
+                self.url_depths.pop(url, None)
             self.processed_count += 1
             self.log_progress()
             return self.processed_count
 
+    def record_tier(self, url, tier, reason):
+        with self.count_lock:
+            self.url_tiers[url] = (tier, reason)
+            self.tier_counts[tier] += 1
+        metrics.inc('pages_total', tier=tier)
+        logging.debug(f"Served by {tier} tier ({reason}): {url}" if reason else f"Served by {tier} tier: {url}")
+
+    def record_latency(self, stage, seconds):
+        with self.count_lock:
+            self.latencies[stage].observe(seconds)
+        metrics.observe('stage_seconds', seconds, stage=stage)
+
+    def record_page(self, url, stats):
+        # Pages the prefilter let through with a link-only pass, and pages streamed for being too big, are timed
+        # apart so 'extract' stays the full parse
+        self.record_latency(PAGE_STAGES[stats.mode], stats.seconds)
+        self.memory_tracker.record(url, stats)
+
+    def latency_stats(self, percentiles=(50, 99)):
+        stats = {}
+        with self.count_lock:
+            for stage, reservoir in self.latencies.items():
+                stats[stage] = {'count': reservoir.count}
+                for percentile, value in reservoir.percentiles(percentiles).items():
+                    stats[stage][f"p{percentile}"] = value
+        return stats
+
+    def mean_latency(self, stage):
+        with self.count_lock:
+            reservoir = self.latencies.get(stage)
+            return reservoir.mean() if reservoir else 0.0
+
+    def log_latency_stats(self):
+        for stage, stage_stats in self.latency_stats().items():
+            logging.info(f"{stage.capitalize()} latency: p50 {stage_stats['p50']:.3f}s, p99 {stage_stats['p99']:.3f}s over {stage_stats['count']} pages")
+
+    def prefilter_stats(self):
+        with self.count_lock:
+            counts = {stage: reservoir.count for stage, reservoir in self.latencies.items()}
+        links_only = counts.get('links', 0)
+        pages = links_only + counts.get('extract', 0) + counts.get('stream', 0)
+        return {
+            'links_only': links_only,
+            'pages': pages,
+            'skip_ratio': links_only / pages if pages else 0.0,
+            'seconds_saved': links_only * max(0.0, self.mean_latency('extract') - self.mean_latency('links')),
+        }
+
+    def log_prefilter_stats(self):
+        stats = self.prefilter_stats()
+        logging.info(
+            f"Prefilter: {stats['links_only']} of {stats['pages']} pages ({stats['skip_ratio']:.0%}) had no contact signals "
+            f"and only had their links read, saving about {stats['seconds_saved']:.1f}s of parsing"
+        )
+
+    def save_tiers(self, filepath):
+        with self.count_lock:
+            url_tiers = dict(self.url_tiers)
+        try:
+            with open(filepath, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(['url', 'tier', 'reason'])
+                for url, (tier, reason) in url_tiers.items():
+                    writer.writerow([url, tier, reason or ''])
+            logging.info(f"Fetch tiers: {dict(self.tier_counts)}, saved to {filepath}")
+        except Exception as e:
+            logging.warning(f"Saving fetch tiers failed with error: {e}")
+
     def log_progress(self):
         if self.processed_count % 50 == 0:
             logging.info(f"Processed {self.processed_count}/{self.total_count} URLs")
@@ -77,6 +462,137 @@ class URLProcessingManager:
             logging.debug(f"Processed {self.processed_count}/{self.total_count} URLs")
 
 
+class SharedURLProcessingManager(URLProcessingManager):
+    # Crawls one job together with other processes through a FrontierBackend: new URLs go to the shared queue and
+    # seen set, and this process leases a few at a time into its own per-host queues. Host budgets, scores and
+    # politeness delays stay per process
+    def __init__(self, backend, lease_size=20, visibility_timeout=10 * 60, task_timeout=5 * 60, worker_id=None,
+                 low_water=None, **kwargs):
+        self.backend = backend
+        self.lease_size = lease_size
+        self.low_water = lease_size // 4 if low_water is None else low_water
+        self.lease_backoff = 0.0
+        self.next_lease_time = 0.0
+        self.visibility_timeout = visibility_timeout
+        self.task_timeout = task_timeout
+        self.worker_id = worker_id or get_worker_id()
+        self.claimed_tasks = set()
+        self.waiting_tasks = {}
+        self.claims_renewed_at = 0
+        self.backend_lock = threading.Lock()
+        super().__init__([], **kwargs)
+
+    def push(self, url, score, depth):
+        return self.backend.push(url, score, depth)
+
+    def push_many(self, entries):
+        # One round trip to the shared frontier per page of links
+        return self.backend.push_many(entries)
+
+    def run_task(self, name, start):
+        if self.backend.claim_task(name, self.worker_id, self.task_timeout):
+            self.claimed_tasks.add(name)
+            return start()
+        logging.info(f"Task {name} is claimed by another worker")
+        # Kept so this worker can take over if the claiming worker dies and its claim expires
+        self.waiting_tasks[name] = start
+        return None
+
+    def is_producing(self):
+        producing = super().is_producing()
+        # Claims are renewed while this process's producers run and finished once they stop
+        for name in list(self.claimed_tasks):
+            if not producing:
+                self.backend.finish_task(name)
+                self.claimed_tasks.discard(name)
+        if time.time() - self.claims_renewed_at > self.task_timeout / 5:
+            self.claims_renewed_at = time.time()
+            for name in self.claimed_tasks:
+                self.backend.claim_task(name, self.worker_id, self.task_timeout)
+            producing = self.take_over_tasks() or producing
+        return producing
+
+    def take_over_tasks(self):
+        took_over = False
+        for name, start in list(self.waiting_tasks.items()):
+            if self.backend.claim_task(name, self.worker_id, self.task_timeout):
+                logging.warning(f"Took over task {name} from a worker whose claim expired")
+                del self.waiting_tasks[name]
+                self.claimed_tasks.add(name)
+                start()
+                took_over = True
+        return took_over
+
+    def has_queued(self):
+        if super().has_queued() or not self.backend.is_drained():
+            return True
+        # An expired claim leaves the frontier looking drained, so a task its claimant never finished is taken over
+        # here before this worker stops, not only when claims are next renewed
+        return self.take_over_tasks()
+
+    def seconds_until_ready(self):
+        seconds = super().seconds_until_ready()
+        if seconds is None and not self.backend.is_drained():
+            return PRODUCER_POLL_SECONDS
+        return seconds
+
+    def refill(self):
+        # Every lease takes the frontier's write lock, so it only runs once the local queues are down to low_water,
+        # by one thread at a time, and not again for a while after coming back empty
+        with self.count_lock:
+            if self.queued_count > self.low_water or time.time() < self.next_lease_time:
+                return
+        if not self.backend_lock.acquire(blocking=False):
+            return
+        try:
+            leased_urls = self.backend.lease(self.worker_id, self.lease_size, self.visibility_timeout)
+        finally:
+            self.backend_lock.release()
+        with self.count_lock:
+            for url, score, depth in leased_urls:
+                self.enqueue(url, score, depth)
+                self.total_count += 1
+            if leased_urls:
+                self.lease_backoff = 0.0
+            else:
+                self.lease_backoff = min(max(self.lease_backoff * 2, MIN_LEASE_BACKOFF_SECONDS), MAX_LEASE_BACKOFF_SECONDS)
+            self.next_lease_time = time.time() + self.lease_backoff
+
+    def get_next_url(self):
+        self.refill()
+        return super().get_next_url()
+
+    def drop_host_queue(self, host, reason):
+        host_queue = self.host_queues.get(host)
+        super().drop_host_queue(host, reason)
+        # Dropped here means done for the job, other workers would apply the same budget
+        for _, _, url in host_queue or ():
+            self.backend.ack(url)
+
+    def increment_processed(self, url=None):
+        processed_count = super().increment_processed(url)
+        if url is not None:
+            self.backend.ack(url)
+        return processed_count
+
+    def release_leases(self):
+        # Hands URLs leased but never dispatched back to the other workers
+        with self.count_lock:
+            urls = [url for host_queue in self.host_queues.values() for _, _, url in host_queue]
+            urls.extend(self.in_flight)
+        if urls:
+            self.backend.release(urls)
+            logging.info(f"Released {len(urls)} leased URLs back to the shared frontier")
+
+    def seen_stats(self):
+        # The job's seen set lives in the backend, this process's own set only ever holds what it crawled
+        return {'shared': True, 'urls': self.backend.counts()['seen']}
+
+    def log_frontier_stats(self):
+        super().log_frontier_stats()
+        logging.info(f"Shared frontier {self.backend.job_id}: {self.backend.counts()}")
+
+
 def setup_paths_and_logging(search_queries):
     current_datetime = datetime.now()
     current_formatted_datetime = current_datetime.strftime("%Y-%m-%d_%H-%M-%S")
@@ -115,66 +631,130 @@ def setup_paths_and_logging(search_queries):
 
     urls_filename = f"{search_queries[0].replace(' ', '-')}.txt"
     urls_filepath = os.path.join(results, urls_filename)
+
+    robots_filepath = os.path.join(results, "robots_cache.json")
+
+    checkpoint_filepath = os.path.join(results, f"{search_queries[0].replace(' ', '-')}.checkpoint.json.gz")
+
+    email_domains_filepath = os.path.join(results, "email_domains.json")
+
+    page_cache_path = os.path.join(results, "page_cache")
+
+    search_cache_path = os.path.join(results, "search_cache")
+
+    contact_index_filepath = os.path.join(results, "contact_index.sqlite")
     
-    return csv_filepath, urls_filepath
+    return (csv_filepath, urls_filepath, robots_filepath, checkpoint_filepath, email_domains_filepath, page_cache_path,
+            search_cache_path, contact_index_filepath)
 
 
-def get_urls(search_queries, clicks, urls_filepath, use_test_urls):
+def start_search(search_queries, clicks, urls_filepath, use_test_urls, manager, driver_pool=None, parser_backend='html.parser',
+                 result_cache=None, producer_states=None):
+    # Search results stream into the manager while the crawl runs, returns None when saved URLs were loaded instead.
+    # producer_states comes from a checkpoint, whose queue and seen set already hold every URL found so far: a run
+    # that had loaded saved URLs or finished its search does not search again, an unfinished one runs what is left
+    if producer_states is not None:
+        finished_queries = {query for state in producer_states for query in state['finished_queries']}
+        if not producer_states or finished_queries.issuperset(search_queries):
+            logging.info("Search finished before the checkpoint, not running it again")
+            return None
     if use_test_urls:
         logging.debug(f"use_test_urls = {use_test_urls}, URL filepath: {urls_filepath}")
         if os.path.exists(urls_filepath):
             logging.debug("Saved URL file exists, now loading")
             with open(urls_filepath, 'r') as file:
                 all_urls = [line.strip() for line in file.readlines()]
-        else:
-            logging.debug("Saved URL file does not exists, fetching results and saving")
-            all_urls = get_gigablast_search_results(search_queries, clicks=clicks)
-            with open(urls_filepath, 'w') as file:
-                for url in all_urls:
-                    file.write(url + "\n")
-                logging.debug("Wrote URLs to text file")
-                print(all_urls)
-    else:
-        all_urls = get_gigablast_search_results(search_queries, clicks=clicks)
+            manager.add_urls(all_urls)
+            logging.info(f"Collected {len(all_urls)} URLs")
+            return None
+        logging.debug("Saved URL file does not exists, fetching results and saving")
+    search_producer = SearchProducer(
+        search_queries, manager.add_urls, clicks, driver_pool=driver_pool, parser_backend=parser_backend, result_cache=result_cache
+    )
+    for state in producer_states or ():
+        search_producer.load_state(state)
+    manager.add_producer(search_producer)
+    return search_producer.start()
+
+
+def finish_search(search_producer, urls_filepath, use_test_urls):
+    all_urls = search_producer.join()
+    if use_test_urls:
+        with open(urls_filepath, 'w') as file:
+            for url in all_urls:
+                file.write(url + "\n")
+            logging.debug("Wrote URLs to text file")
     logging.info(f"Collected {len(all_urls)} URLs")
-    return all_urls
 
 
-def process_url(url, manager):
+def fetch_page(url, manager, fetcher):
+    logging.debug(f"Starting to process: {url}")
+    start_time = time.perf_counter()
+    html_content, tier, reason = fetcher.fetch(url)
+    manager.record_latency('fetch', time.perf_counter() - start_time)
+    manager.record_tier(url, tier, reason)
+    if not html_content:
+        logging.debug(f"No html content: {url}")
+    elif manager.duplicate_index is not None and manager.duplicate_index.check(url, html_content):
+        # Parsing, extraction and link discovery already ran on the original. It still counts as crawled, or every
+        # incremental run would fetch it again
+        if manager.contact_index is not None:
+            manager.contact_index.record_crawl(url)
+        return None
+    return html_content
+
+
+@metrics.timed('process_url')
+def process_url(url, manager, fetcher, parser_backend='html.parser', prefilter=True, stream_above=None):
     try:
-        logging.debug(f"Starting to process: {url}")
-        html_content = fetch_html(url)
+        html_content = fetch_page(url, manager, fetcher)
         if html_content:
-            soup = BeautifulSoup(html_content, 'html.parser')
-            contacts = proximity_based_extraction(soup, url, manager)
+            start_time = time.perf_counter()
+            with metrics.timer(stage='parse'):
+                page, _, rss_growth = measured(parse_page, html_content, parser_backend, prefilter, stream_above)
+            contacts = proximity_based_extraction(page, url, manager)
+            manager.record_page(url, PageStats(page.mode, time.perf_counter() - start_time, len(html_content), rss_growth))
             return contacts
         else:
-            logging.debug(f"No html content: {url}")
             return []
     except Exception as e:
         raise e
 
 
-def get_contact_info_from_urls(workers, manager):
+def get_contact_info_from_urls(workers, manager, fetcher, parser_backend='html.parser', sink=None, prefilter=True,
+                               stream_above=None):
     all_contacts = []
     try:
         with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
             logging.debug(f"Executor created with {workers} workers")
             futures_to_urls = {}
-            while manager.url_queue or futures_to_urls:
-                while manager.url_queue and len(futures_to_urls) < workers:
+            while manager.has_queued() or futures_to_urls:
+                while len(futures_to_urls) < workers:
                     url = manager.get_next_url()
-                    if url:
-                        future = executor.submit(process_url, url, manager)
-                        futures_to_urls[future] = url
+                    if not url:
+                        break
+                    future = executor.submit(process_url, url, manager, fetcher, parser_backend, prefilter, stream_above)
+                    futures_to_urls[future] = url
 
-                done_futures = [f for f in futures_to_urls if f.done()]
+                if not futures_to_urls:
+                    time.sleep(manager.seconds_until_ready() or 0.01)
+                    continue
+                # Wake up for the first finished URL, or when a cooling-down host can be served again
+                wait_timeout = manager.seconds_until_ready() if len(futures_to_urls) < workers else None
+                done_futures, _ = concurrent.futures.wait(
+                    futures_to_urls, timeout=wait_timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                )
                 for future in done_futures:
                     url = futures_to_urls.pop(future)
                     try:
                         contacts = future.result()
+                        manager.record_contacts(url, contacts)
                         if contacts:
-                            all_contacts.extend(contacts)
+                            metrics.inc('contacts_found_total', len(contacts))
+                            if sink:
+                                sink.write(contacts)
+                            else:
+                                all_contacts.extend(contacts)
                             logging.debug(f"Added contacts: {url}")
                         else:
                             logging.debug(f"No contacts found: {url}")
@@ -187,21 +767,315 @@ def get_contact_info_from_urls(workers, manager):
                     except Exception as e:
                         logging.warning(f"Error retrieving result: {url}: {str(e)}")
                     finally:
-                        manager.increment_processed()
+                        manager.increment_processed(url)
     except Exception as e:
         logging.critical(f"Function get_contact_info_from_urls failure! {e}")
     return all_contacts
 
 
-def find_contact_info(search_queries, clicks=0, use_test_urls=False):
-    csv_filepath, urls_filepath = setup_paths_and_logging(search_queries)
-    all_urls = get_urls(search_queries, clicks, urls_filepath, use_test_urls)
-    
-    manager = URLProcessingManager(all_urls)
-    all_contacts = get_contact_info_from_urls(int(os.cpu_count()*3), manager)
+def timed_extract_page(html_content, url, parser_backend='html.parser', prefilter=True, stream_above=None):
+    # Runs in an extract worker process, whose metrics never reach the parent: the page stats and the parse and
+    # extraction timings travel back with the result for the parent to record
+    start_time = time.perf_counter()
+    page, parse_seconds, rss_growth = measured(parse_page, html_content, parser_backend, prefilter, stream_above)
+    links = find_contact_us_links(page, url)
+    extraction_start = time.perf_counter()
+    contacts = proximity_based_extraction(page, url)
+    end_time = time.perf_counter()
+    stage_seconds = {'parse': parse_seconds, 'extraction': end_time - extraction_start}
+    return contacts, links, PageStats(page.mode, end_time - start_time, len(html_content), rss_growth), stage_seconds
+
+
+def get_contact_info_from_urls_pipelined(workers, extract_workers, manager, fetcher, parser_backend='html.parser', sink=None,
+                                         extract_queue_size=None, prefilter=True, stream_above=None):
+    # Fetch threads only do I/O and hand raw HTML to extract processes, which parse and extract outside the GIL.
+    # This loop is the only consumer of both stages, so discovered links reach the manager from a single thread
+    all_contacts = []
+    extract_queue_size = extract_queue_size or extract_workers * 2
+    fetch_futures = {}
+    extract_futures = {}
+    metrics.set_gauge('extract_backlog', lambda: len(extract_futures))
+    try:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as fetch_executor, \
+                create_extract_executor(extract_workers) as extract_executor:
+            logging.debug(f"Pipeline created with {workers} fetch threads and {extract_workers} extract processes")
+            while manager.has_queued() or fetch_futures or extract_futures:
+                # A full extract backlog holds back new fetches so raw HTML cannot pile up in memory
+                while len(fetch_futures) < workers and len(extract_futures) < extract_queue_size:
+                    url = manager.get_next_url()
+                    if not url:
+                        break
+                    fetch_futures[fetch_executor.submit(fetch_page, url, manager, fetcher)] = url
+
+                if not fetch_futures and not extract_futures:
+                    time.sleep(manager.seconds_until_ready() or 0.01)
+                    continue
+                can_dispatch = len(fetch_futures) < workers and len(extract_futures) < extract_queue_size
+                wait_timeout = manager.seconds_until_ready() if can_dispatch else None
+                done_futures, _ = concurrent.futures.wait(
+                    list(fetch_futures) + list(extract_futures), timeout=wait_timeout,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                for future in done_futures:
+                    if future in fetch_futures:
+                        url = fetch_futures.pop(future)
+                        try:
+                            html_content = future.result()
+                        except Exception as e:
+                            metrics.count_error('fetch', e)
+                            if isinstance(e, (InvalidURLException, AccessDeniedException)):
+                                logging.debug(e)
+                            else:
+                                logging.warning(f"Error fetching: {url}: {str(e)}")
+                            manager.increment_processed(url)
+                            continue
+                        if html_content:
+                            extract_futures[extract_executor.submit(
+                                timed_extract_page, html_content, url, parser_backend, prefilter, stream_above
+                            )] = url
+                        else:
+                            manager.increment_processed(url)
+                        continue
+
+                    url = extract_futures.pop(future)
+                    try:
+                        contacts, links, page_stats, stage_seconds = future.result()
+                        metrics.observe_stages(stage_seconds)
+                        manager.record_page(url, page_stats)
+                        manager.add_links(links, parent=url)
+                        manager.record_contacts(url, contacts)
+                        if contacts:
+                            metrics.inc('contacts_found_total', len(contacts))
+                            if sink:
+                                sink.write(contacts)
+                            else:
+                                all_contacts.extend(contacts)
+                            logging.debug(f"Added contacts: {url}")
+                        else:
+                            logging.debug(f"No contacts found: {url}")
+                    except Exception as e:
+                        metrics.count_error('extract', e)
+                        logging.warning(f"Error extracting: {url}: {str(e)}")
+                    finally:
+                        manager.increment_processed(url)
+    except Exception as e:
+        logging.critical(f"Function get_contact_info_from_urls_pipelined failure! {e}")
+    return all_contacts
+
+
+def replay_cached_pages(page_cache, manager, parser_backend='html.parser', sink=None, prefilter=True, stream_above=None):
+    # Re-runs extraction over every cached page, nothing is fetched
+    all_contacts = []
+    start_time = time.time()
+    for cached_page in page_cache.iter_pages():
+        try:
+            extract_start = time.perf_counter()
+            page, _, rss_growth = measured(parse_page, cached_page.html, parser_backend, prefilter, stream_above)
+            contacts = proximity_based_extraction(page, cached_page.url, manager)
+            manager.record_page(cached_page.url, PageStats(
+                page.mode, time.perf_counter() - extract_start, len(cached_page.html), rss_growth
+            ))
+            manager.record_tier(cached_page.url, 'cache', "replay")
+            manager.record_contacts(cached_page.url, contacts)
+            if contacts:
+                if sink:
+                    sink.write(contacts)
+                else:
+                    all_contacts.extend(contacts)
+        except Exception as e:
+            logging.warning(f"Error replaying cached page: {cached_page.url}: {str(e)}")
+        finally:
+            manager.increment_processed(cached_page.url)
+    elapsed = time.time() - start_time
+    logging.info(f"Replayed {manager.processed_count} cached pages in {elapsed:.1f}s")
+    return all_contacts
+
+
+def find_contact_info(search_queries, clicks=0, use_test_urls=False, use_http_tier=True, engine='threads', parser_backend='html.parser',
+                      resume=False, checkpoint_interval=60, max_per_host=2, min_host_delay=1.0,
+                      seen_set='exact', seen_set_options=None, email_validation='full', email_domain_ttl=7 * 24 * 60 * 60,
+                      use_page_cache=False, page_cache_max_bytes=2 * 1024 ** 3, page_cache_max_age=None, replay=False,
+                      metrics_enabled=False, metrics_interval=30, metrics_port=None,
+                      fetch_workers=None, extract_workers=None, extract_queue_size=None,
+                      max_depth=None, max_pages_per_host=None, max_pages=None, stop_on_complete_contact=False,
+                      use_search_cache=True, search_cache_max_age=24 * 60 * 60, skip_near_duplicates=False,
+                      near_duplicate_distance=6, page_load_strategy='normal', block_resources=False, blocked_url_patterns=None,
+                      max_page_bytes=5 * 1024 * 1024, ajax_timeout=10, adaptive_timeouts=True,
+                      job_id=None, frontier=None, lease_size=20, visibility_timeout=10 * 60, prefilter=True,
+                      strip_parameters=TRACKING_PARAMETERS, use_contact_index=False, recrawl_after=7 * 24 * 60 * 60,
+                      index_export=None, worker_memory_budget=64 * 1024 * 1024):
+    # The contact index is opt-in. The CSV holds this run's contacts unless index_export asks the index for 'full',
+    # every contact any run has found, or 'delta', only those this run added or made more complete. max_page_bytes
+    # caps each HTTP download and, in characters, each rendered DOM; pages whose full parse would outgrow worker_memory_budget are streamed instead
+    started_at = time.time()
+    (csv_filepath, urls_filepath, robots_filepath, checkpoint_filepath, email_domains_filepath,
+     page_cache_path, search_cache_path, contact_index_filepath) = setup_paths_and_logging(search_queries)
+    checkpoint = load_checkpoint(checkpoint_filepath) if resume and not job_id else None
+    if checkpoint:
+        # Keep writing to the interrupted run's contact store and CSV
+        csv_filepath = checkpoint['csv_filepath']
+    if job_id:
+        # Every worker on a job shares its frontier and the contact store the frontier provides, a local file for
+        # SQLiteFrontier and a Redis list for RedisFrontier; the frontier itself is durable, so no checkpoints
+        results_path = os.path.dirname(urls_filepath)
+        csv_filepath = os.path.join(results_path, f"{job_id}.csv")
+        if frontier is None:
+            frontier = SQLiteFrontier(os.path.join(results_path, "frontier.sqlite"), job_id)
+    robots_cache.load(robots_filepath)
+    workers = fetch_workers or int(os.cpu_count()*3)
+    # Parsing and extraction run in their own processes unless extract_workers is 0; one core gains nothing from them
+    if extract_workers is None:
+        extract_workers = os.cpu_count() if os.cpu_count() > 1 else 0
+    driver_options = {'page_load_strategy': page_load_strategy}
+    if block_resources:
+        driver_options['blocked_url_patterns'] = BLOCKED_URL_PATTERNS + list(blocked_url_patterns or [])
+    driver_pool = DriverPool(workers, driver_options=driver_options)
+    http_client = HttpClient(max_bytes=max_page_bytes, pool_size=workers) if use_http_tier else None
+    page_cache = PageCache(page_cache_path, page_cache_max_bytes, page_cache_max_age) if use_page_cache or replay else None
+    host_timeouts = HostTimeouts() if adaptive_timeouts else None
+    fetcher = PageFetcher(driver_pool, http_client, page_cache=page_cache, ajax_timeout=ajax_timeout,
+                          max_dom_chars=max_page_bytes, host_timeouts=host_timeouts)
+    sink_filepath = csv_filepath.replace('.csv', '.sqlite')
+    sink = frontier.create_sink(sink_filepath) if job_id else ContactSink(sink_filepath)
+    manager_options = {
+        'max_per_host': max_per_host,
+        'min_host_delay': min_host_delay,
+        'crawl_delay_lookup': robots_cache.peek_crawl_delay,
+        'max_depth': max_depth,
+        'max_pages_per_host': max_pages_per_host,
+        'max_pages': max_pages,
+        'stop_on_complete_contact': stop_on_complete_contact,
+        'duplicate_index': NearDuplicateIndex(near_duplicate_distance) if skip_near_duplicates else None,
+        'url_cleaner': URLCleaner(strip_parameters),
+        'memory_tracker': PageMemoryTracker(warn_bytes=worker_memory_budget),
+    }
+    stream_above = get_stream_threshold(worker_memory_budget, parser_backend)
+    contact_index = ContactIndex(contact_index_filepath) if use_contact_index else None
+    if contact_index is not None and not replay:
+        manager_options['contact_index'] = contact_index
+        manager_options['recently_crawled'] = contact_index.get_recent_urls(recrawl_after) if recrawl_after else None
+        logging.info(f"Contact index {contact_index.stats()}, skipping {len(manager_options['recently_crawled'] or ())} "
+                     f"URLs crawled in the last {recrawl_after / 3600:.0f}h")
+    search_result_cache = SearchResultCache(search_cache_path, search_cache_max_age) if use_search_cache else None
+    manager = None
+    checkpointer = None
+    completed = False
+    # A job's contacts are cleaned and exported by one worker, the one that claims it once the frontier is drained
+    exporting = not job_id
+    metrics_reporter = None
+    if metrics_enabled:
+        metrics.enabled = True
+        metrics_reporter = MetricsReporter(metrics, csv_filepath.replace('.csv', '_metrics.json'), metrics_interval, metrics_port)
+        metrics_reporter.start()
+    try:
+        if replay:
+            manager = URLProcessingManager(page_cache.get_urls(), **manager_options)
+            replay_cached_pages(page_cache, manager, parser_backend, sink, prefilter, stream_above)
+        else:
+            if job_id:
+                manager = SharedURLProcessingManager(frontier, lease_size, visibility_timeout, **manager_options)
+            elif checkpoint:
+                manager = URLProcessingManager.from_checkpoint(checkpoint['manager'], **manager_options)
+            else:
+                seen_urls = create_seen_set(seen_set, **(seen_set_options or {}))
+                manager = URLProcessingManager([], seen_set=seen_urls, **manager_options)
+            # A resumed run only searches the queries that had not finished. On a shared job only the worker that
+            # claims the search runs it
+            manager.run_task('search', functools.partial(
+                start_search, search_queries, clicks, urls_filepath, use_test_urls, manager, driver_pool, parser_backend,
+                search_result_cache, checkpoint['manager'].get('producers') if checkpoint else None,
+            ))
+            if not job_id:
+                checkpointer = Checkpointer(checkpoint_filepath, manager, {'csv_filepath': csv_filepath}, checkpoint_interval)
+                checkpointer.start()
+            metrics.set_gauge('queue_depth', lambda: manager.queued_count)
+            metrics.set_gauge('active_workers', lambda: len(manager.in_flight))
+            metrics.set_gauge('processed_urls', lambda: manager.processed_count)
+
+            if engine == 'asyncio':
+                get_contact_info_from_urls_async(
+                    workers,
+                    manager,
+                    fetch=functools.partial(fetch_page, manager=manager, fetcher=fetcher),
+                    parse=functools.partial(parse_page, parser_backend=parser_backend, prefilter=prefilter,
+                                            stream_above=stream_above),
+                    extract=lambda page, url: proximity_based_extraction(page, url, manager),
+                    sink=sink,
+                    extract_page=functools.partial(timed_extract_page, parser_backend=parser_backend, prefilter=prefilter,
+                                                   stream_above=stream_above),
+                    extract_workers=extract_workers,
+                    queue_size=extract_queue_size,
+                )
+            elif extract_workers:
+                get_contact_info_from_urls_pipelined(
+                    workers, extract_workers, manager, fetcher, parser_backend, sink, extract_queue_size, prefilter,
+                    stream_above,
+                )
+            else:
+                get_contact_info_from_urls(workers, manager, fetcher, parser_backend, sink, prefilter, stream_above)
+            for search_producer in manager.producers:
+                finish_search(search_producer, urls_filepath, use_test_urls)
+            completed = not manager.has_queued() and not manager.in_flight
+            if job_id and completed:
+                # Finished as soon as it is claimed, so the other workers see the job drained and stop
+                exporting = frontier.claim_task('export', manager.worker_id, manager.task_timeout)
+                if exporting:
+                    frontier.finish_task('export')
+        manager.log_host_stats()
+        manager.log_frontier_stats()
+        manager.log_latency_stats()
+        if prefilter:
+            manager.log_prefilter_stats()
+        manager.memory_tracker.log_stats()
+        if manager.duplicate_index is not None:
+            manager.duplicate_index.log_stats(manager.mean_latency('extract'))
+        logging.info(f"Seen URL set: {manager.seen_stats()}")
+        manager.save_tiers(csv_filepath.replace('.csv', '_tiers.csv'))
+    finally:
+        if checkpointer:
+            checkpointer.stop(completed)
+        for search_producer in manager.producers if manager else ():
+            search_producer.stop()
+        if isinstance(manager, SharedURLProcessingManager):
+            manager.release_leases()
+        if frontier is not None:
+            frontier.close()
+        driver_pool.close()
+        if http_client:
+            http_client.close()
+        robots_cache.log_stats()
+        robots_cache.save(robots_filepath)
+        if page_cache is not None:
+            page_cache.log_stats()
+            page_cache.close()
+        if contact_index is not None:
+            contact_index.flush()
 
-    cleaned_contacts = clean_contact_information(all_contacts)
+    logging.info(f"Streamed {sink.written_count} raw contacts to {sink.filepath}")
+    if not exporting:
+        logging.info(f"Job {job_id} {'is exported by another worker' if completed else 'is not finished'}, not exporting its contacts")
+        if contact_index is not None:
+            contact_index.close()
+        sink.close()
+        if metrics_reporter:
+            metrics_reporter.stop()
+        return
+    sink.pull()
+    email_standardizer = configure_email_validation(email_validation, email_domains_filepath, ttl=email_domain_ttl)
+    cleaned_contacts = clean_contact_store(sink)
+    if contact_index is not None:
+        contact_index.merge(sink.read_cleaned_rows())
+        if index_export:
+            cleaned_contacts = contact_index.read_contacts(since=started_at if index_export == 'delta' else None)
+            logging.info(f"Exporting {len(cleaned_contacts)} contacts ({index_export}) from the contact index: {contact_index.stats()}")
+        contact_index.close()
+    sink.close()
+    email_standardizer.log_stats()
+    if email_standardizer.deliverability_cache:
+        email_standardizer.deliverability_cache.save()
     save_to_csv(cleaned_contacts, csv_filepath)
+    if metrics_reporter:
+        metrics_reporter.stop()
 
 
 if __name__ == "__main__":
@@ -243,4 +1117,4 @@ if __name__ == "__main__":
         "Find a fishing captain in Texas"
     ]
 
-find_contact_info(search_queries, clicks=10, use_test_urls=True)
+    find_contact_info(search_queries, clicks=10, use_test_urls=True)
@@ -0,0 +1,165 @@
+import csv
+import json
+import logging
+import sqlite3
+import threading
+import time
+
+import pandas as pd
+
+
+CONTACT_COLUMNS = ['phone', 'email', 'salutation', 'first_name', 'last_name', 'source']
+
+
+def count_filled_fields(contacts):
+    # Completeness of each row, the one rank every dedup uses: fields that are not missing. It has to run before
+    # NaN is written to SQLite as '', so cleaned rows keep the completeness computed on insert
+    return contacts.notna().sum(axis=1)
+
+
+class ContactSink:
+    def __init__(self, filepath):
+        self.filepath = filepath
+        self.lock = threading.Lock()
+        self.written_count = 0
+        self.connection = sqlite3.connect(filepath, check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        columns = ', '.join(f"{column} TEXT" for column in CONTACT_COLUMNS)
+        cleaned_columns = ', '.join(f"{column} TEXT NOT NULL DEFAULT ''" for column in CONTACT_COLUMNS)
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS raw_contacts (id INTEGER PRIMARY KEY AUTOINCREMENT, {columns}, found_at REAL)"
+            )
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS cleaned_contacts (id INTEGER PRIMARY KEY, {cleaned_columns}, "
+                f"completeness INTEGER, UNIQUE ({', '.join(CONTACT_COLUMNS)}))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS cleaned_contacts_email ON cleaned_contacts (email)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS store_state (key TEXT PRIMARY KEY, value)")
+
+    def write(self, contacts):
+        if not contacts:
+            return
+        found_at = time.time()
+        rows = [tuple(contact.get(column) for column in CONTACT_COLUMNS) + (found_at,) for contact in contacts]
+        placeholders = ', '.join('?' * (len(CONTACT_COLUMNS) + 1))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT INTO raw_contacts ({', '.join(CONTACT_COLUMNS)}, found_at) VALUES ({placeholders})", rows
+            )
+            self.written_count += len(rows)
+
+    def count_raw(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM raw_contacts").fetchone()[0]
+
+    def read_raw_chunks(self, after_id=0, chunk_size=50000):
+        # Keyset pagination so no cursor stays open while cleaned rows are written back
+        while True:
+            with self.lock:
+                chunk = pd.read_sql_query(
+                    f"SELECT id, {', '.join(CONTACT_COLUMNS)} FROM raw_contacts WHERE id > ? ORDER BY id LIMIT ?",
+                    self.connection,
+                    params=(after_id, chunk_size),
+                )
+            if chunk.empty:
+                return
+            after_id = int(chunk['id'].iloc[-1])
+            yield chunk
+
+    def get_cleaned_through(self):
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM store_state WHERE key = 'cleaned_through'").fetchone()
+        return int(row[0]) if row else 0
+
+    def write_cleaned(self, contact_info, cleaned_through):
+        completeness = count_filled_fields(contact_info[CONTACT_COLUMNS])
+        rows = contact_info[CONTACT_COLUMNS].fillna('').assign(completeness=completeness)
+        placeholders = ', '.join('?' * (len(CONTACT_COLUMNS) + 1))
+        with self.lock, self.connection:
+            self.connection.executemany(
+                f"INSERT OR IGNORE INTO cleaned_contacts ({', '.join(CONTACT_COLUMNS)}, completeness) VALUES ({placeholders})",
+                rows.itertuples(index=False, name=None),
+            )
+            self.connection.execute(
+                "INSERT OR REPLACE INTO store_state (key, value) VALUES ('cleaned_through', ?)", (cleaned_through,)
+            )
+
+    def read_cleaned(self):
+        # Keep the most complete row per email, earliest first on ties
+        with self.lock:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(CONTACT_COLUMNS)} FROM ("
+                f"SELECT *, ROW_NUMBER() OVER (PARTITION BY email ORDER BY completeness DESC, id) AS email_rank "
+                f"FROM cleaned_contacts) WHERE email_rank = 1 ORDER BY completeness DESC, id",
+                self.connection,
+            )
+
+    def read_cleaned_rows(self):
+        # Every distinct cleaned row, including the less complete ones read_cleaned drops, so each source shows up
+        with self.lock:
+            return pd.read_sql_query(
+                f"SELECT {', '.join(CONTACT_COLUMNS)}, completeness FROM cleaned_contacts ORDER BY id", self.connection
+            )
+
+    def export_csv(self, filepath):
+        try:
+            with self.lock, open(filepath, 'w', newline='') as file:
+                writer = csv.writer(file)
+                writer.writerow(CONTACT_COLUMNS + ['found_at'])
+                cursor = self.connection.execute(f"SELECT {', '.join(CONTACT_COLUMNS)}, found_at FROM raw_contacts ORDER BY id")
+                writer.writerows(cursor)
+            logging.info(f"Raw contacts exported to {filepath}")
+        except Exception as e:
+            logging.critical(f"Exporting raw contacts failed with error: {e}")
+
+    def pull(self):
+        # Every row written here is already in the local store
+        return 0
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class RedisContactSink(ContactSink):
+    # For a job crawled from several machines: raw contacts go to one Redis list instead of each worker's own file.
+    # The local store only fills when pull() copies the list down, so the worker that exports cleans every row
+    def __init__(self, filepath, client, key):
+        super().__init__(filepath)
+        self.client = client
+        self.key = key
+
+    def write(self, contacts):
+        if not contacts:
+            return
+        found_at = time.time()
+        rows = [json.dumps([contact.get(column) for column in CONTACT_COLUMNS] + [found_at]) for contact in contacts]
+        self.client.rpush(self.key, *rows)
+        with self.lock:
+            self.written_count += len(rows)
+
+    def pull(self, batch_size=10000):
+        # Only rows pushed since the last pull are copied, the position is saved with them in the same transaction
+        with self.lock:
+            row = self.connection.execute("SELECT value FROM store_state WHERE key = 'pulled_through'").fetchone()
+        pulled_through = int(row[0]) if row else 0
+        pulled = 0
+        placeholders = ', '.join('?' * (len(CONTACT_COLUMNS) + 1))
+        while True:
+            values = self.client.lrange(self.key, pulled_through, pulled_through + batch_size - 1)
+            if not values:
+                break
+            pulled_through += len(values)
+            pulled += len(values)
+            with self.lock, self.connection:
+                self.connection.executemany(
+                    f"INSERT INTO raw_contacts ({', '.join(CONTACT_COLUMNS)}, found_at) VALUES ({placeholders})",
+                    [json.loads(value) for value in values],
+                )
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO store_state (key, value) VALUES ('pulled_through', ?)", (pulled_through,)
+                )
+        logging.info(f"Pulled {pulled} raw contacts from {self.key} into {self.filepath}")
+        return pulled
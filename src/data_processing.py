@@ -1,11 +1,48 @@
+import bisect
+import concurrent.futures
 import logging
+import multiprocessing
 import re
 import urllib.parse
+from functools import lru_cache
 from urllib.parse import urlparse
 
 import pandas as pd
 import phonenumbers
-from email_validator import validate_email, EmailNotValidError
+
+from src.contact_store import count_filled_fields
+from src.email_validation import DomainDeliverabilityCache, EmailStandardizer
+from src.html_parser import parse_anchors, parse_html, parse_html_streaming
+from src.metrics import metrics
+from src.page_memory import measured
+
+
+PHONE_PATTERN = re.compile(r'\(?\b[0-9]{3}\)?[-. ]?[0-9]{3}[-. ]?[0-9]{4}\b', re.IGNORECASE)
+EMAIL_PATTERN = re.compile(r'(?i)[A-Z0-9._%+-]+@(?:[A-Z0-9-]+\.)+[A-Z]{2,}', re.IGNORECASE)
+NAME_PATTERN = re.compile(r"(Mr\.|Mrs\.|Ms\.|Capt\.|Captain|Skipper|CPT|Cap'n)\s+([A-Z][\w'-]+)\s+([A-Z][\w'-]+)?")
+CONTACT_LINK_PATTERN = re.compile(r'\b(contact|reach out|get in touch|contact us|contact me|reach us)\b', re.IGNORECASE)
+# Byte-level signals for the prefilter, run on the raw page before anything is parsed. They only ever over-match
+# EMAIL_PATTERN and NAME_PATTERN: entity-encoded '@', periods and apostrophes count, numeric references with or
+# without the ';' parsers do not require, and so does attribute text
+TAG_ATTRIBUTES_BYTES = rb"""(?:"[^"]*"|'[^']*'|[^"'>])*"""
+# Quick strip of scripts, styles, templates and comments. It can take a '<script' or '<!--' inside an attribute
+# value for a real one and strip visible text after it, so it only ever decides that a page has signals
+QUICK_HIDDEN_CONTENT_BYTES_PATTERN = re.compile(rb'(?is)<(script|style|template)(?=[\s/>]).*?</\1\s*>|<!--.*?-->')
+# Exact strip: every tag is matched whole, quoted attribute values included, so only real tags start hidden
+# content. Other tags are captured as tag and put back
+HIDDEN_CONTENT_BYTES_PATTERN = re.compile(
+    rb'(?is)<!--.*?-->|<(script|style|template)(?=[\s/>])' + TAG_ATTRIBUTES_BYTES + rb'>.*?</\1(?=[\s/>])'
+    rb'|(?P<tag></?[a-z!?]' + TAG_ATTRIBUTES_BYTES + rb'>)'
+)
+# Each starts with a literal so the regex engine can skip ahead instead of trying every position
+EMAIL_SIGNAL_PATTERN = re.compile(rb'@(?<=[\w.%+;\x80-\xff-]@)[\w&\x80-\xff-]')
+ENCODED_AT_SIGN_PATTERN = re.compile(rb'&(?:#0*64;?|#[xX]0*40;?|commat;)')
+NAME_SIGNAL_PATTERN = re.compile(
+    rb"M(?:rs?|s)(?:\.|&#0*46;?|&#[xX]0*2[eE];?|&period;)|Skipper"
+    rb"|C(?:apt(?:ain|\.|&#0*46;?|&#[xX]0*2[eE];?|&period;)|PT|ap(?:'|&#0*39;?|&#[xX]0*27;?|&apos;)n)"
+)
+
+email_standardizer = EmailStandardizer()
 
 
 def get_base_url(full_url):
@@ -14,61 +51,146 @@ def get_base_url(full_url):
     return base_url
 
 
-def find_contact_us_links(soup, url, manager):
+def is_contact_anchor(anchor_text, attrs):
+    # Search in both the visible text and the title attribute of the tag
+    return bool(CONTACT_LINK_PATTERN.search(anchor_text.strip()) or CONTACT_LINK_PATTERN.search(attrs.get('title', '').strip()))
+
+
+def find_contact_us_links(page, url, manager=None):
     base_url = get_base_url(url)
-    contact_pattern = re.compile(r'\b(contact|reach out|get in touch|contact us|contact me|reach us)\b', re.IGNORECASE)
+    links = []
 
-    a_tags = soup.find_all('a')
-    for tag in a_tags:
+    for anchor_text, attrs in page.anchors:
         # Check both the text and the title attribute for matching the contact pattern
-        link_text = tag.text.strip() if tag.text else ''
-        title_attr = tag.get('title', '').strip()
+        link_text = anchor_text.strip()
+        title_attr = attrs.get('title', '').strip()
         
-        # Search in both the visible text and the title attribute of the tag
-        if contact_pattern.search(link_text) or contact_pattern.search(title_attr):
-            href = tag.get('href')
+        if is_contact_anchor(link_text, attrs):
+            href = attrs.get('href')
             
             # Check if href is valid and not empty
             if href and not href.startswith('#') and not href.startswith('mailto:') and not href.startswith('emailto:') and not href.startswith('tel:')  and not href.startswith('javascript:'):
                 full_url = urllib.parse.urljoin(base_url, href)
-                manager.add_url(full_url)
+                links.append((full_url, link_text or title_attr))
+    if manager is not None and links:
+        manager.add_links(links, parent=url)
+    return links
+
+
+# Salutation, first and last name, or a phone's three digit groups: whitespace-free pieces, so a match covers at
+# most this many of a page's stripped strings
+MAX_MATCH_STRINGS = 3
+
+
+def find_next_matches(pattern, strings):
+    # For every string index, the first string at or after it where a match of pattern starts, searching the
+    # page's joined text, plus that match. Each search resumes after the string the last match started in,
+    # so the page is scanned once however deeply its blocks nest
+    text = ' '.join(strings)
+    offsets = []
+    offset = 0
+    for string in strings:
+        offsets.append(offset)
+        offset += len(string) + 1
+    next_index = [len(strings)] * (len(strings) + 1)
+    matches = {}
+    index = 0
+    while index < len(strings):
+        match = pattern.search(text, offsets[index])
+        if not match:
+            break
+        match_index = bisect.bisect_right(offsets, match.start()) - 1
+        matches[match_index] = match
+        for position in range(index, match_index + 1):
+            next_index[position] = match_index
+        index = match_index + 1
+    return next_index, matches
+
+
+def first_match_in_block(pattern, strings, next_index, matches, start, end):
+    # A match starting far enough from the block's end reads the same text as in the whole page. Only in the
+    # block's last strings can the end cut a match short, those few strings are searched within the block alone
+    index = next_index[start]
+    if index <= end - MAX_MATCH_STRINGS:
+        return matches[index]
+    for index in range(max(index, end - MAX_MATCH_STRINGS + 1), end):
+        match = pattern.search(' '.join(strings[index:end]))
+        if match and match.start() < len(strings[index]):
+            return match
+    return None
 
 
-def proximity_based_extraction(soup, url, manager):
+@metrics.timed('extraction')
+def proximity_based_extraction(page, url, manager=None):
     try:
         logging.debug(f"Starting proximety based extraction: {url}")
         contacts = []
         seen_data = set()
 
-        find_contact_us_links(soup, url, manager)
+        if manager is not None:
+            find_contact_us_links(page, url, manager)
 
-        phone_regex = r'\(?\b[0-9]{3}\)?[-. ]?[0-9]{3}[-. ]?[0-9]{4}\b'
-        email_regex = r'(?i)[A-Z0-9._%+-]+@(?:[A-Z0-9-]+\.)+[A-Z]{2,}'
-        name_regex = r"(Mr\.|Mrs\.|Ms\.|Capt\.|Captain|Skipper|CPT|Cap'n)\s+([A-Z][\w'-]+)\s+([A-Z][\w'-]+)?"
+        strings, blocks = page.strings, page.blocks
 
-        potential_blocks = soup.find_all(['div', 'p', 'footer', 'section', 'td', 'span', 'article', 'header', 'aside', 'li'])
-        for block in potential_blocks:
-            text = ' '.join(block.stripped_strings)
+        # Emails cannot contain whitespace, so they never span two strings: scan each string once
+        # and precompute, for every position, the next string that holds an email
+        next_email_index = [len(strings)] * (len(strings) + 1)
+        first_emails = [None] * len(strings)
+        for index in range(len(strings) - 1, -1, -1):
+            email_match = EMAIL_PATTERN.search(strings[index])
+            if email_match:
+                first_emails[index] = email_match.group(0)
+                next_email_index[index] = index
+            else:
+                next_email_index[index] = next_email_index[index + 1]
+        if next_email_index[0] == len(strings):
+            return contacts
 
-            phones = tuple(re.findall(phone_regex, text, re.IGNORECASE))
-            emails = tuple(re.findall(email_regex, text, re.IGNORECASE))
-            names = tuple(re.findall(name_regex, text))
+        # Names and phones can span strings, so they are found once in the page's joined text. An ancestor then
+        # costs no more than its child: it reuses the same matches and only checks the strings at its own end
+        next_name_index, name_matches = find_next_matches(NAME_PATTERN, strings)
+        next_phone_index, phone_matches = None, None
 
-            if emails and names:
-                contact_details = {
-                    'phone': phones[0] if phones else '',
-                    'email': emails[0] if emails else '',
-                    'salutation': names[0][0] if names else '',
-                    'first_name': names[0][1] if names else '',
-                    'last_name': names[0][2] if len(names) > 0 and len(names[0]) > 2 else '',
-                    'source': url
-                }
+        seen_ranges = set()
+        explained = set()
+        for start, end in blocks:
+            # A wrapper with exactly the same text as an already checked block adds nothing new
+            if (start, end) in seen_ranges:
+                continue
+            seen_ranges.add((start, end))
 
-                # Remove duplicates
-                contact_id = frozenset(contact_details.items())
-                if contact_id not in seen_data:
-                    seen_data.add(contact_id)
-                    contacts.append(contact_details)
+            email_index = next_email_index[start]
+            if email_index >= end:
+                continue
+
+            name_match = first_match_in_block(NAME_PATTERN, strings, next_name_index, name_matches, start, end)
+            if not name_match:
+                continue
+            if next_phone_index is None:
+                # Only pages with an email and a name in one block get the phone scan
+                next_phone_index, phone_matches = find_next_matches(PHONE_PATTERN, strings)
+            phone_match = first_match_in_block(PHONE_PATTERN, strings, next_phone_index, phone_matches, start, end)
+
+            # An ancestor that lands on the same email, name and phone as one of its children is already explained
+            match_key = (email_index, name_match.groups(), phone_match.group(0) if phone_match else '')
+            if match_key in explained:
+                continue
+            explained.add(match_key)
+
+            contact_details = {
+                'phone': phone_match.group(0) if phone_match else '',
+                'email': first_emails[email_index],
+                'salutation': name_match.group(1),
+                'first_name': name_match.group(2),
+                'last_name': name_match.group(3) or '',
+                'source': url
+            }
+
+            # Remove duplicates
+            contact_id = frozenset(contact_details.items())
+            if contact_id not in seen_data:
+                seen_data.add(contact_id)
+                contacts.append(contact_details)
 
         logging.debug(f"Contacts found in {url}, {contacts}")
         return contacts
@@ -76,31 +198,104 @@ def proximity_based_extraction(soup, url, manager):
         raise e
 
 
+def has_signals(data):
+    return bool(NAME_SIGNAL_PATTERN.search(data) and (EMAIL_SIGNAL_PATTERN.search(data) or ENCODED_AT_SIGN_PATTERN.search(data)))
+
+
+def has_contact_signals(html_content):
+    # A contact needs an email and a salutation in one block, a page missing either cannot yield one
+    data = html_content.encode('utf-8', errors='replace') if isinstance(html_content, str) else html_content
+    if not has_signals(data):
+        return False
+    # Scripts, styles and comments are never extracted from, so signals only found there do not count either. The
+    # exact strip is slower, it only runs on the pages the quick one would skip
+    if has_signals(QUICK_HIDDEN_CONTENT_BYTES_PATTERN.sub(b' ', data)):
+        return True
+    return has_signals(HIDDEN_CONTENT_BYTES_PATTERN.sub(rb'\g<tag>', data))
+
+
+def parse_page(html_content, parser_backend='html.parser', prefilter=True, stream_above=None):
+    # Pages longer than stream_above characters are streamed instead of parsed whole, keeping only blocks with an
+    # email and a salutation and contact anchors. Pages without contact signals skip the full parse, only their
+    # anchors are read for link discovery
+    if stream_above is not None and len(html_content) > stream_above:
+        return parse_html_streaming(html_content, EMAIL_PATTERN.search, NAME_PATTERN.search, is_contact_anchor)
+    if prefilter and not has_contact_signals(html_content):
+        return parse_anchors(html_content, parser_backend)
+    return parse_html(html_content, parser_backend)
+
+
+def extract_page(html_content, url, parser_backend='html.parser', prefilter=True, stream_above=None):
+    # Module-level so extract worker processes can run it: links are returned instead of added to a manager, along
+    # with how the page was parsed and how much the process RSS grew while it was held
+    page, _, rss_growth = measured(parse_page, html_content, parser_backend, prefilter, stream_above)
+    links = find_contact_us_links(page, url)
+    contacts = proximity_based_extraction(page, url)
+    return contacts, links, page.mode, rss_growth
+
+
+def create_extract_executor(workers):
+    # Extract processes start from a fresh interpreter, or a fork server that runs no threads, never as a fork of a
+    # parent whose search, checkpoint and fetch threads may hold locks the child would inherit
+    start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+    return concurrent.futures.ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method))
+
+
+def standardize_phone(phone, region='US'):
+    if pd.isna(phone) or phone == '':
+        return ""
+    try:
+        phone_number = phonenumbers.parse(phone, region)
+        if phonenumbers.is_valid_number(phone_number):
+            return phonenumbers.format_number(phone_number, phonenumbers.PhoneNumberFormat.NATIONAL)
+        else:
+            return ""
+    except phonenumbers.NumberParseException:
+        logging.warning(f"Failed to standardize: {phone}")
+        return ""
+
+
+def standardize_email(email):
+    if pd.isna(email) or email == '':
+        return ""
+    return email_standardizer.standardize(email)
+
+
+def configure_email_validation(mode='full', cache_filepath=None, resolver=None, ttl=7 * 24 * 60 * 60):
+    deliverability_cache = DomainDeliverabilityCache(cache_filepath, ttl, resolver=resolver) if mode == 'cached' else None
+    email_standardizer.configure(mode, deliverability_cache)
+    # Memoized results were produced under the previous mode
+    cached_standardize_email.cache_clear()
+    return email_standardizer
+
+
+@lru_cache(maxsize=200000)
+def cached_standardize_phone(phone):
+    return standardize_phone(phone)
+
+
+@lru_cache(maxsize=200000)
+def cached_standardize_email(email):
+    return standardize_email(email)
+
+
+def standardize_column(column, standardize):
+    # Each distinct value goes through the memoized standardizer once, then is mapped back onto every row
+    standardized = {value: standardize(value) for value in column.dropna().unique()}
+    return column.map(standardized).fillna("")
+
+
+def log_standardize_cache_stats():
+    for name, cached_function in (('phone', cached_standardize_phone), ('email', cached_standardize_email)):
+        cache_info = cached_function.cache_info()
+        lookups = cache_info.hits + cache_info.misses
+        hit_rate = cache_info.hits / lookups if lookups else 0
+        logging.debug(f"Standardized {name} cache: {cache_info.currsize} values, {hit_rate:.1%} hit rate")
+
+
+@metrics.timed('cleaning')
 def clean_contact_information(all_contacts):
     try:
-        def standardize_phone(phone, region='US'):
-            if pd.isna(phone) or phone == '':
-                return ""
-            try:
-                phone_number = phonenumbers.parse(phone, region)
-                if phonenumbers.is_valid_number(phone_number):
-                    return phonenumbers.format_number(phone_number, phonenumbers.PhoneNumberFormat.NATIONAL)
-                else:
-                    return ""
-            except phonenumbers.NumberParseException:
-                logging.warning(f"Failed to standardize: {phone}")
-                return ""
-
-        def standardize_email(email):
-            if pd.isna(email) or email == '':
-                return ""
-            try:
-                v = validate_email(email)
-                return v.email
-            except EmailNotValidError as e:
-                logging.debug(f"Invalid email: {email}, error: {e}")
-                return ""
-        
         if not all_contacts:
             logging.critical("No contact information provided for cleaning.")
             return pd.DataFrame()
@@ -109,10 +304,13 @@ def clean_contact_information(all_contacts):
         logging.info(f"Cleaning contact information. Length before cleaning: {len(contact_info)}")
         
         # clean phone
-        contact_info['phone'] = contact_info['phone'].apply(standardize_phone)
+        with metrics.timer(stage='standardize_phone'):
+            contact_info['phone'] = standardize_column(contact_info['phone'], cached_standardize_phone)
         
         # clean email
-        contact_info['email'] = contact_info['email'].apply(standardize_email)
+        with metrics.timer(stage='standardize_email'):
+            contact_info['email'] = standardize_column(contact_info['email'], cached_standardize_email)
+        log_standardize_cache_stats()
 
         logging.debug(f"Removing 'webmaster' emails. Length before filtering: {len(contact_info)}")
         contact_info = contact_info[~contact_info['email'].str.contains('webmaster', case=False, na=True)]
@@ -125,7 +323,7 @@ def clean_contact_information(all_contacts):
 
         # remove partial duplicates
         logging.debug(f"Removing partial duplicates. Length before filtering: {len(contact_info)}")
-        contact_info['completeness'] = contact_info.apply(lambda row: row.count(), axis=1)
+        contact_info['completeness'] = count_filled_fields(contact_info)
         contact_info.sort_values(by='completeness', ascending=False, inplace=True)
         contact_info.drop_duplicates(subset='email', keep='first', inplace=True)
         contact_info.drop(columns=['completeness'], inplace=True)
@@ -133,11 +331,40 @@ def clean_contact_information(all_contacts):
 
         logging.info(f"Cleaning complete. Length after cleaning: {len(contact_info)}")
     except Exception as e:
+        metrics.count_error('cleaning', e)
         logging.critical(f"Error cleaning contacts: {e}")
         return all_contacts
     return contact_info
 
 
+@metrics.timed('cleaning')
+def clean_contact_store(sink, chunk_size=50000):
+    # Cleans only the raw rows added since the last pass, chunk by chunk; exact duplicates are
+    # dropped by the store on insert and partial duplicates when the cleaned contacts are read back
+    try:
+        cleaned_through = sink.get_cleaned_through()
+        logging.info(f"Cleaning contact store {sink.filepath}. Raw contacts: {sink.count_raw()}, already cleaned through id {cleaned_through}")
+        for contact_info in sink.read_raw_chunks(cleaned_through, chunk_size):
+            last_id = int(contact_info['id'].iloc[-1])
+            contact_info = contact_info.drop(columns=['id'])
+            with metrics.timer(stage='standardize_phone'):
+                contact_info['phone'] = standardize_column(contact_info['phone'], cached_standardize_phone)
+            with metrics.timer(stage='standardize_email'):
+                contact_info['email'] = standardize_column(contact_info['email'], cached_standardize_email)
+            contact_info = contact_info[~contact_info['email'].str.contains('webmaster', case=False, na=True)]
+            sink.write_cleaned(contact_info, last_id)
+            logging.debug(f"Cleaned contact store through id {last_id}")
+
+        log_standardize_cache_stats()
+        contact_info = sink.read_cleaned()
+        logging.info(f"Cleaning complete. Length after cleaning: {len(contact_info)}")
+        return contact_info
+    except Exception as e:
+        metrics.count_error('cleaning', e)
+        logging.critical(f"Error cleaning contact store: {e}")
+        return pd.DataFrame()
+
+
 def save_to_csv(contacts, filename):
     if contacts.empty:
         logging.critical("No contacts to save in csv.")
@@ -0,0 +1,143 @@
+import collections
+import json
+import logging
+import os
+import threading
+import time
+
+from email_validator import EmailNotValidError, EmailUndeliverableError, validate_email
+from email_validator.deliverability import validate_email_deliverability
+
+
+def resolve_domain_deliverability(domain, timeout=5):
+    # MX lookup with A/AAAA fallback, the same check validate_email runs for every email by default
+    try:
+        validate_email_deliverability(domain, domain, timeout=timeout)
+        return True
+    except EmailUndeliverableError:
+        return False
+
+
+class DomainDeliverabilityCache:
+    def __init__(self, filepath=None, ttl=7 * 24 * 60 * 60, error_ttl=10 * 60, resolver=None):
+        self.filepath = filepath
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.resolver = resolver or resolve_domain_deliverability
+        self.entries = {}
+        self.failed_lookups = {}
+        self.stats = collections.Counter()
+        self.lock = threading.Lock()
+        if filepath:
+            self.load()
+
+    def is_deliverable(self, domain):
+        domain = domain.lower()
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(domain)
+            if entry and now - entry['checked_at'] < self.ttl:
+                self.stats['hits'] += 1
+                return entry['deliverable']
+            if now - self.failed_lookups.get(domain, 0) < self.error_ttl:
+                self.stats['hits'] += 1
+                return True
+            self.stats['misses'] += 1
+
+        start_time = time.time()
+        try:
+            deliverable = self.resolver(domain)
+        except Exception as e:
+            # Without a working resolver (offline machines) nothing is known, so the email is kept
+            logging.debug(f"Deliverability lookup failed for {domain}: {e}")
+            with self.lock:
+                self.failed_lookups[domain] = time.time()
+                self.stats['errors'] += 1
+            return True
+        finally:
+            with self.lock:
+                self.stats['resolve_seconds'] += time.time() - start_time
+
+        with self.lock:
+            self.entries[domain] = {'deliverable': deliverable, 'checked_at': time.time()}
+        return deliverable
+
+    def log_stats(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / lookups if lookups else 0
+        logging.info(
+            f"Email domain cache: {len(self.entries)} domains, {hit_rate:.1%} hit rate, "
+            f"{self.stats['errors']} failed lookups, {self.stats['resolve_seconds']:.1f}s resolving"
+        )
+
+    def load(self):
+        if not os.path.exists(self.filepath):
+            return
+        try:
+            with open(self.filepath, 'r') as file:
+                saved_entries = json.load(file)
+            now = time.time()
+            with self.lock:
+                self.entries.update({
+                    domain: entry for domain, entry in saved_entries.items() if now - entry['checked_at'] < self.ttl
+                })
+            logging.info(f"Loaded {len(self.entries)} email domains from {self.filepath}")
+        except Exception as e:
+            logging.warning(f"Loading email domain cache failed with error: {e}")
+
+    def save(self):
+        if not self.filepath:
+            return
+        with self.lock:
+            saved_entries = dict(self.entries)
+        try:
+            temp_filepath = f"{self.filepath}.tmp"
+            with open(temp_filepath, 'w') as file:
+                json.dump(saved_entries, file)
+            os.replace(temp_filepath, self.filepath)
+            logging.debug(f"Saved {len(saved_entries)} email domains to {self.filepath}")
+        except Exception as e:
+            logging.warning(f"Saving email domain cache failed with error: {e}")
+
+
+class EmailStandardizer:
+    # 'full' is email_validator's default of a DNS lookup for every email, 'cached' does one deliverability
+    # lookup per domain, 'syntax' never touches the network
+    MODES = ('syntax', 'cached', 'full')
+
+    def __init__(self, mode='full', deliverability_cache=None):
+        self.configure(mode, deliverability_cache)
+
+    def configure(self, mode, deliverability_cache=None):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown email validation mode: {mode}")
+        if mode == 'cached' and deliverability_cache is None:
+            deliverability_cache = DomainDeliverabilityCache()
+        self.mode = mode
+        self.deliverability_cache = deliverability_cache
+        self.stats = collections.Counter()
+
+    def standardize(self, email):
+        start_time = time.time()
+        try:
+            v = validate_email(email, check_deliverability=self.mode == 'full')
+            if self.mode == 'cached' and not self.deliverability_cache.is_deliverable(v.ascii_domain):
+                logging.debug(f"Invalid email: {email}, error: The domain name {v.domain} does not accept email.")
+                self.stats['undeliverable'] += 1
+                return ""
+            self.stats['valid'] += 1
+            return v.email
+        except EmailNotValidError as e:
+            logging.debug(f"Invalid email: {email}, error: {e}")
+            self.stats['invalid'] += 1
+            return ""
+        finally:
+            self.stats['seconds'] += time.time() - start_time
+
+    def log_stats(self):
+        logging.info(
+            f"Email validation ({self.mode}): {self.stats['valid']} valid, {self.stats['invalid']} invalid, "
+            f"{self.stats['undeliverable']} undeliverable, {self.stats['seconds']:.1f}s validating"
+        )
+        if self.deliverability_cache:
+            self.deliverability_cache.log_stats()
@@ -0,0 +1,362 @@
+import abc
+import collections
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+
+from src.contact_store import ContactSink, RedisContactSink
+
+
+QUEUED, LEASED, DONE = 0, 1, 2
+
+LeasedURL = collections.namedtuple('LeasedURL', ['url', 'score', 'depth'])
+
+
+def get_worker_id():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FrontierBackend(abc.ABC):
+    # A job's queue and seen set shared by every worker process crawling it. Workers lease URLs, and a lease
+    # that is not acked within visibility_timeout goes back to the queue, so a crashed worker loses nothing.
+    # Tasks are one-off jobs like running the search: one worker claims a task, the rest wait for it to finish
+    @abc.abstractmethod
+    def push(self, url, score=0.0, depth=0):
+        # True when the URL was new to the job and is now queued
+        pass
+
+    def push_many(self, entries):
+        # (url, score, depth) entries, usually one page of links; returns push's result for each
+        return [self.push(url, score, depth) for url, score, depth in entries]
+
+    @abc.abstractmethod
+    def lease(self, worker_id, count, visibility_timeout):
+        # Up to count queued URLs, best score first, as LeasedURL
+        pass
+
+    @abc.abstractmethod
+    def ack(self, url):
+        pass
+
+    @abc.abstractmethod
+    def release(self, urls):
+        # Puts leased URLs straight back in the queue
+        pass
+
+    @abc.abstractmethod
+    def claim_task(self, name, worker_id, timeout):
+        # True when this worker should run the task; claiming again renews a claim it already holds
+        pass
+
+    @abc.abstractmethod
+    def finish_task(self, name):
+        pass
+
+    @abc.abstractmethod
+    def is_drained(self):
+        # Nothing queued, leased or still being produced by a claimed task
+        pass
+
+    @abc.abstractmethod
+    def counts(self):
+        pass
+
+    def create_sink(self, filepath):
+        # Where the job's raw contacts go. Workers on one machine share the store at filepath
+        return ContactSink(filepath)
+
+    def close(self):
+        pass
+
+
+class SQLiteFrontier(FrontierBackend):
+    # Safe for several processes on one machine: WAL lets readers run during a write, and every lease
+    # runs in a BEGIN IMMEDIATE transaction so two workers can never lease the same URL
+    def __init__(self, filepath, job_id):
+        self.filepath = filepath
+        self.job_id = job_id
+        self.lock = threading.Lock()
+        self.connection = sqlite3.connect(filepath, check_same_thread=False, timeout=60, isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.lock:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS frontier_urls (job TEXT, url TEXT, score REAL, depth INTEGER, state INTEGER, "
+                "lease_owner TEXT, lease_expires REAL, PRIMARY KEY (job, url))"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS frontier_urls_queue ON frontier_urls (job, state, score)")
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS frontier_tasks (job TEXT, name TEXT, owner TEXT, expires REAL, done INTEGER, "
+                "PRIMARY KEY (job, name))"
+            )
+
+    def transaction(self, statements):
+        # statements(connection) runs inside one write transaction, rolled back if it raises
+        with self.lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                result = statements(self.connection)
+            except Exception as e:
+                self.connection.execute("ROLLBACK")
+                raise e
+            self.connection.execute("COMMIT")
+            return result
+
+    def push(self, url, score=0.0, depth=0):
+        with self.lock:
+            return self.connection.execute(
+                "INSERT OR IGNORE INTO frontier_urls (job, url, score, depth, state) VALUES (?, ?, ?, ?, ?)",
+                (self.job_id, url, score, depth, QUEUED),
+            ).rowcount == 1
+
+    def push_many(self, entries):
+        # One transaction for the batch instead of a commit per URL
+        def statements(connection):
+            return [
+                connection.execute(
+                    "INSERT OR IGNORE INTO frontier_urls (job, url, score, depth, state) VALUES (?, ?, ?, ?, ?)",
+                    (self.job_id, url, score, depth, QUEUED),
+                ).rowcount == 1
+                for url, score, depth in entries
+            ]
+
+        return self.transaction(statements) if entries else []
+
+    def lease(self, worker_id, count, visibility_timeout):
+        def statements(connection):
+            now = time.time()
+            requeued = connection.execute(
+                "UPDATE frontier_urls SET state = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE job = ? AND state = ? AND lease_expires < ?",
+                (QUEUED, self.job_id, LEASED, now),
+            ).rowcount
+            if requeued:
+                logging.info(f"Requeued {requeued} URLs whose lease expired")
+            rows = connection.execute(
+                "SELECT url, score, depth FROM frontier_urls WHERE job = ? AND state = ? ORDER BY score DESC LIMIT ?",
+                (self.job_id, QUEUED, count),
+            ).fetchall()
+            connection.executemany(
+                "UPDATE frontier_urls SET state = ?, lease_owner = ?, lease_expires = ? WHERE job = ? AND url = ?",
+                [(LEASED, worker_id, now + visibility_timeout, self.job_id, url) for url, _, _ in rows],
+            )
+            return [LeasedURL(*row) for row in rows]
+
+        return self.transaction(statements)
+
+    def ack(self, url):
+        with self.lock:
+            self.connection.execute(
+                "UPDATE frontier_urls SET state = ?, lease_owner = NULL, lease_expires = NULL WHERE job = ? AND url = ?",
+                (DONE, self.job_id, url),
+            )
+
+    def release(self, urls):
+        def statements(connection):
+            connection.executemany(
+                "UPDATE frontier_urls SET state = ?, lease_owner = NULL, lease_expires = NULL "
+                "WHERE job = ? AND url = ? AND state = ?",
+                [(QUEUED, self.job_id, url, LEASED) for url in urls],
+            )
+
+        self.transaction(statements)
+
+    def claim_task(self, name, worker_id, timeout):
+        def statements(connection):
+            row = connection.execute(
+                "SELECT owner, expires, done FROM frontier_tasks WHERE job = ? AND name = ?", (self.job_id, name)
+            ).fetchone()
+            now = time.time()
+            if row and (row[2] or (row[0] != worker_id and row[1] > now)):
+                return False
+            connection.execute(
+                "INSERT OR REPLACE INTO frontier_tasks (job, name, owner, expires, done) VALUES (?, ?, ?, ?, 0)",
+                (self.job_id, name, worker_id, now + timeout),
+            )
+            return True
+
+        return self.transaction(statements)
+
+    def finish_task(self, name):
+        with self.lock:
+            self.connection.execute("UPDATE frontier_tasks SET done = 1 WHERE job = ? AND name = ?", (self.job_id, name))
+
+    def is_drained(self):
+        with self.lock:
+            pending_url = self.connection.execute(
+                "SELECT 1 FROM frontier_urls WHERE job = ? AND state IN (?, ?) LIMIT 1", (self.job_id, QUEUED, LEASED)
+            ).fetchone()
+            running_task = self.connection.execute(
+                "SELECT 1 FROM frontier_tasks WHERE job = ? AND done = 0 AND expires > ? LIMIT 1", (self.job_id, time.time())
+            ).fetchone()
+        return not pending_url and not running_task
+
+    def counts(self):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT state, COUNT(*) FROM frontier_urls WHERE job = ? GROUP BY state", (self.job_id,)
+            ).fetchall()
+        counts = dict(rows)
+        return {'queued': counts.get(QUEUED, 0), 'leased': counts.get(LEASED, 0), 'done': counts.get(DONE, 0),
+                'seen': sum(counts.values())}
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+
+class RedisFrontier(FrontierBackend):
+    # For workers on several machines. Takes any redis-py compatible client, so redis.Redis in production and a
+    # local stand-in such as fakeredis in tests. Keys: a set of seen URLs, a sorted set queue scored by priority,
+    # a sorted set of leases scored by expiry and a hash of each URL's score and depth. Every change spanning
+    # more than one key is a WATCH/MULTI/EXEC transaction rather than a script, so fakeredis needs no Lua; needs Redis 6.2+
+    def __init__(self, client, job_id, prefix='scraper'):
+        self.client = client
+        self.job_id = job_id
+        key_prefix = f"{prefix}:{job_id}"
+        self.seen_key = f"{key_prefix}:seen"
+        self.queue_key = f"{key_prefix}:queue"
+        self.leases_key = f"{key_prefix}:leases"
+        self.entries_key = f"{key_prefix}:entries"
+        self.done_key = f"{key_prefix}:done"
+        self.tasks_key = f"{key_prefix}:tasks"
+        self.contacts_key = f"{key_prefix}:contacts"
+
+    @staticmethod
+    def decode(value):
+        return value.decode('utf-8') if isinstance(value, bytes) else value
+
+    def transaction(self, statements, *keys):
+        # statements(pipeline) reads with keys watched, then calls pipeline.multi() and queues its writes, which
+        # EXEC applies all at once. redis-py runs it again if another worker changed a watched key in between,
+        # so a worker that dies part way leaves either none or all of the writes behind
+        return self.client.transaction(statements, *keys, value_from_callable=True)
+
+    def push(self, url, score=0.0, depth=0):
+        return self.push_many([(url, score, depth)])[0]
+
+    def push_many(self, entries):
+        # The seen set, entries and queue change in one transaction, so a URL is never seen but not queued
+        if not entries:
+            return []
+        entries = list(entries)
+        urls = list(dict.fromkeys(url for url, _, _ in entries))
+
+        def statements(pipeline):
+            seen = dict(zip(urls, pipeline.smismember(self.seen_key, urls)))
+            added = []
+            new_entries = {}
+            for url, score, depth in entries:
+                is_new = not seen[url] and url not in new_entries
+                added.append(is_new)
+                if is_new:
+                    new_entries[url] = (score, depth)
+            pipeline.multi()
+            if new_entries:
+                pipeline.sadd(self.seen_key, *new_entries)
+                pipeline.hset(self.entries_key, mapping={url: json.dumps([score, depth]) for url, (score, depth) in new_entries.items()})
+                pipeline.zadd(self.queue_key, {url: score for url, (score, _) in new_entries.items()})
+            return added
+
+        return self.transaction(statements, self.seen_key)
+
+    def requeue_expired(self):
+        def statements(pipeline):
+            expired = [self.decode(url) for url in pipeline.zrangebyscore(self.leases_key, 0, time.time())]
+            scores = self.get_scores(expired, pipeline) if expired else {}
+            pipeline.multi()
+            if expired:
+                pipeline.zrem(self.leases_key, *expired)
+                pipeline.zadd(self.queue_key, scores)
+            return len(expired)
+
+        requeued = self.transaction(statements, self.leases_key)
+        if requeued:
+            logging.info(f"Requeued {requeued} URLs whose lease expired")
+
+    def get_scores(self, urls, client=None):
+        entries = (client or self.client).hmget(self.entries_key, urls)
+        return {url: json.loads(self.decode(entry))[0] if entry else 0.0 for url, entry in zip(urls, entries)}
+
+    def lease(self, worker_id, count, visibility_timeout):
+        self.requeue_expired()
+
+        def statements(pipeline):
+            best = pipeline.zrevrange(self.queue_key, 0, count - 1, withscores=True)
+            urls = [self.decode(url) for url, _ in best]
+            entries = pipeline.hmget(self.entries_key, urls) if urls else []
+            pipeline.multi()
+            if urls:
+                pipeline.zrem(self.queue_key, *urls)
+                pipeline.zadd(self.leases_key, {url: time.time() + visibility_timeout for url in urls})
+            return [
+                LeasedURL(url, score, json.loads(self.decode(entry))[1] if entry else 0)
+                for url, (_, score), entry in zip(urls, best, entries)
+            ]
+
+        return self.transaction(statements, self.queue_key, self.leases_key)
+
+    def ack(self, url):
+        def statements(pipeline):
+            leased = pipeline.zscore(self.leases_key, url) is not None
+            pipeline.multi()
+            if leased:
+                pipeline.zrem(self.leases_key, url)
+                pipeline.incr(self.done_key)
+
+        self.transaction(statements, self.leases_key)
+
+    def release(self, urls):
+        def statements(pipeline):
+            released = [url for url in urls if pipeline.zscore(self.leases_key, url) is not None]
+            scores = self.get_scores(released, pipeline) if released else {}
+            pipeline.multi()
+            if released:
+                pipeline.zrem(self.leases_key, *released)
+                pipeline.zadd(self.queue_key, scores)
+
+        self.transaction(statements, self.leases_key)
+
+    def claim_task(self, name, worker_id, timeout):
+        def statements(pipeline):
+            task = pipeline.hget(self.tasks_key, name)
+            task = json.loads(self.decode(task)) if task is not None else None
+            claimed = task is None or not (task['done'] or (task['owner'] != worker_id and task['expires'] > time.time()))
+            pipeline.multi()
+            if claimed:
+                pipeline.hset(self.tasks_key, name, json.dumps({'owner': worker_id, 'expires': time.time() + timeout, 'done': False}))
+            return claimed
+
+        return self.transaction(statements, self.tasks_key)
+
+    def finish_task(self, name):
+        def statements(pipeline):
+            task = pipeline.hget(self.tasks_key, name)
+            task = json.loads(self.decode(task)) if task is not None else {'owner': None, 'expires': 0}
+            pipeline.multi()
+            pipeline.hset(self.tasks_key, name, json.dumps(dict(task, done=True)))
+
+        self.transaction(statements, self.tasks_key)
+
+    def is_drained(self):
+        if self.client.zcard(self.queue_key) or self.client.zcard(self.leases_key):
+            return False
+        now = time.time()
+        tasks = (json.loads(self.decode(task)) for task in self.client.hvals(self.tasks_key))
+        return not any(not task['done'] and task['expires'] > now for task in tasks)
+
+    def create_sink(self, filepath):
+        # Workers on other machines cannot see filepath, so raw contacts are pushed to the job's list in Redis
+        return RedisContactSink(filepath, self.client, self.contacts_key)
+
+    def counts(self):
+        return {
+            'queued': self.client.zcard(self.queue_key),
+            'leased': self.client.zcard(self.leases_key),
+            'done': int(self.client.get(self.done_key) or 0),
+            'seen': self.client.scard(self.seen_key),
+        }
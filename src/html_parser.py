@@ -0,0 +1,383 @@
+import collections
+from html.parser import HTMLParser
+
+from bs4 import BeautifulSoup
+from bs4.builder import HTMLTreeBuilder
+from bs4.element import CData, NavigableString, Tag
+
+try:
+    import lxml.html
+except ImportError:
+    lxml = None
+
+try:
+    from selectolax.lexbor import LexborHTMLParser
+except ImportError:
+    LexborHTMLParser = None
+
+
+BLOCK_TAGS = frozenset(['div', 'p', 'footer', 'section', 'td', 'span', 'article', 'header', 'aside', 'li'])
+# Same string types Tag.stripped_strings yields for these tags, so script/style/comment text is skipped
+TEXT_TYPES = (NavigableString, CData)
+# Tags whose content html.parser stores as Script/Stylesheet/TemplateString rather than plain text
+RAW_TEXT_TAGS = frozenset(['script', 'style', 'template'])
+# BeautifulSoup closes these as soon as they open, and stores text inside these as something other than plain text
+VOID_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_EMPTY_ELEMENT_TAGS)
+HIDDEN_STRING_TAGS = frozenset(HTMLTreeBuilder.DEFAULT_STRING_CONTAINERS)
+
+START, TEXT, END = 0, 1, 2
+
+# Resident memory a full parse takes per character of HTML, measured on the benchmark corpus
+PARSE_MEMORY_FACTORS = {'html.parser': 40, 'lxml': 20, 'selectolax': 20}
+
+# mode is 'full', 'links' for pages that only had their anchors read, or 'stream' for pages too big to parse whole,
+# which keep only the blocks and anchors that passed their filters
+ParsedPage = collections.namedtuple('ParsedPage', ['strings', 'blocks', 'anchors', 'mode'], defaults=['full'])
+
+
+def bs4_events(html_content):
+    soup = BeautifulSoup(html_content, 'html.parser')
+    stack = [(iter(soup.contents), None)]
+    while stack:
+        children, tag_name = stack[-1]
+        child = next(children, None)
+        if child is None:
+            stack.pop()
+            if tag_name is not None:
+                yield END, tag_name, None
+            continue
+        if isinstance(child, Tag):
+            attrs = {key: ' '.join(value) if isinstance(value, list) else value for key, value in child.attrs.items()}
+            yield START, child.name, attrs
+            stack.append((iter(child.contents), child.name))
+        elif type(child) in TEXT_TYPES:
+            yield TEXT, str(child), None
+
+
+def lxml_events(html_content):
+    try:
+        parser = lxml.html.HTMLParser(encoding='utf-8')
+        root = lxml.html.document_fromstring(html_content.encode('utf-8', errors='replace'), parser=parser)
+    except Exception:
+        # lxml refuses empty or whitespace-only documents
+        return
+    stack = [(iter([root]), None)]
+    while stack:
+        children, parent = stack[-1]
+        element = next(children, None)
+        if element is None:
+            stack.pop()
+            if parent is not None:
+                yield END, parent.tag, None
+                if parent.tail:
+                    yield TEXT, parent.tail, None
+            continue
+        if not isinstance(element.tag, str):
+            # Comments and processing instructions only contribute their tail text
+            if element.tail:
+                yield TEXT, element.tail, None
+            continue
+        yield START, element.tag, dict(element.attrib)
+        if element.tag in RAW_TEXT_TAGS:
+            yield END, element.tag, None
+            if element.tail:
+                yield TEXT, element.tail, None
+            continue
+        if element.text:
+            yield TEXT, element.text, None
+        stack.append((iter(element), element))
+
+
+def selectolax_events(html_content):
+    root = LexborHTMLParser(html_content).root
+    if root is None:
+        return
+    stack = [(root, False)]
+    while stack:
+        node, closing = stack.pop()
+        tag_name = node.tag
+        if closing:
+            yield END, tag_name, None
+        elif tag_name == '-text':
+            yield TEXT, node.text_content, None
+        elif not tag_name.startswith(('-', '_')):
+            attrs = {key: value if value is not None else '' for key, value in node.attributes.items()}
+            yield START, tag_name, attrs
+            stack.append((node, True))
+            if tag_name not in RAW_TEXT_TAGS:
+                children = list(node.iter(include_text=True))
+                stack.extend((child, False) for child in reversed(children))
+
+
+BACKENDS = {
+    'html.parser': bs4_events,
+    'lxml': lxml_events,
+    'selectolax': selectolax_events,
+}
+
+
+def get_available_backends():
+    available = ['html.parser']
+    if lxml is not None:
+        available.append('lxml')
+    if LexborHTMLParser is not None:
+        available.append('selectolax')
+    return available
+
+
+def parse_html(html_content, backend='html.parser'):
+    # Flattens the page into every stripped string once, block [start, end) ranges into those
+    # strings in document order, and (text, attributes) for every anchor
+    if backend not in get_available_backends():
+        raise ValueError(f"Parser backend not available: {backend}")
+
+    strings = []
+    blocks = []
+    anchors = []
+    open_elements = []
+    open_anchors = []
+    for event, value, attrs in BACKENDS[backend](html_content):
+        if event == TEXT:
+            for anchor_text in open_anchors:
+                anchor_text.append(value)
+            text = value.strip()
+            if text:
+                strings.append(text)
+        elif event == START:
+            block = None
+            if value in BLOCK_TAGS:
+                block = [len(strings), len(strings)]
+                blocks.append(block)
+            anchor_text = None
+            if value == 'a':
+                anchor_text = []
+                open_anchors.append(anchor_text)
+                anchors.append((anchor_text, attrs))
+            open_elements.append((block, anchor_text))
+        elif open_elements:
+            block, anchor_text = open_elements.pop()
+            if block is not None:
+                block[1] = len(strings)
+            if anchor_text is not None:
+                open_anchors.pop()
+
+    blocks = [(start, end) for start, end in blocks]
+    anchors = [(''.join(anchor_text), attrs) for anchor_text, attrs in anchors]
+    return ParsedPage(strings, blocks, anchors)
+
+
+class AnchorCollector(HTMLParser):
+    # Reads only the anchors, with the same text and attributes the html.parser backend gives them, and builds no tree
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.anchors = []
+        self.open_elements = []
+        self.open_anchors = []
+        self.hidden_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            return
+        anchor_text = None
+        if tag == 'a':
+            anchor_text = []
+            self.open_anchors.append(anchor_text)
+            self.anchors.append((anchor_text, {key: value if value is not None else '' for key, value in attrs}))
+        if tag in HIDDEN_STRING_TAGS:
+            self.hidden_depth += 1
+        self.open_elements.append((tag, anchor_text))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        # Like BeautifulSoup, an end tag closes everything opened after its start tag and a stray one is ignored
+        for index in range(len(self.open_elements) - 1, -1, -1):
+            if self.open_elements[index][0] == tag:
+                for closed_tag, anchor_text in self.open_elements[index:]:
+                    if anchor_text is not None:
+                        self.open_anchors.pop()
+                    if closed_tag in HIDDEN_STRING_TAGS:
+                        self.hidden_depth -= 1
+                del self.open_elements[index:]
+                return
+
+    def handle_data(self, data):
+        if not self.hidden_depth:
+            for anchor_text in self.open_anchors:
+                anchor_text.append(data)
+
+
+def parse_anchors(html_content, backend='html.parser'):
+    # The link-only pass for pages with nothing to extract: no strings or blocks, just (text, attributes) per anchor.
+    # html.parser skips building the BeautifulSoup tree, the compiled backends already parse faster than that
+    if backend not in get_available_backends():
+        raise ValueError(f"Parser backend not available: {backend}")
+
+    if backend == 'html.parser':
+        collector = AnchorCollector()
+        collector.feed(html_content)
+        collector.close()
+        anchors = collector.anchors
+    else:
+        anchors = []
+        open_anchors = []
+        open_elements = []
+        for event, value, attrs in BACKENDS[backend](html_content):
+            if event == TEXT:
+                for anchor_text in open_anchors:
+                    anchor_text.append(value)
+            elif event == START:
+                anchor_text = None
+                if value == 'a':
+                    anchor_text = []
+                    open_anchors.append(anchor_text)
+                    anchors.append((anchor_text, attrs))
+                open_elements.append(anchor_text)
+            elif open_elements and open_elements.pop() is not None:
+                open_anchors.pop()
+
+    anchors = [(''.join(anchor_text), attrs) for anchor_text, attrs in anchors]
+    return ParsedPage([], [], anchors, mode='links')
+
+
+class StreamingPageParser(HTMLParser):
+    # For pages too big to parse whole: fed in chunks, it follows the html.parser backend's strings and blocks without
+    # building a tree, and judges each block and anchor as it closes so only the ones that pass are kept. A string is
+    # dropped once no open block still needs it, and blocks and anchors keep at most max_block_chars of text.
+    # string_filter(string) marks a block worth joining, block_filter(text) and anchor_filter(text, attrs) keep one
+    def __init__(self, string_filter, block_filter, anchor_filter, max_block_chars=64 * 1024):
+        super().__init__(convert_charrefs=True)
+        self.string_filter = string_filter
+        self.block_filter = block_filter
+        self.anchor_filter = anchor_filter
+        self.max_block_chars = max_block_chars
+        self.string_count = 0
+        self.opened_count = 0
+        self.pending_text = []
+        self.open_elements = []
+        self.open_blocks = []
+        self.open_anchors = []
+        self.hidden_depth = 0
+        # (start, end) string range -> [open order, text], so nested wrappers with the same text count once
+        self.kept_blocks = {}
+        self.kept_anchors = []
+
+    def flush_text(self):
+        # BeautifulSoup merges the text between two tags into one string, chunk boundaries split it here
+        if not self.pending_text:
+            return
+        value = ''.join(self.pending_text)
+        self.pending_text = []
+        if self.hidden_depth:
+            return
+        for anchor in self.open_anchors:
+            if anchor[2] < self.max_block_chars:
+                anchor[1].append(value)
+                anchor[2] += len(value)
+        text = value.strip()
+        if not text:
+            return
+        self.string_count += 1
+        marked = None
+        for block in self.open_blocks:
+            if block[3] < self.max_block_chars:
+                if marked is None:
+                    marked = bool(self.string_filter(text))
+                block[2].append(text)
+                block[3] += len(text) + 1
+                block[4] = block[4] or marked
+
+    def handle_starttag(self, tag, attrs):
+        self.flush_text()
+        if tag in VOID_TAGS:
+            return
+        self.opened_count += 1
+        block = None
+        if tag in BLOCK_TAGS:
+            # [open order, start, strings, characters, holds a marked string]
+            block = [self.opened_count, self.string_count, [], 0, False]
+            self.open_blocks.append(block)
+        anchor = None
+        if tag == 'a':
+            # [open order, text parts, characters, attributes]
+            anchor = [self.opened_count, [], 0, {key: value if value is not None else '' for key, value in attrs}]
+            self.open_anchors.append(anchor)
+        if tag in HIDDEN_STRING_TAGS:
+            self.hidden_depth += 1
+        self.open_elements.append((tag, block, anchor))
+
+    def handle_startendtag(self, tag, attrs):
+        self.handle_starttag(tag, attrs)
+        self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self.flush_text()
+        for index in range(len(self.open_elements) - 1, -1, -1):
+            if self.open_elements[index][0] == tag:
+                self.close_elements(index)
+                return
+
+    def close_elements(self, index):
+        # Innermost first, like BeautifulSoup closing everything opened after the matching start tag
+        for closed_tag, block, anchor in reversed(self.open_elements[index:]):
+            if block is not None:
+                self.open_blocks.pop()
+                self.close_block(block)
+            if anchor is not None:
+                self.open_anchors.pop()
+                text = ''.join(anchor[1])
+                if self.anchor_filter(text, anchor[3]):
+                    self.kept_anchors.append((anchor[0], text, anchor[3]))
+            if closed_tag in HIDDEN_STRING_TAGS:
+                self.hidden_depth -= 1
+        del self.open_elements[index:]
+
+    def close_block(self, block):
+        opened, start, strings, _, marked = block
+        if not marked:
+            return
+        block_range = (start, self.string_count)
+        kept = self.kept_blocks.get(block_range)
+        if kept is not None:
+            kept[0] = min(kept[0], opened)
+            return
+        text = ' '.join(strings)
+        if self.block_filter(text):
+            self.kept_blocks[block_range] = [opened, text]
+
+    def handle_data(self, data):
+        self.pending_text.append(data)
+
+    def handle_comment(self, data):
+        self.flush_text()
+
+    def handle_decl(self, decl):
+        self.flush_text()
+
+    def handle_pi(self, data):
+        self.flush_text()
+
+    def unknown_decl(self, data):
+        self.flush_text()
+
+    def close(self):
+        super().close()
+        self.flush_text()
+        self.close_elements(0)
+
+
+def parse_html_streaming(html_content, string_filter, block_filter, anchor_filter, max_block_chars=64 * 1024,
+                         chunk_size=64 * 1024):
+    # Each kept block becomes one string and a one-string block, in the order a full parse lists them, so
+    # extraction runs on the result unchanged. Blocks longer than max_block_chars are judged on their start
+    parser = StreamingPageParser(string_filter, block_filter, anchor_filter, max_block_chars)
+    for offset in range(0, len(html_content), chunk_size):
+        parser.feed(html_content[offset:offset + chunk_size])
+    parser.close()
+    kept_blocks = sorted(parser.kept_blocks.values())
+    strings = [text for _, text in kept_blocks]
+    blocks = [(index, index + 1) for index in range(len(strings))]
+    anchors = [(text, attrs) for _, text, attrs in sorted(parser.kept_anchors, key=lambda anchor: anchor[0])]
+    return ParsedPage(strings, blocks, anchors, mode='stream')
@@ -0,0 +1,297 @@
+import bisect
+import functools
+import http.server
+import json
+import logging
+import os
+import random
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+DEFAULT_RESERVOIR_SIZE = 4096
+
+
+class NullTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+NULL_TIMER = NullTimer()
+
+
+class Timer:
+    def __init__(self, registry, name, labels):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.registry.observe(self.name, time.perf_counter() - self.start_time, **self.labels)
+        return False
+
+
+class Histogram:
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, quantile):
+        # Upper bound of the bucket holding the quantile, the same estimate histogram_quantile gives
+        if not self.count:
+            return 0.0
+        rank = quantile * self.count
+        cumulative = 0
+        for index, bucket_count in enumerate(self.counts):
+            cumulative += bucket_count
+            if cumulative >= rank:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+class Reservoir:
+    # Exact count and sum, plus a uniform sample of at most size values for percentiles, so a long crawl keeps
+    # its latency stats in fixed memory
+    def __init__(self, size=DEFAULT_RESERVOIR_SIZE):
+        self.size = size
+        self.values = []
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.count += 1
+        self.sum += value
+        if len(self.values) < self.size:
+            self.values.append(value)
+            return
+        index = random.randrange(self.count)
+        if index < self.size:
+            self.values[index] = value
+
+    def mean(self):
+        return self.sum / self.count if self.count else 0.0
+
+    def percentiles(self, percentiles):
+        values = sorted(self.values)
+        if not values:
+            return {percentile: 0.0 for percentile in percentiles}
+        return {percentile: values[min(len(values) - 1, round(percentile / 100 * (len(values) - 1)))] for percentile in percentiles}
+
+
+class MetricsRegistry:
+    # Every recording method returns straight away while disabled, so instrumented hot paths cost one attribute check
+    def __init__(self, prefix='scraper', enabled=False):
+        self.prefix = prefix
+        self.enabled = enabled
+        self.counters = {}
+        self.histograms = {}
+        self.gauges = {}
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def get_key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = self.get_key(name, labels)
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, name, value, **labels):
+        if not self.enabled:
+            return
+        key = self.get_key(name, labels)
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram()
+            histogram.observe(value)
+
+    def observe_stages(self, stage_seconds):
+        # Stage timings measured in a worker process, whose own registry never reaches this one
+        for stage, seconds in stage_seconds.items():
+            self.observe('stage_seconds', seconds, stage=stage)
+
+    def timer(self, name='stage_seconds', **labels):
+        if not self.enabled:
+            return NULL_TIMER
+        return Timer(self, name, labels)
+
+    def timed(self, stage):
+        # Decorator timing every call and counting its exceptions by type
+        def decorator(function):
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                start_time = time.perf_counter()
+                try:
+                    return function(*args, **kwargs)
+                except Exception as e:
+                    self.count_error(stage, e)
+                    raise
+                finally:
+                    self.observe('stage_seconds', time.perf_counter() - start_time, stage=stage)
+            return wrapper
+        return decorator
+
+    def count_error(self, stage, error):
+        self.inc('errors_total', stage=stage, exception=type(error).__name__)
+
+    def set_gauge(self, name, value):
+        # value is a number or a function read at snapshot time
+        with self.lock:
+            self.gauges[name] = value
+
+    def reset(self):
+        with self.lock:
+            self.counters.clear()
+            self.histograms.clear()
+            self.gauges.clear()
+
+    def read_gauges(self):
+        with self.lock:
+            gauges = dict(self.gauges)
+        values = {}
+        for name, value in gauges.items():
+            try:
+                values[name] = value() if callable(value) else value
+            except Exception as e:
+                logging.debug(f"Reading gauge {name} failed: {e}")
+        return values
+
+    @staticmethod
+    def format_labels(labels):
+        return '{' + ','.join(f'{label}="{value}"' for label, value in labels) + '}' if labels else ''
+
+    def snapshot(self):
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {
+                key: {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    'mean': histogram.sum / histogram.count if histogram.count else 0.0,
+                    'p50': histogram.quantile(0.5),
+                    'p99': histogram.quantile(0.99),
+                }
+                for key, histogram in self.histograms.items()
+            }
+        return {
+            'written_at': time.time(),
+            'counters': {f"{name}{self.format_labels(labels)}": value for (name, labels), value in sorted(counters.items())},
+            'histograms': {f"{name}{self.format_labels(labels)}": value for (name, labels), value in sorted(histograms.items())},
+            'gauges': self.read_gauges(),
+        }
+
+    def to_prometheus(self):
+        lines = []
+        with self.lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted(
+                (key, histogram.buckets, list(histogram.counts), histogram.count, histogram.sum)
+                for key, histogram in self.histograms.items()
+            )
+        typed = set()
+        for (name, labels), value in counters:
+            if name not in typed:
+                lines.append(f"# TYPE {self.prefix}_{name} counter")
+                typed.add(name)
+            lines.append(f"{self.prefix}_{name}{self.format_labels(labels)} {value}")
+        for (name, labels), buckets, counts, count, total in histograms:
+            if name not in typed:
+                lines.append(f"# TYPE {self.prefix}_{name} histogram")
+                typed.add(name)
+            cumulative = 0
+            for bucket, bucket_count in zip(list(buckets) + ['+Inf'], counts):
+                cumulative += bucket_count
+                lines.append(f"{self.prefix}_{name}_bucket{self.format_labels(labels + (('le', bucket),))} {cumulative}")
+            lines.append(f"{self.prefix}_{name}_sum{self.format_labels(labels)} {total}")
+            lines.append(f"{self.prefix}_{name}_count{self.format_labels(labels)} {count}")
+        for name, value in sorted(self.read_gauges().items()):
+            lines.append(f"# TYPE {self.prefix}_{name} gauge")
+            lines.append(f"{self.prefix}_{name} {value}")
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsReporter:
+    def __init__(self, registry, filepath=None, interval=30, port=None):
+        self.registry = registry
+        self.filepath = filepath
+        self.interval = interval
+        self.port = port
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.server = None
+
+    def start(self):
+        if self.filepath:
+            self.thread = threading.Thread(target=self.run, name="metrics-reporter", daemon=True)
+            self.thread.start()
+        if self.port is not None:
+            self.start_server()
+
+    def run(self):
+        while not self.stop_event.wait(self.interval):
+            self.write_snapshot()
+
+    def write_snapshot(self):
+        try:
+            temp_filepath = f"{self.filepath}.tmp"
+            with open(temp_filepath, 'w') as file:
+                json.dump(self.registry.snapshot(), file, indent=2)
+            os.replace(temp_filepath, self.filepath)
+        except Exception as e:
+            logging.warning(f"Writing metrics snapshot failed with error: {e}")
+
+    def start_server(self):
+        registry = self.registry
+
+        class MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer(('127.0.0.1', self.port), MetricsHandler)
+        self.server.daemon_threads = True
+        threading.Thread(target=self.server.serve_forever, name="metrics-server", daemon=True).start()
+        logging.info(f"Serving metrics at http://127.0.0.1:{self.server.server_address[1]}/metrics")
+
+    def stop(self):
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join()
+        if self.filepath:
+            self.write_snapshot()
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+
+
+metrics = MetricsRegistry()
@@ -0,0 +1,115 @@
+import collections
+import hashlib
+import html
+import logging
+import re
+import threading
+import time
+
+import numpy as np
+
+from src.data_processing import EMAIL_PATTERN, PHONE_PATTERN
+from src.metrics import metrics
+
+
+HIDDEN_CONTENT_PATTERN = re.compile(r'(?is)<(script|style|noscript|template)\b.*?</\1\s*>|<!--.*?-->')
+TAG_PATTERN = re.compile(r'(?s)<[^>]*>')
+WORD_PATTERN = re.compile(r'\w+')
+
+Fingerprint = collections.namedtuple('Fingerprint', ['simhash', 'contacts'])
+
+
+def visible_text(html_content):
+    # Regex approximation of the rendered text, close enough to fingerprint without parsing
+    text = HIDDEN_CONTENT_PATTERN.sub(' ', html_content)
+    return html.unescape(TAG_PATTERN.sub(' ', text))
+
+
+def simhash(words, shingle_size=3):
+    shingles = [' '.join(words[index:index + shingle_size]) for index in range(max(1, len(words) - shingle_size + 1))]
+    digests = b''.join(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest() for shingle in shingles)
+    # One row of 64 bits per shingle; a fingerprint bit is set when most shingles have it set
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8).reshape(-1, 8), axis=1)
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority).tobytes(), 'big')
+
+
+def fingerprint_page(html_content, min_words=50):
+    # None for pages too short to fingerprint reliably, nearly empty pages all look alike
+    text = visible_text(html_content)
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < min_words:
+        return None
+    # Pages from one template that list different people must never be merged, so their contact details are part
+    # of the fingerprint and have to match exactly
+    contacts = frozenset(EMAIL_PATTERN.findall(text.lower())) | frozenset(
+        re.sub(r'\D', '', phone) for phone in PHONE_PATTERN.findall(text)
+    )
+    contacts_digest = hashlib.blake2b(' '.join(sorted(contacts)).encode('utf-8'), digest_size=8).hexdigest()
+    return Fingerprint(simhash(words), contacts_digest)
+
+
+class NearDuplicateIndex:
+    # Simhash fingerprints split into bands, so any two within max_distance bits share at least one band exactly
+    def __init__(self, max_distance=6, min_words=50):
+        self.max_distance = max_distance
+        self.min_words = min_words
+        self.bands = max_distance + 1
+        self.band_bits = 64 // self.bands
+        self.band_tables = [collections.defaultdict(list) for _ in range(self.bands)]
+        self.count = 0
+        self.stats = collections.Counter()
+        self.lock = threading.Lock()
+
+    def get_band_keys(self, value):
+        mask = (1 << self.band_bits) - 1
+        return [(value >> (band * self.band_bits)) & mask for band in range(self.bands)]
+
+    def find(self, fingerprint):
+        for band_table, band_key in zip(self.band_tables, self.get_band_keys(fingerprint.simhash)):
+            for simhash_value, contacts, url in band_table.get(band_key, ()):
+                if contacts == fingerprint.contacts and bin(simhash_value ^ fingerprint.simhash).count('1') <= self.max_distance:
+                    return url
+        return None
+
+    def add(self, fingerprint, url):
+        for band_table, band_key in zip(self.band_tables, self.get_band_keys(fingerprint.simhash)):
+            band_table[band_key].append((fingerprint.simhash, fingerprint.contacts, url))
+        self.count += 1
+
+    def check(self, url, html_content):
+        # Returns the URL of an already processed page this one nearly duplicates, or None after recording it
+        start_time = time.perf_counter()
+        try:
+            fingerprint = fingerprint_page(html_content, self.min_words)
+            if fingerprint is None:
+                self.stats['too_short'] += 1
+                return None
+            with self.lock:
+                original_url = self.find(fingerprint)
+                if original_url is None:
+                    self.add(fingerprint, url)
+                    return None
+                self.stats['duplicates'] += 1
+            metrics.inc('duplicate_pages_total')
+            logging.debug(f"Near duplicate of {original_url}, skipping: {url}")
+            return original_url
+        finally:
+            self.stats['fingerprint_seconds'] += time.perf_counter() - start_time
+
+    def to_state(self):
+        with self.lock:
+            return [list(entry) for entries in self.band_tables[0].values() for entry in entries]
+
+    def load_state(self, state):
+        with self.lock:
+            for simhash_value, contacts, url in state:
+                self.add(Fingerprint(simhash_value, contacts), url)
+
+    def log_stats(self, extract_seconds=0.0):
+        # extract_seconds is the mean parse and extract time of the pages that were processed
+        logging.info(
+            f"Near duplicates: skipped {self.stats['duplicates']} of {self.count + self.stats['duplicates']} fingerprinted pages, "
+            f"saving about {self.stats['duplicates'] * extract_seconds:.1f}s of parsing and extraction "
+            f"for {self.stats['fingerprint_seconds']:.1f}s fingerprinting, {self.stats['too_short']} too short to fingerprint"
+        )
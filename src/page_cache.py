@@ -0,0 +1,169 @@
+import collections
+import gzip
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+
+CachedPage = collections.namedtuple('CachedPage', ['url', 'final_url', 'html', 'fetched_at', 'etag', 'last_modified', 'tier'])
+
+
+class PageCache:
+    # Bodies are gzipped and stored once per content hash, the SQLite index maps each URL to its body
+    def __init__(self, directory, max_bytes=2 * 1024 ** 3, max_age=None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.stats = collections.Counter()
+        os.makedirs(os.path.join(directory, 'bodies'), exist_ok=True)
+        self.connection = sqlite3.connect(os.path.join(directory, 'index.sqlite'), check_same_thread=False, timeout=30)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        with self.connection:
+            self.connection.execute(
+                "CREATE TABLE IF NOT EXISTS pages (url TEXT PRIMARY KEY, digest TEXT, final_url TEXT, fetched_at REAL, "
+                "etag TEXT, last_modified TEXT, tier TEXT, last_access REAL)"
+            )
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_last_access ON pages (last_access)")
+            self.connection.execute("CREATE INDEX IF NOT EXISTS pages_digest ON pages (digest)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS bodies (digest TEXT PRIMARY KEY, size INTEGER)")
+        self.total_bytes = self.connection.execute("SELECT COALESCE(SUM(size), 0) FROM bodies").fetchone()[0]
+
+    def get_body_path(self, digest):
+        return os.path.join(self.directory, 'bodies', digest[:2], f"{digest}.html.gz")
+
+    def read_body(self, digest):
+        with gzip.open(self.get_body_path(digest), 'rt', encoding='utf-8') as file:
+            return file.read()
+
+    def write_body(self, digest, html):
+        body_path = self.get_body_path(digest)
+        if os.path.exists(body_path):
+            return os.path.getsize(body_path)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        temp_path = f"{body_path}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as file:
+            file.write(gzip.compress(html.encode('utf-8'), compresslevel=6))
+        os.replace(temp_path, body_path)
+        return os.path.getsize(body_path)
+
+    def get(self, url):
+        with self.lock:
+            row = self.connection.execute(
+                "SELECT digest, final_url, fetched_at, etag, last_modified, tier FROM pages WHERE url = ?", (url,)
+            ).fetchone()
+            if row:
+                with self.connection:
+                    self.connection.execute("UPDATE pages SET last_access = ? WHERE url = ?", (time.time(), url))
+        if not row:
+            self.stats['misses'] += 1
+            return None
+        digest, final_url, fetched_at, etag, last_modified, tier = row
+        try:
+            html = self.read_body(digest)
+        except Exception as e:
+            logging.warning(f"Reading cached page for {url} failed with error: {e}")
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return CachedPage(url, final_url, html, fetched_at, etag, last_modified, tier)
+
+    def is_fresh(self, cached_page):
+        return self.max_age is not None and time.time() - cached_page.fetched_at < self.max_age
+
+    @staticmethod
+    def get_conditional_headers(cached_page):
+        headers = {}
+        if cached_page.etag:
+            headers['If-None-Match'] = cached_page.etag
+        if cached_page.last_modified:
+            headers['If-Modified-Since'] = cached_page.last_modified
+        return headers
+
+    def put(self, url, html, final_url=None, etag=None, last_modified=None, tier=None):
+        digest = hashlib.sha256(html.encode('utf-8')).hexdigest()
+        try:
+            size = self.write_body(digest, html)
+        except Exception as e:
+            logging.warning(f"Caching page for {url} failed with error: {e}")
+            return
+        now = time.time()
+        with self.lock:
+            with self.connection:
+                inserted = self.connection.execute(
+                    "INSERT OR IGNORE INTO bodies (digest, size) VALUES (?, ?)", (digest, size)
+                ).rowcount
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO pages (url, digest, final_url, fetched_at, etag, last_modified, tier, last_access) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (url, digest, final_url or url, now, etag, last_modified, tier, now),
+                )
+            if inserted:
+                self.total_bytes += size
+            self.stats['stored'] += 1
+            if self.total_bytes > self.max_bytes:
+                self.evict()
+
+    def mark_revalidated(self, url):
+        # A 304 means the cached body is still current
+        with self.lock, self.connection:
+            self.connection.execute("UPDATE pages SET fetched_at = ? WHERE url = ?", (time.time(), url))
+        self.stats['revalidated'] += 1
+
+    def evict(self):
+        # Called with the lock held; drops least recently used pages until the bodies fit again
+        target_bytes = self.max_bytes * 0.9
+        while self.total_bytes > target_bytes:
+            rows = self.connection.execute("SELECT url, digest FROM pages ORDER BY last_access LIMIT 100").fetchall()
+            if not rows:
+                break
+            with self.connection:
+                self.connection.executemany("DELETE FROM pages WHERE url = ?", [(url,) for url, _ in rows])
+                for digest in {digest for _, digest in rows}:
+                    if self.connection.execute("SELECT 1 FROM pages WHERE digest = ? LIMIT 1", (digest,)).fetchone():
+                        continue
+                    size = self.connection.execute("SELECT size FROM bodies WHERE digest = ?", (digest,)).fetchone()[0]
+                    self.connection.execute("DELETE FROM bodies WHERE digest = ?", (digest,))
+                    self.total_bytes -= size
+                    try:
+                        os.remove(self.get_body_path(digest))
+                    except OSError as e:
+                        logging.debug(f"Removing cached body {digest} failed: {e}")
+            self.stats['evicted'] += len(rows)
+
+    def get_urls(self):
+        with self.lock:
+            return [row[0] for row in self.connection.execute("SELECT url FROM pages ORDER BY url")]
+
+    def iter_pages(self):
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT url, digest, final_url, fetched_at, etag, last_modified, tier FROM pages ORDER BY url"
+            ).fetchall()
+        for url, digest, final_url, fetched_at, etag, last_modified, tier in rows:
+            try:
+                html = self.read_body(digest)
+            except Exception as e:
+                logging.warning(f"Reading cached page for {url} failed with error: {e}")
+                continue
+            yield CachedPage(url, final_url, html, fetched_at, etag, last_modified, tier)
+
+    def __len__(self):
+        with self.lock:
+            return self.connection.execute("SELECT COUNT(*) FROM pages").fetchone()[0]
+
+    def log_stats(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / lookups if lookups else 0
+        logging.info(
+            f"Page cache: {len(self)} pages, {self.total_bytes / 1024 ** 2:.1f} MB, {hit_rate:.1%} hit rate, "
+            f"{self.stats['revalidated']} revalidated, {self.stats['stored']} stored, {self.stats['evicted']} evicted"
+        )
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
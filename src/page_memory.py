@@ -0,0 +1,119 @@
+import collections
+import heapq
+import logging
+import os
+import sys
+import threading
+import time
+
+from src.html_parser import PARSE_MEMORY_FACTORS
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+
+# How a page was parsed, how long parsing and extraction took, its size in characters, and how much the process
+# RSS grew while its parse was held, None where current RSS cannot be read
+PageStats = collections.namedtuple('PageStats', ['mode', 'seconds', 'page_bytes', 'rss_growth'])
+
+PAGE_SIZE = os.sysconf('SC_PAGE_SIZE') if hasattr(os, 'sysconf') else 4096
+
+
+def get_rss_bytes():
+    # Current resident set size from /proc on Linux or psutil elsewhere, None when neither is available. The
+    # peak from resource only ever rises, so growth measured with it would be meaningless
+    try:
+        with open('/proc/self/statm') as file:
+            return int(file.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        pass
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    return None
+
+
+def get_peak_rss_bytes():
+    # ru_maxrss is kilobytes on Linux and bytes on macOS; None on Windows, which has no resource module
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+def measured(function, *args):
+    # The growth is read while the result is still alive, so a parse is charged for the tree it built
+    rss_before = get_rss_bytes()
+    start_time = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start_time
+    if rss_before is None:
+        return result, seconds, None
+    return result, seconds, get_rss_bytes() - rss_before
+
+
+def get_stream_threshold(worker_memory_budget, parser_backend='html.parser'):
+    # The page length, in characters, past which a full parse would likely take more than one worker's budget
+    if not worker_memory_budget:
+        return None
+    return worker_memory_budget // PARSE_MEMORY_FACTORS.get(parser_backend, max(PARSE_MEMORY_FACTORS.values()))
+
+
+class PageMemoryTracker:
+    # Keeps the pages whose parse grew RSS the most. RSS is per process, so when threads parse side by side a page
+    # can be charged for a neighbour's growth; extract worker processes measure one page at a time
+    def __init__(self, top=10, warn_bytes=None):
+        self.top = top
+        self.warn_bytes = warn_bytes
+        self.lock = threading.Lock()
+        self.worst = []
+        self.mode_counts = collections.Counter()
+        self.largest_page = 0
+
+    def record(self, url, stats):
+        with self.lock:
+            self.mode_counts[stats.mode] += 1
+            self.largest_page = max(self.largest_page, stats.page_bytes)
+            if stats.rss_growth is None:
+                return
+            entry = (stats.rss_growth, stats.page_bytes, url, stats.mode)
+            if len(self.worst) < self.top:
+                heapq.heappush(self.worst, entry)
+            elif entry > self.worst[0]:
+                heapq.heapreplace(self.worst, entry)
+        if self.warn_bytes and stats.rss_growth > self.warn_bytes:
+            logging.warning(f"Parsing grew memory by {stats.rss_growth / 1024 ** 2:.0f} MB, over the "
+                            f"{self.warn_bytes / 1024 ** 2:.0f} MB worker budget ({stats.mode} parse of "
+                            f"{stats.page_bytes / 1024 ** 2:.1f} MB): {url}")
+
+    def worst_pages(self):
+        with self.lock:
+            worst = sorted(self.worst, reverse=True)
+        return [
+            {'url': url, 'rss_growth': rss_growth, 'page_bytes': page_bytes, 'mode': mode}
+            for rss_growth, page_bytes, url, mode in worst
+        ]
+
+    def stats(self):
+        with self.lock:
+            return {'pages': dict(self.mode_counts), 'largest_page': self.largest_page, 'rss': get_rss_bytes()}
+
+    def log_stats(self):
+        stats = self.stats()
+        if stats['rss'] is None:
+            logging.info(f"Page memory: parsed {stats['pages']}, largest page {stats['largest_page'] / 1024 ** 2:.1f} MB, "
+                         f"RSS cannot be read here without psutil, so per-page growth is not measured")
+            return
+        logging.info(f"Page memory: parsed {stats['pages']}, largest page {stats['largest_page'] / 1024 ** 2:.1f} MB, "
+                     f"RSS now {stats['rss'] / 1024 ** 2:.0f} MB")
+        for page in self.worst_pages():
+            if page['rss_growth'] <= 0:
+                break
+            logging.info(f"Page memory: +{page['rss_growth'] / 1024 ** 2:.1f} MB for a {page['page_bytes'] / 1024 ** 2:.2f} MB "
+                         f"page ({page['mode']} parse): {page['url']}")
@@ -0,0 +1,174 @@
+import collections
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+import urllib.robotparser
+from urllib.parse import urlparse
+
+
+class RobotsCache:
+    def __init__(self, ttl=24 * 60 * 60, error_ttl=60 * 60, timeout=10, max_crawl_delay=30, user_agent='Mozilla/5.0'):
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        self.timeout = timeout
+        self.max_crawl_delay = max_crawl_delay
+        self.user_agent = user_agent
+        self.entries = {}
+        self.in_flight = set()
+        self.next_access = {}
+        self.stats = collections.Counter()
+        self.condition = threading.Condition()
+
+    @staticmethod
+    def get_origin(url):
+        parsed_url = urlparse(url)
+        return f"{parsed_url.scheme.lower()}://{parsed_url.netloc.lower()}"
+
+    def get_parser(self, url):
+        origin = self.get_origin(url)
+        with self.condition:
+            if origin in self.in_flight:
+                # Another worker is already fetching this robots.txt, share its result
+                self.stats['shared'] += 1
+                while origin in self.in_flight:
+                    self.condition.wait()
+            entry = self.entries.get(origin)
+            if entry and time.time() - entry['fetched_at'] < entry['ttl']:
+                self.stats['hits'] += 1
+                return entry['parser']
+            self.stats['misses'] += 1
+            self.in_flight.add(origin)
+
+        entry = None
+        try:
+            entry = self.fetch(origin)
+        finally:
+            with self.condition:
+                if entry:
+                    self.entries[origin] = entry
+                self.in_flight.discard(origin)
+                self.condition.notify_all()
+        return entry['parser']
+
+    def fetch(self, origin):
+        robots_url = f"{origin}/robots.txt"
+        start_time = time.time()
+        lines = None
+        status = 'ok'
+        ttl = self.ttl
+        try:
+            request = urllib.request.Request(robots_url, headers={'User-Agent': self.user_agent})
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                raw = response.read(512 * 1024)
+            lines = raw.decode('utf-8', errors='replace').splitlines()
+        except urllib.error.HTTPError as e:
+            # Same rules as RobotFileParser.read: 401/403 deny everything, other 4xx allow everything
+            if e.code in (401, 403):
+                status = 'disallow_all'
+            elif 400 <= e.code < 500:
+                status = 'allow_all'
+            else:
+                status = 'disallow_all'
+                ttl = self.error_ttl
+        except Exception as e:
+            logging.debug(f"Failed to fetch {robots_url}: {e}")
+            self.stats['errors'] += 1
+            status = 'disallow_all'
+            ttl = self.error_ttl
+        finally:
+            with self.condition:
+                self.stats['fetches'] += 1
+                self.stats['fetch_seconds'] += time.time() - start_time
+
+        return self.build_entry(robots_url, status, lines, time.time(), ttl)
+
+    @staticmethod
+    def build_entry(robots_url, status, lines, fetched_at, ttl):
+        parser = urllib.robotparser.RobotFileParser(robots_url)
+        if status == 'ok':
+            parser.parse(lines)
+        elif status == 'allow_all':
+            parser.allow_all = True
+        else:
+            parser.disallow_all = True
+        return {'parser': parser, 'status': status, 'lines': lines, 'fetched_at': fetched_at, 'ttl': ttl}
+
+    def can_fetch(self, url, user_agent=None):
+        return self.get_parser(url).can_fetch(user_agent or self.user_agent, url)
+
+    def crawl_delay(self, url, user_agent=None):
+        return self.get_parser_delay(self.get_parser(url), user_agent)
+
+    def peek_crawl_delay(self, host, user_agent=None):
+        # Only answers from rules already cached, never fetches
+        with self.condition:
+            entry = self.entries.get(f"https://{host}") or self.entries.get(f"http://{host}")
+        return self.get_parser_delay(entry['parser'], user_agent) if entry else 0
+
+    def get_parser_delay(self, parser, user_agent=None):
+        user_agent = user_agent or self.user_agent
+        delay = parser.crawl_delay(user_agent)
+        if delay is None:
+            request_rate = parser.request_rate(user_agent)
+            if request_rate and request_rate.requests:
+                delay = request_rate.seconds / request_rate.requests
+        return min(float(delay), self.max_crawl_delay) if delay else 0
+
+    def wait_for_crawl_delay(self, url, user_agent=None):
+        delay = self.crawl_delay(url, user_agent)
+        if not delay:
+            return
+        origin = self.get_origin(url)
+        with self.condition:
+            now = time.time()
+            # Reserve the next slot for this host so concurrent workers space themselves out
+            access_time = max(now, self.next_access.get(origin, 0))
+            self.next_access[origin] = access_time + delay
+        if access_time > now:
+            self.stats['delayed'] += 1
+            time.sleep(access_time - now)
+
+    def log_stats(self):
+        lookups = self.stats['hits'] + self.stats['misses']
+        hit_rate = self.stats['hits'] / lookups if lookups else 0
+        logging.info(
+            f"Robots cache: {len(self.entries)} hosts, {self.stats['hits']} hits, {self.stats['misses']} misses "
+            f"({hit_rate:.1%} hit rate), {self.stats['shared']} shared fetches, {self.stats['errors']} errors, "
+            f"{self.stats['fetch_seconds']:.1f}s fetching, {self.stats['delayed']} crawl-delay waits"
+        )
+
+    def load(self, filepath):
+        if not os.path.exists(filepath):
+            return
+        try:
+            with open(filepath, 'r') as file:
+                saved_entries = json.load(file)
+            now = time.time()
+            with self.condition:
+                for origin, saved in saved_entries.items():
+                    if now - saved['fetched_at'] < saved['ttl']:
+                        self.entries[origin] = self.build_entry(
+                            f"{origin}/robots.txt", saved['status'], saved['lines'], saved['fetched_at'], saved['ttl']
+                        )
+            logging.info(f"Loaded {len(self.entries)} robots.txt entries from {filepath}")
+        except Exception as e:
+            logging.warning(f"Loading robots cache failed with error: {e}")
+
+    def save(self, filepath):
+        with self.condition:
+            saved_entries = {
+                origin: {key: entry[key] for key in ('status', 'lines', 'fetched_at', 'ttl')}
+                for origin, entry in self.entries.items()
+            }
+        try:
+            temp_filepath = f"{filepath}.tmp"
+            with open(temp_filepath, 'w') as file:
+                json.dump(saved_entries, file)
+            os.replace(temp_filepath, filepath)
+            logging.debug(f"Saved {len(saved_entries)} robots.txt entries to {filepath}")
+        except Exception as e:
+            logging.warning(f"Saving robots cache failed with error: {e}")
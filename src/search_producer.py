@@ -0,0 +1,159 @@
+import collections
+import concurrent.futures
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+from src.metrics import metrics
+from src.web_interface import get_gigablast_search_results_worker
+
+
+class SearchResultCache:
+    # One JSON file per query holding the URLs each click added, so a repeated query replays without Chrome
+    def __init__(self, directory, max_age=24 * 60 * 60):
+        self.directory = directory
+        self.max_age = max_age
+        os.makedirs(directory, exist_ok=True)
+
+    def get_filepath(self, query):
+        return os.path.join(self.directory, f"{hashlib.sha1(query.encode('utf-8')).hexdigest()}.json")
+
+    def get(self, query, clicks):
+        # Returns one URL batch per click depth, or None when the query was not searched this deep recently
+        filepath = self.get_filepath(query)
+        if not os.path.exists(filepath):
+            return None
+        try:
+            with open(filepath, 'r') as file:
+                entry = json.load(file)
+        except Exception as e:
+            logging.warning(f"Reading cached search results for {query} failed with error: {e}")
+            return None
+        if entry['clicks'] < clicks or time.time() - entry['searched_at'] > self.max_age:
+            return None
+        return entry['batches'][:clicks + 1]
+
+    def put(self, query, clicks, batches):
+        filepath = self.get_filepath(query)
+        try:
+            temp_filepath = f"{filepath}.{threading.get_ident()}.tmp"
+            with open(temp_filepath, 'w') as file:
+                json.dump({'query': query, 'clicks': clicks, 'searched_at': time.time(), 'batches': batches}, file)
+            os.replace(temp_filepath, filepath)
+        except Exception as e:
+            logging.warning(f"Caching search results for {query} failed with error: {e}")
+
+
+class SearchProducer:
+    # Runs the queries on background threads and hands every new batch of result URLs to on_batch as it is scraped,
+    # so the crawl starts on the first results page instead of after the last query
+    def __init__(self, search_queries, on_batch, clicks=0, timeout=30, driver_pool=None, parser_backend='html.parser',
+                 result_cache=None, workers=None):
+        self.search_queries = search_queries
+        self.on_batch = on_batch
+        self.clicks = clicks
+        self.timeout = timeout
+        self.driver_pool = driver_pool
+        self.parser_backend = parser_backend
+        self.result_cache = result_cache
+        self.workers = workers or int(os.cpu_count())
+        self.seen_urls = {}
+        self.finished_queries = set()
+        self.stats = collections.Counter()
+        self.lock = threading.Lock()
+        self.executor = None
+        self.futures = []
+        self.start_time = None
+
+    def start(self):
+        logging.info(f"Starting with queries: {self.search_queries}")
+        self.start_time = time.time()
+        self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="search")
+        self.futures = [
+            self.executor.submit(self.run_query, query) for query in self.search_queries if query not in self.finished_queries
+        ]
+        return self
+
+    def run_query(self, query):
+        # Marked finished only after its URLs were handed on, failed queries too since a run never retries them
+        self.search_query(query)
+        with self.lock:
+            self.finished_queries.add(query)
+
+    def search_query(self, query):
+        cached_batches = self.result_cache.get(query, self.clicks) if self.result_cache else None
+        if cached_batches is not None:
+            logging.debug(f"Replaying {len(cached_batches)} cached results pages: {query}")
+            self.stats['cached_queries'] += 1
+            for urls in cached_batches:
+                self.emit(urls)
+            return
+
+        batches = []
+
+        def on_batch(click, urls):
+            batches.append(urls)
+            self.emit(urls)
+
+        try:
+            get_gigablast_search_results_worker(
+                query, self.clicks, self.timeout, self.driver_pool, self.parser_backend, on_batch=on_batch
+            )
+        except Exception as e:
+            metrics.count_error('search', e)
+            logging.warning(f"Search failed for query: {query}: {e}")
+            self.stats['failed_queries'] += 1
+            return
+        self.stats['searched_queries'] += 1
+        if self.result_cache and batches:
+            self.result_cache.put(query, self.clicks, batches)
+
+    def emit(self, urls):
+        # Results repeat across queries, only URLs no earlier batch had are passed on
+        with self.lock:
+            new_urls = [url for url in urls if url not in self.seen_urls]
+            self.seen_urls.update(dict.fromkeys(new_urls))
+            self.stats['batches'] += 1
+            self.stats['duplicates'] += len(urls) - len(new_urls)
+        metrics.inc('search_urls_total', len(new_urls))
+        if new_urls:
+            self.on_batch(new_urls)
+
+    def snapshot(self):
+        with self.lock:
+            return {'finished_queries': list(self.finished_queries), 'urls': list(self.seen_urls)}
+
+    def load_state(self, state):
+        # A resumed run only searches the queries that had not finished, and still drops URLs found before
+        self.finished_queries.update(state['finished_queries'])
+        self.seen_urls.update(dict.fromkeys(state['urls']))
+
+    def is_running(self):
+        return any(not future.done() for future in self.futures)
+
+    @property
+    def urls(self):
+        with self.lock:
+            return list(self.seen_urls)
+
+    def join(self):
+        if self.executor:
+            self.executor.shutdown(wait=True)
+        self.log_stats()
+        return self.urls
+
+    def stop(self):
+        # Queries not started yet are dropped, running ones finish on their own
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def log_stats(self):
+        elapsed = time.time() - self.start_time if self.start_time else 0
+        logging.info(
+            f"Search: {len(self.seen_urls)} unique URLs from {len(self.search_queries)} queries in {elapsed:.1f}s, "
+            f"{self.stats['cached_queries']} cached, {self.stats['failed_queries']} failed, "
+            f"{self.stats['duplicates']} duplicate results"
+        )
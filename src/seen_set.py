@@ -0,0 +1,253 @@
+import base64
+import hashlib
+import math
+import sys
+from array import array
+
+
+def url_digest(url, size=8):
+    return hashlib.blake2b(url.encode('utf-8'), digest_size=size).digest()
+
+
+class ExactSeenSet:
+    kind = 'exact'
+
+    def __init__(self, urls=()):
+        self.urls = set(urls)
+
+    def add(self, url):
+        if url in self.urls:
+            return False
+        self.urls.add(url)
+        return True
+
+    def __contains__(self, url):
+        return url in self.urls
+
+    def __len__(self):
+        return len(self.urls)
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.urls) + sum(sys.getsizeof(url) for url in self.urls)
+
+    def stats(self):
+        return {'kind': self.kind, 'count': len(self), 'memory_bytes': self.memory_bytes()}
+
+    def to_state(self):
+        return {'kind': self.kind, 'urls': list(self.urls)}
+
+    @classmethod
+    def from_state(cls, state):
+        return cls(state['urls'])
+
+
+class FingerprintSeenSet:
+    # 64-bit URL fingerprints in an open-addressing hash table backed by one array('Q');
+    # two different URLs sharing a fingerprint would be treated as the same URL
+    kind = 'fingerprint'
+
+    def __init__(self, capacity=1024, max_load=0.5):
+        self.max_load = max_load
+        self.table = array('Q', bytes(8 * self.round_capacity(capacity)))
+        self.count = 0
+        self.probes = 0
+        self.lookups = 0
+
+    @staticmethod
+    def round_capacity(capacity):
+        return 1 << max(4, math.ceil(math.log2(capacity)))
+
+    @staticmethod
+    def fingerprint(url):
+        # 0 marks an empty slot
+        return int.from_bytes(url_digest(url), 'little') or 1
+
+    def find_slot(self, fingerprint):
+        mask = len(self.table) - 1
+        slot = fingerprint & mask
+        self.lookups += 1
+        while True:
+            self.probes += 1
+            value = self.table[slot]
+            if value == 0 or value == fingerprint:
+                return slot, value == fingerprint
+            slot = (slot + 1) & mask
+
+    def add(self, url):
+        fingerprint = self.fingerprint(url)
+        slot, found = self.find_slot(fingerprint)
+        if found:
+            return False
+        self.table[slot] = fingerprint
+        self.count += 1
+        if self.count > len(self.table) * self.max_load:
+            self.resize(len(self.table) * 2)
+        return True
+
+    def resize(self, capacity):
+        old_table = self.table
+        self.table = array('Q', bytes(8 * capacity))
+        for fingerprint in old_table:
+            if fingerprint:
+                slot, _ = self.find_slot(fingerprint)
+                self.table[slot] = fingerprint
+
+    def __contains__(self, url):
+        return self.find_slot(self.fingerprint(url))[1]
+
+    def __len__(self):
+        return self.count
+
+    def memory_bytes(self):
+        return sys.getsizeof(self.table)
+
+    def stats(self):
+        return {
+            'kind': self.kind,
+            'count': self.count,
+            'memory_bytes': self.memory_bytes(),
+            'capacity': len(self.table),
+            'average_probes': self.probes / self.lookups if self.lookups else 0.0,
+            # Birthday bound for at least one pair of distinct URLs sharing a fingerprint
+            'collision_probability': -math.expm1(-self.count * (self.count - 1) / 2 / 2 ** 64),
+        }
+
+    def to_state(self):
+        return {
+            'kind': self.kind,
+            'count': self.count,
+            'max_load': self.max_load,
+            'table': base64.b64encode(self.table.tobytes()).decode('ascii'),
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        seen_set = cls(max_load=state['max_load'])
+        seen_set.table = array('Q')
+        seen_set.table.frombytes(base64.b64decode(state['table']))
+        seen_set.count = state['count']
+        return seen_set
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bit_count = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.bit_count / capacity * math.log(2)))
+        self.bits = bytearray((self.bit_count + 7) // 8)
+        self.count = 0
+
+    def positions(self, digest):
+        # Double hashing: k positions from two independent 64-bit halves of one digest
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.bit_count for index in range(self.hash_count)]
+
+    def contains(self, digest):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self.positions(digest))
+
+    def add(self, digest):
+        for position in self.positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+
+class ScalableBloomFilter:
+    # Adds a larger, tighter filter each time the current one fills up, so the overall
+    # false positive rate stays under error_rate without knowing the crawl size in advance
+    kind = 'bloom'
+
+    def __init__(self, error_rate=1e-6, initial_capacity=100000, growth=2, tightening=0.5):
+        self.error_rate = error_rate
+        self.initial_capacity = initial_capacity
+        self.growth = growth
+        self.tightening = tightening
+        self.filters = []
+        self.count = 0
+        self.add_filter()
+
+    def add_filter(self):
+        index = len(self.filters)
+        capacity = self.initial_capacity * self.growth ** index
+        error_rate = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        self.filters.append(BloomFilter(capacity, error_rate))
+
+    def add(self, url):
+        digest = url_digest(url, 16)
+        if any(bloom_filter.contains(digest) for bloom_filter in self.filters):
+            return False
+        if self.filters[-1].count >= self.filters[-1].capacity:
+            self.add_filter()
+        self.filters[-1].add(digest)
+        self.count += 1
+        return True
+
+    def __contains__(self, url):
+        digest = url_digest(url, 16)
+        return any(bloom_filter.contains(digest) for bloom_filter in self.filters)
+
+    def __len__(self):
+        return self.count
+
+    def memory_bytes(self):
+        return sum(sys.getsizeof(bloom_filter.bits) for bloom_filter in self.filters)
+
+    def stats(self):
+        # Probability that a new URL is wrongly reported as seen, given the current fill
+        false_positive_rate = 1 - math.prod(
+            1 - (1 - math.exp(-bloom_filter.hash_count * bloom_filter.count / bloom_filter.bit_count)) ** bloom_filter.hash_count
+            for bloom_filter in self.filters
+        )
+        return {
+            'kind': self.kind,
+            'count': self.count,
+            'memory_bytes': self.memory_bytes(),
+            'filters': len(self.filters),
+            'false_positive_rate': false_positive_rate,
+        }
+
+    def to_state(self):
+        return {
+            'kind': self.kind,
+            'error_rate': self.error_rate,
+            'initial_capacity': self.initial_capacity,
+            'growth': self.growth,
+            'tightening': self.tightening,
+            'count': self.count,
+            'filters': [
+                {'count': bloom_filter.count, 'bits': base64.b64encode(bytes(bloom_filter.bits)).decode('ascii')}
+                for bloom_filter in self.filters
+            ],
+        }
+
+    @classmethod
+    def from_state(cls, state):
+        seen_set = cls(state['error_rate'], state['initial_capacity'], state['growth'], state['tightening'])
+        seen_set.filters = []
+        for saved_filter in state['filters']:
+            seen_set.add_filter()
+            seen_set.filters[-1].bits = bytearray(base64.b64decode(saved_filter['bits']))
+            seen_set.filters[-1].count = saved_filter['count']
+        seen_set.count = state['count']
+        return seen_set
+
+
+SEEN_SET_KINDS = {
+    ExactSeenSet.kind: ExactSeenSet,
+    FingerprintSeenSet.kind: FingerprintSeenSet,
+    ScalableBloomFilter.kind: ScalableBloomFilter,
+}
+
+
+def create_seen_set(kind='exact', **options):
+    if kind not in SEEN_SET_KINDS:
+        raise ValueError(f"Unknown seen set kind: {kind}")
+    return SEEN_SET_KINDS[kind](**options)
+
+
+def load_seen_set(state):
+    # Checkpoints written before seen sets were pluggable stored a plain list of URLs
+    if isinstance(state, list):
+        return ExactSeenSet(state)
+    return SEEN_SET_KINDS[state['kind']].from_state(state)
@@ -0,0 +1,45 @@
+import fnmatch
+import functools
+import re
+from urllib.parse import parse_qs, urlencode, urlparse, urlunparse
+
+from url_normalize import url_normalize
+
+
+# Query parameters that only track where a visitor came from, the page is the same without them. Wildcards allowed
+TRACKING_PARAMETERS = (
+    'sid', 'utm_*', 'fbclid', 'gclid', 'gclsrc', 'dclid', 'gbraid', 'wbraid', 'msclkid', 'yclid', 'twclid', 'ttclid',
+    'igshid', 'mc_cid', 'mc_eid', '_ga', '_gl', '_hsenc', '_hsmi', 'hsa_*', 'mkt_tok', 'oly_anon_id', 'oly_enc_id',
+    'vero_id', 'ref_src',
+)
+
+
+class URLCleaner:
+    # url_normalize plus dropping tracking parameters. The same navigation links turn up on every page of a site,
+    # so results are memoized; lru_cache is thread-safe and the work happens outside any frontier lock
+    def __init__(self, strip_parameters=TRACKING_PARAMETERS, cache_size=50000):
+        self.strip_parameters = tuple(strip_parameters)
+        self.strip_pattern = re.compile(
+            '|'.join(fnmatch.translate(parameter) for parameter in self.strip_parameters) or '(?!)', re.IGNORECASE
+        )
+        self.clean = functools.lru_cache(maxsize=cache_size)(self.clean_uncached)
+
+    def clean_uncached(self, url):
+        normalized_url = url_normalize(url)
+        parsed_url = urlparse(normalized_url)
+        query_params = parse_qs(parsed_url.query)
+        for parameter in [parameter for parameter in query_params if self.strip_pattern.match(parameter)]:
+            del query_params[parameter]
+        new_query = urlencode(query_params, doseq=True)
+        return urlunparse((
+            parsed_url.scheme,
+            parsed_url.netloc,
+            parsed_url.path,
+            parsed_url.params,
+            new_query,
+            parsed_url.fragment
+        ))
+
+    def stats(self):
+        cache_info = self.clean.cache_info()
+        return {'hits': cache_info.hits, 'misses': cache_info.misses, 'cached': cache_info.currsize}
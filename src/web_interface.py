@@ -1,20 +1,22 @@
-import concurrent.futures
+import collections
 import logging
-import os
 import random
+import re
 import threading
 import time
-import urllib.robotparser
-from functools import lru_cache
 
-from bs4 import BeautifulSoup
+import urllib3
 from selenium import webdriver
-from selenium.common.exceptions import TimeoutException
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 import validators
 
+from src.html_parser import parse_html
+from src.metrics import metrics
+from src.robots_cache import RobotsCache
+
 
 class InvalidURLException(Exception):
     """Exception raised for invalid URLs."""
@@ -26,25 +28,52 @@ class AccessDeniedException(Exception):
     pass
 
 
-@lru_cache()
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 13_2_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.3 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Linux; Android 10; SM-G981B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Mobile Safari/537.36",
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:88.0) Gecko/20100101 Firefox/88.0",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
+]
+
+FetchResult = collections.namedtuple('FetchResult', ['html', 'tier', 'reason'])
+RenderedPage = collections.namedtuple('RenderedPage', ['html', 'reason'])
+HttpResponse = collections.namedtuple('HttpResponse', ['status', 'url', 'headers', 'text', 'truncated'])
+# Statuses a real browser can get past, bot walls and challenge pages. Anything else, 404, 410 or a 5xx, comes back
+# the same to Chrome, so it is a failed fetch instead of a Selenium session
+BROWSER_STATUSES = frozenset([403, 429])
+
+CONTACT_TEXT_PATTERN = re.compile(
+    r'(?i)mailto:|tel:|[A-Z0-9._%+-]+@(?:[A-Z0-9-]+\.)+[A-Z]{2,}|\(?\b[0-9]{3}\)?[-. ]?[0-9]{3}[-. ]?[0-9]{4}\b|\bcontact\b'
+)
+NOSCRIPT_SHELL_PATTERN = re.compile(r'(?is)<noscript[^>]*>[^<]*(?:enable|requires?|turn on)\s+javascript')
+SPA_MARKER_PATTERN = re.compile(
+    r'(?i)<div[^>]+id=["\'](?:root|app|__next|__nuxt|___gatsby)["\'][^>]*>\s*</div>|data-reactroot|ng-app|ng-version|window\.__NUXT__|window\.__INITIAL_STATE__'
+)
+
+
+# Network.setBlockedURLs wildcards for requests Chrome drops before sending: images, media, fonts and trackers
+BLOCKED_EXTENSIONS = ['png', 'jpg', 'jpeg', 'gif', 'webp', 'avif', 'svg', 'ico', 'bmp', 'mp4', 'webm', 'mov', 'mp3', 'ogg',
+                      'wav', 'm4a', 'woff', 'woff2', 'ttf', 'otf', 'eot']
+BLOCKED_URL_PATTERNS = [pattern for extension in BLOCKED_EXTENSIONS for pattern in (f"*.{extension}", f"*.{extension}?*")] + [
+    '*google-analytics.com*', '*googletagmanager.com*', '*doubleclick.net*', '*googlesyndication.com*', '*googleadservices.com*',
+    '*facebook.net*', '*connect.facebook.com*', '*hotjar.com*', '*scorecardresearch.com*', '*quantserve.com*',
+    '*clarity.ms*', '*newrelic.com*', '*nr-data.net*', '*youtube.com/embed*', '*player.vimeo.com*',
+]
+
+
+robots_cache = RobotsCache()
+
+
+@metrics.timed('robots_check')
 def is_allowed(url, user_agent='Mozilla/5.0'):
-    parser = urllib.robotparser.RobotFileParser()
-    parser.set_url(urllib.parse.urljoin(url, 'robots.txt'))
-    parser.read()
-    return parser.can_fetch(user_agent, url)
+    return robots_cache.can_fetch(url, user_agent)
 
 
-def set_up_driver():
+def set_up_driver(page_load_strategy='normal', blocked_url_patterns=None):
     try:
         driver = None
-        user_agents = [
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36",
-            "Mozilla/5.0 (iPhone; CPU iPhone OS 13_2_3 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/13.0.3 Mobile/15E148 Safari/604.1",
-            "Mozilla/5.0 (Linux; Android 10; SM-G981B) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Mobile Safari/537.36",
-            "Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:88.0) Gecko/20100101 Firefox/88.0",
-            "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/90.0.4430.212 Safari/537.36"
-        ]
-        user_agent = random.choice(user_agents)
+        user_agent = random.choice(USER_AGENTS)
         path_to_ublock_origin = 'chrome_extensions/ublockorigin.crx'
         path_to_https_everywhere = 'chrome_extensions/httpseverywhere.crx'
         path_to_decentraleyes = 'chrome_extensions/decentraleyes.crx'
@@ -109,40 +138,165 @@ def set_up_driver():
             "profile.default_content_setting_values.notifications": 2,
         }
         options.add_experimental_option("prefs", prefs)
-        driver = webdriver.Chrome(options=options)
+        # 'eager' hands the page back once the DOM is parsed instead of after every subresource
+        options.page_load_strategy = page_load_strategy
+        with metrics.timer(stage='driver_startup'):
+            driver = webdriver.Chrome(options=options)
         driver.set_page_load_timeout(70)
         driver.set_script_timeout(70)
         driver.implicitly_wait(70)
+        if blocked_url_patterns:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': list(blocked_url_patterns)})
         return driver
     except Exception as e:
+        metrics.count_error('driver_startup', e)
         if driver:
             driver.quit()
         raise e
 
 
-def get_gigablast_search_results(search_queries, clicks=0, timeout=30):
-    all_urls = []
-    workers = int(os.cpu_count())
-    logging.info(f"Starting with queries: {search_queries}")
-    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
-        logging.debug(f"Executor created with {workers} workers")
-        future_to_query = {executor.submit(get_gigablast_search_results_worker, query, clicks, timeout): query for query in search_queries}
-        logging.debug("Submitted all search results to the executor")
-        for future in concurrent.futures.as_completed(future_to_query):
-            urls = future.result()
-            if urls:
-                all_urls.extend(urls)
-    return all_urls
+class DriverPool:
+    def __init__(self, size, max_uses=50, stats_interval=100, driver_options=None):
+        self.size = size
+        # Keyword arguments for set_up_driver
+        self.driver_options = driver_options or {}
+        self.max_uses = max_uses
+        self.stats_interval = stats_interval
+        self.idle_drivers = collections.deque()
+        self.driver_uses = {}
+        self.live_count = 0
+        self.closed = False
+        self.stats = collections.Counter()
+        self.condition = threading.Condition()
+
+    def acquire(self):
+        wait_start = time.time()
+        with self.condition:
+            while True:
+                if self.closed:
+                    raise RuntimeError("Driver pool is closed")
+                if self.idle_drivers:
+                    driver = self.idle_drivers.pop()
+                    self.stats['reused'] += 1
+                    break
+                if self.live_count < self.size:
+                    self.live_count += 1
+                    driver = None
+                    break
+                self.condition.wait()
+            self.stats['checkouts'] += 1
+            self.stats['wait_seconds'] += time.time() - wait_start
+
+        if driver is None:
+            try:
+                driver = set_up_driver(**self.driver_options)
+            except Exception as e:
+                with self.condition:
+                    self.live_count -= 1
+                    self.stats['start_failures'] += 1
+                    self.condition.notify()
+                raise e
+            with self.condition:
+                self.driver_uses[driver] = 0
+                self.stats['created'] += 1
+        return driver
+
+    def release(self, driver, failed=False):
+        with self.condition:
+            uses = self.driver_uses.get(driver, 0) + 1
+            self.driver_uses[driver] = uses
+            recycle = failed or self.closed or uses >= self.max_uses
+
+        if not recycle:
+            try:
+                self.reset_driver(driver)
+            except Exception as e:
+                logging.debug(f"Failed to reset driver, recycling it: {e}")
+                failed = True
+                recycle = True
+
+        if not recycle:
+            with self.condition:
+                if not self.closed:
+                    self.idle_drivers.append(driver)
+                    self.condition.notify()
+                else:
+                    recycle = True
+        if recycle:
+            self.discard(driver, failed)
+
+        with self.condition:
+            self.stats['releases'] += 1
+            if self.stats['releases'] % self.stats_interval == 0:
+                self.log_stats()
+
+    def reset_driver(self, driver):
+        handles = driver.window_handles
+        for handle in handles[1:]:
+            driver.switch_to.window(handle)
+            driver.close()
+        driver.switch_to.window(handles[0])
+        driver.execute_script("try { window.localStorage.clear(); window.sessionStorage.clear(); } catch (e) {}")
+        driver.execute_cdp_cmd('Network.clearBrowserCookies', {})
+        driver.get('about:blank')
+
+    def discard(self, driver, failed):
+        try:
+            driver.quit()
+        except Exception as e:
+            logging.debug(f"Failed to quit driver: {e}")
+        with self.condition:
+            self.driver_uses.pop(driver, None)
+            self.live_count -= 1
+            self.stats['crashed' if failed else 'recycled'] += 1
+            self.condition.notify()
+
+    def log_stats(self):
+        logging.info(
+            f"Driver pool: {self.live_count}/{self.size} live, {len(self.idle_drivers)} idle, "
+            f"{self.stats['checkouts']} checkouts, {self.stats['created']} created, {self.stats['reused']} reused, "
+            f"{self.stats['recycled']} recycled, {self.stats['crashed']} crashed, "
+            f"{self.stats['wait_seconds']:.1f}s waiting for a driver"
+        )
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            idle_drivers = list(self.idle_drivers)
+            self.idle_drivers.clear()
+            self.condition.notify_all()
+        for driver in idle_drivers:
+            self.discard(driver, failed=False)
+        with self.condition:
+            self.log_stats()
 
 
-def get_gigablast_search_results_worker(query, clicks, timeout):
+def get_search_result_urls(search_results, parser_backend='html.parser'):
+    page = parse_html(search_results, parser_backend)
+    links = [attrs['data-target'] for _, attrs in page.anchors if 'data-target' in attrs]
+    return [link for link in links if link.startswith('http') and "anon.toorgle.com" not in link]
+
+
+def get_gigablast_search_results_worker(query, clicks, timeout, driver_pool=None, parser_backend='html.parser', on_batch=None):
+    # on_batch(click, urls) gets the URLs each results page adds as soon as it loads, click 0 being the first page
     url = f"https://gigablast.org/search/?q={query.replace(' ', '%20')}"
+    seen_urls = set()
+
+    def emit_batch(click):
+        if on_batch is None:
+            return
+        new_urls = [result_url for result_url in dict.fromkeys(get_search_result_urls(driver.page_source, parser_backend))
+                    if result_url not in seen_urls]
+        seen_urls.update(new_urls)
+        on_batch(click, new_urls)
     
     if not is_allowed(url):
         logging.debug(f"Access denied by robots.txt for: {url}")
         return []
     
-    driver = set_up_driver()
+    driver = driver_pool.acquire() if driver_pool else set_up_driver()
+    driver_failed = False
     try:
         time.sleep(random.uniform(1, 5))
 
@@ -156,6 +310,7 @@ def get_gigablast_search_results_worker(query, clicks, timeout):
             WebDriverWait(driver, timeout).until(
                 lambda d: d.execute_script('return jQuery.active == 0')
             )
+        emit_batch(0)
 
         if clicks > 0:
             for click in range(clicks):
@@ -172,67 +327,301 @@ def get_gigablast_search_results_worker(query, clicks, timeout):
                     WebDriverWait(driver, 10).until(
                         lambda d: len(d.find_elements(By.CLASS_NAME, 'searpList')) > num_results_before
                     )
+                    emit_batch(click + 1)
                     time.sleep(random.uniform(1, 3))
                 except Exception as e:
                     logging.error(f"No more results button found or failed to click: {e}")
                     break
 
         search_results = driver.page_source
+    except WebDriverException as e:
+        driver_failed = True
+        raise e
     finally:
-        driver.quit()
+        if driver_pool:
+            driver_pool.release(driver, failed=driver_failed)
+        else:
+            driver.quit()
+
+    return list(set(get_search_result_urls(search_results, parser_backend)))
+
+
+class HostTimeouts:
+    # Page load timeout per host from its recent load times: slow hosts get more room, fast hosts give up sooner
+    def __init__(self, default=30, minimum=5, maximum=60, multiplier=3, window=20, min_samples=3):
+        self.default = default
+        self.minimum = minimum
+        self.maximum = maximum
+        self.multiplier = multiplier
+        self.window = window
+        self.min_samples = min_samples
+        self.load_times = {}
+        self.lock = threading.Lock()
 
-    soup = BeautifulSoup(search_results, 'html.parser')
-    links = soup.find_all('a', attrs={'data-target': True})
-    urls = [link['data-target'] for link in links if link['data-target'].startswith('http') and "anon.toorgle.com" not in link['data-target']]
+    @staticmethod
+    def get_host(url):
+        return urllib3.util.parse_url(url).host or ''
 
-    return list(set(urls))
+    def get(self, url):
+        with self.lock:
+            load_times = sorted(self.load_times.get(self.get_host(url), ()))
+        if len(load_times) < self.min_samples:
+            return self.default
+        slow_load = load_times[int(0.9 * (len(load_times) - 1))]
+        return min(self.maximum, max(self.minimum, slow_load * self.multiplier))
 
+    def record(self, url, seconds):
+        # A timed-out load counts as taking its whole timeout, which pushes the host's next timeout up
+        with self.lock:
+            load_times = self.load_times.get(self.get_host(url))
+            if load_times is None:
+                load_times = self.load_times[self.get_host(url)] = collections.deque(maxlen=self.window)
+            load_times.append(seconds)
 
-def fetch_html(url, timeout=60):
+
+def get_page_source(driver, max_dom_chars=None):
+    # A cap on the serialized DOM, not on the download: Chrome has already loaded the whole page by now.
+    # Sliced in the browser, so an oversized DOM never crosses the driver connection
+    if not max_dom_chars:
+        return driver.page_source, False
+    length, html = driver.execute_script(
+        "var html = document.documentElement.outerHTML; return [html.length, html.slice(0, arguments[0])];",
+        max_dom_chars,
+    )
+    return html, length > max_dom_chars
+
+
+@metrics.timed('fetch_html')
+def fetch_html(url, timeout=60, driver_pool=None, ajax_timeout=10, max_dom_chars=None, host_timeouts=None,
+               check_robots=True):
+    # Returns a RenderedPage whose reason says when the page is partial: what loaded by the timeout is kept.
+    # check_robots is off when the HTTP tier already checked robots.txt and reserved this request's crawl-delay slot
     exception_info = [None]
+    partial_reason = [None]
     driver = None
+    driver_failed = False
+    if host_timeouts:
+        timeout = host_timeouts.get(url)
 
     def load_url(driver, url, timeout):
         try:
             logging.debug(f"Fetching: {url}")
-            if not validators.url(url):
-                raise InvalidURLException(f"Invalid URL: {url}")
-            if not is_allowed(url):
-                raise AccessDeniedException(f"Access denied by robots.txt: {url}")
-            
-            driver.get(url)
-            WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") == "complete")
+            # With the eager strategy an interactive document is as far as the driver waits
+            eager = driver.capabilities.get('pageLoadStrategy', 'normal') != 'normal'
+            ready_states = ('interactive', 'complete') if eager else ('complete',)
+            load_start = time.time()
+            with metrics.timer(stage='page_load'):
+                try:
+                    driver.set_page_load_timeout(timeout)
+                    driver.get(url)
+                    WebDriverWait(driver, timeout).until(lambda d: d.execute_script("return document.readyState") in ready_states)
+                except TimeoutException:
+                    logging.debug(f"Page load timed out after {timeout}s, stopping it and keeping the DOM so far: {url}")
+                    driver.execute_script("window.stop();")
+                    partial_reason[0] = "page load timeout"
+            if host_timeouts:
+                host_timeouts.record(url, time.time() - load_start)
 
             jquery_loaded = driver.execute_script("return typeof jQuery != 'undefined'")
             if jquery_loaded:
-                start_time = time.time()
-                while time.time() - start_time < timeout:
-                    ajax_active = driver.execute_script('return jQuery.active')
-                    if ajax_active == 0:
-                        break
-                    time.sleep(0.5)
-                else:
-                    raise ValueError(f"Timed out waiting for AJAX calls: {url}")
+                with metrics.timer(stage='ajax_wait'):
+                    try:
+                        WebDriverWait(driver, ajax_timeout, poll_frequency=0.1).until(
+                            lambda d: d.execute_script('return jQuery.active == 0')
+                        )
+                    except TimeoutException:
+                        logging.debug(f"AJAX calls still running after {ajax_timeout}s, keeping the page as is: {url}")
+                        partial_reason[0] = partial_reason[0] or "AJAX timeout"
         except Exception as e:
             exception_info[0] = e
 
+    if check_robots:
+        # Before a driver is taken and outside the timed thread, so a long crawl delay never counts as a hung driver
+        if not validators.url(url):
+            raise InvalidURLException(f"Invalid URL: {url}")
+        if not is_allowed(url):
+            raise AccessDeniedException(f"Access denied by robots.txt: {url}")
+        with metrics.timer(stage='crawl_delay'):
+            robots_cache.wait_for_crawl_delay(url)
+
     try:
-        driver = set_up_driver()
+        with metrics.timer(stage='driver_acquire'):
+            driver = driver_pool.acquire() if driver_pool else set_up_driver()
         driver_thread = threading.Thread(target=load_url, args=(driver, url, timeout))
         driver_thread.daemon = True
         driver_thread.start()
-        driver_thread.join(timeout)
+        # The load and AJAX waits time out on their own, this only catches a driver that stopped responding
+        hard_timeout = timeout + ajax_timeout + 10
+        driver_thread.join(hard_timeout)
         
         if driver_thread.is_alive():
-            logging.warning(f"Timeout of {timeout}s reached, terminating driver: {url}")
+            logging.warning(f"Timeout of {hard_timeout}s reached, terminating driver: {url}")
+            driver_failed = True
             raise TimeoutException(f"Page load timed out: {url}")
 
         if exception_info[0]:
             raise exception_info[0]
 
-        return driver.page_source
+        html, truncated = get_page_source(driver, max_dom_chars)
+        if truncated:
+            logging.debug(f"Rendered DOM exceeded {max_dom_chars} characters, truncating: {url}")
+            partial_reason[0] = partial_reason[0] or "truncated"
+        if partial_reason[0]:
+            metrics.inc('partial_pages_total', reason=partial_reason[0])
+        return RenderedPage(html, partial_reason[0])
+    except WebDriverException as e:
+        driver_failed = True
+        raise e
     except Exception as e:
         raise e
     finally:
         if driver:
-            driver.quit()
+            if driver_pool:
+                driver_pool.release(driver, failed=driver_failed)
+            else:
+                driver.quit()
+
+
+class HttpClient:
+    def __init__(self, max_bytes=5 * 1024 * 1024, timeout=15, pool_size=10, num_pools=200):
+        self.max_bytes = max_bytes
+        headers = urllib3.util.make_headers(keep_alive=True, accept_encoding=True, user_agent=USER_AGENTS[0])
+        headers['Accept'] = 'text/html,application/xhtml+xml;q=0.9,*/*;q=0.8'
+        headers['Accept-Language'] = 'en-US,en;q=0.9'
+        # One keep-alive connection pool per host, reused across worker threads
+        self.pool_manager = urllib3.PoolManager(
+            num_pools=num_pools,
+            maxsize=pool_size,
+            headers=headers,
+            timeout=urllib3.Timeout(connect=min(timeout, 10), read=timeout),
+            retries=urllib3.Retry(total=2, redirect=5, raise_on_redirect=False, raise_on_status=False),
+        )
+
+    def get(self, url, headers=None):
+        response = self.pool_manager.request('GET', url, headers=headers, preload_content=False, decode_content=True)
+        try:
+            body = bytearray()
+            truncated = False
+            for chunk in response.stream(64 * 1024):
+                body.extend(chunk)
+                if len(body) > self.max_bytes:
+                    logging.debug(f"Response exceeded {self.max_bytes} bytes, truncating: {url}")
+                    del body[self.max_bytes:]
+                    truncated = True
+                    break
+        finally:
+            response.release_conn()
+
+        final_url = response.geturl() or url
+        content_type = response.headers.get('Content-Type', '')
+        charset_match = re.search(r'charset=([\w-]+)', content_type, re.IGNORECASE)
+        encoding = charset_match.group(1) if charset_match else 'utf-8'
+        try:
+            text = body.decode(encoding, errors='replace')
+        except LookupError:
+            text = body.decode('utf-8', errors='replace')
+        return HttpResponse(response.status, final_url, response.headers, text, truncated)
+
+    def close(self):
+        self.pool_manager.clear()
+
+
+def needs_javascript(html):
+    # Returns why the page should be rendered in Chrome, or None when the static HTML is good enough. A noscript
+    # shell or SPA marker escalates on its own, a "Contact" menu entry does not make a shell good enough. Contact
+    # text only counts in visible text or mailto:/tel: links, never in class names, scripts or comments
+    if NOSCRIPT_SHELL_PATTERN.search(html):
+        return "noscript shell"
+    if SPA_MARKER_PATTERN.search(html):
+        return "SPA marker"
+    page = parse_html(html)
+    if any(CONTACT_TEXT_PATTERN.search(text) for text in page.strings):
+        return None
+    if any(attrs.get('href', '').strip().lower().startswith(('mailto:', 'tel:')) for _, attrs in page.anchors):
+        return None
+    return "no contact text"
+
+
+class PageFetcher:
+    def __init__(self, driver_pool=None, http_client=None, timeout=60, page_cache=None, render_javascript=True,
+                 ajax_timeout=10, max_dom_chars=None, host_timeouts=None):
+        self.driver_pool = driver_pool
+        self.http_client = http_client
+        self.timeout = timeout
+        self.ajax_timeout = ajax_timeout
+        self.max_dom_chars = max_dom_chars
+        self.host_timeouts = host_timeouts
+        self.page_cache = page_cache
+        # Without rendering, pages that would be escalated are returned as fetched over HTTP
+        self.render_javascript = render_javascript
+
+    def fetch(self, url):
+        cached_page = self.page_cache.get(url) if self.page_cache is not None else None
+        if cached_page and self.page_cache.is_fresh(cached_page):
+            return FetchResult(cached_page.html, 'cache', None)
+
+        validator_headers = {}
+        if self.http_client:
+            if not validators.url(url):
+                raise InvalidURLException(f"Invalid URL: {url}")
+            if not is_allowed(url):
+                raise AccessDeniedException(f"Access denied by robots.txt: {url}")
+
+            reason = None
+            try:
+                with metrics.timer(stage='crawl_delay'):
+                    robots_cache.wait_for_crawl_delay(url)
+                logging.debug(f"Fetching over HTTP: {url}")
+                headers = self.page_cache.get_conditional_headers(cached_page) if cached_page else None
+                with metrics.timer(stage='http_fetch'):
+                    response = self.http_client.get(url, headers)
+            except Exception as e:
+                metrics.count_error('http_fetch', e)
+                reason = f"HTTP error {type(e).__name__}"
+            else:
+                content_type = response.headers.get('Content-Type', 'text/html').lower()
+                if response.status == 304 and cached_page:
+                    self.page_cache.mark_revalidated(url)
+                    return FetchResult(cached_page.html, 'cache', "revalidated")
+                if response.status in BROWSER_STATUSES:
+                    reason = f"HTTP status {response.status}"
+                elif response.status != 200:
+                    logging.debug(f"HTTP status {response.status}, not escalating: {url}")
+                    return FetchResult(None, 'http', f"HTTP status {response.status}")
+                elif 'html' not in content_type and 'xml' not in content_type:
+                    logging.debug(f"Not an HTML page ({content_type}): {url}")
+                    return FetchResult(None, 'http', f"content type {content_type}")
+                else:
+                    # Kept with a rendered copy too, a 304 later means the source behind it is unchanged
+                    validator_headers = {
+                        'etag': response.headers.get('ETag'),
+                        'last_modified': response.headers.get('Last-Modified'),
+                    }
+                    reason = needs_javascript(response.text)
+                    if reason and response.truncated:
+                        # Chrome would download the whole oversized page again, keep the capped HTTP copy instead
+                        logging.debug(f"Not escalating a page over the response size cap ({reason}): {url}")
+                        return FetchResult(response.text, 'http', f"{reason}, partial: truncated")
+                    if not reason or not self.render_javascript:
+                        self.store(url, response.text, response.url, 'http', validator_headers)
+                        return FetchResult(response.text, 'http', reason)
+            if not self.render_javascript:
+                return FetchResult(None, 'http', reason)
+            logging.debug(f"Escalating to Selenium ({reason}): {url}")
+        else:
+            reason = "HTTP tier disabled"
+
+        # An escalated page was already checked against robots.txt and waited out its crawl delay before the HTTP request
+        html, partial_reason = fetch_html(
+            url, self.timeout, self.driver_pool, self.ajax_timeout, self.max_dom_chars, self.host_timeouts,
+            check_robots=not self.http_client,
+        )
+        if partial_reason:
+            # A partial render is still worth extracting from, but not worth caching as the page
+            return FetchResult(html, 'selenium', f"{reason}, partial: {partial_reason}")
+        self.store(url, html, url, 'selenium', validator_headers)
+        return FetchResult(html, 'selenium', reason)
+
+    def store(self, url, html, final_url, tier, validator_headers):
+        if self.page_cache is not None and html:
+            self.page_cache.put(url, html, final_url, tier=tier, **validator_headers)
@@ -0,0 +1,18 @@
+import pytest
+
+from benchmarks.fixture_server import build_fixture_sites
+from src.data_processing import configure_email_validation
+
+
+@pytest.fixture(autouse=True)
+def offline_email_validation():
+    # The default 'full' mode looks up every email domain in DNS, tests validate syntax only
+    configure_email_validation('syntax')
+    yield
+    configure_email_validation()
+
+
+@pytest.fixture(scope='session')
+def fixture_pages():
+    # Every page of the crawl benchmark's fixture sites, built once for the tests comparing extraction paths
+    return [page for site in build_fixture_sites(70)[0] for page in site.pages.values()]
@@ -0,0 +1,56 @@
+import os
+
+from src.checkpoint import Checkpointer, load_checkpoint, write_checkpoint
+from src.contact_information_web_scraper import URLProcessingManager
+
+URLS = [f"http://example.com/page{index}" for index in range(4)]
+
+
+def drain(manager):
+    urls = []
+    while manager.queued_count:
+        url = manager.get_next_url()
+        urls.append(url)
+        manager.increment_processed(url)
+    return urls
+
+
+def test_resume_requeues_in_flight_urls_and_skips_processed_ones(tmp_path):
+    filepath = str(tmp_path / 'checkpoint.json.gz')
+    manager = URLProcessingManager(URLS, max_per_host=10, min_host_delay=0.0)
+    processed = manager.get_next_url()
+    manager.increment_processed(processed)
+    in_flight = manager.get_next_url()
+    write_checkpoint(filepath, {'manager': manager.snapshot(), 'written_at': 0})
+
+    state = load_checkpoint(filepath)
+    resumed = URLProcessingManager.from_checkpoint(state['manager'], max_per_host=10, min_host_delay=0.0)
+    assert (resumed.processed_count, resumed.total_count, resumed.queued_count) == (1, 4, 3)
+    # Seen URLs are not queued again when a page links to them
+    resumed.add_urls([processed, in_flight])
+    assert resumed.queued_count == 3
+    urls = drain(resumed)
+    assert urls[0] == in_flight
+    assert sorted(urls) == sorted(set(URLS) - {processed})
+    assert resumed.processed_count == 4
+
+
+def test_missing_or_corrupt_checkpoint_loads_as_none(tmp_path):
+    filepath = str(tmp_path / 'checkpoint.json.gz')
+    assert load_checkpoint(filepath) is None
+    with open(filepath, 'wb') as file:
+        file.write(b'not gzip')
+    assert load_checkpoint(filepath) is None
+
+
+def test_checkpointer_keeps_the_checkpoint_until_the_crawl_completes(tmp_path):
+    filepath = str(tmp_path / 'checkpoint.json.gz')
+    manager = URLProcessingManager(URLS, min_host_delay=0.0)
+    checkpointer = Checkpointer(filepath, manager, extra_state={'csv_filepath': 'contacts.csv'}, interval=60)
+    checkpointer.stop()
+    state = load_checkpoint(filepath)
+    assert state['csv_filepath'] == 'contacts.csv'
+    assert state['manager']['total_count'] == 4
+
+    checkpointer.stop(completed=True)
+    assert not os.path.exists(filepath)
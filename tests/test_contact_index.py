@@ -0,0 +1,57 @@
+import pandas as pd
+
+from src.contact_index import ContactIndex
+from src.contact_store import CONTACT_COLUMNS
+
+
+def contact_rows(*contacts):
+    return pd.DataFrame([{column: contact.get(column) for column in CONTACT_COLUMNS} for contact in contacts])
+
+
+def read_sources(index):
+    return sorted(index.connection.execute("SELECT key, source FROM contact_sources").fetchall())
+
+
+def test_phone_only_contact_joins_its_email_record(tmp_path):
+    index = ContactIndex(str(tmp_path / 'index.sqlite'))
+    stats = index.merge(contact_rows({'phone': '3615550100', 'first_name': 'Bob', 'source': 'http://a.example.com/'}))
+    assert stats == {'new': 1, 'updated': 0, 'unchanged': 0}
+
+    stats = index.merge(contact_rows({'phone': '3615550100', 'email': 'bob@example.com', 'source': 'http://b.example.com/'}))
+    assert stats == {'new': 0, 'updated': 1, 'unchanged': 0}
+    contacts = index.read_contacts()
+    assert len(contacts) == 1
+    assert contacts.loc[0, ['email', 'phone', 'first_name']].tolist() == ['bob@example.com', '3615550100', 'Bob']
+
+    # Either key finds the record afterwards
+    stats = index.merge(contact_rows({'email': 'bob@example.com', 'source': 'http://c.example.com/'}))
+    assert stats == {'new': 0, 'updated': 0, 'unchanged': 1}
+    assert [source for _, source in read_sources(index)] == [
+        'http://a.example.com/', 'http://b.example.com/', 'http://c.example.com/',
+    ]
+    index.close()
+
+
+def test_phone_only_record_is_folded_into_a_separate_email_record(tmp_path):
+    index = ContactIndex(str(tmp_path / 'index.sqlite'))
+    index.merge(contact_rows(
+        {'phone': '3615550100', 'source': 'http://a.example.com/'},
+        {'email': 'bob@example.com', 'first_name': 'Bob', 'source': 'http://b.example.com/'},
+    ))
+    assert index.stats()['contacts'] == 2
+    index.merge(contact_rows({'phone': '3615550100', 'email': 'bob@example.com', 'source': 'http://c.example.com/'}))
+    contacts = index.read_contacts()
+    assert len(contacts) == 1
+    assert contacts.loc[0, ['email', 'phone', 'first_name']].tolist() == ['bob@example.com', '3615550100', 'Bob']
+    assert {key for key, _ in read_sources(index)} == {'bob@example.com'}
+    index.close()
+
+
+def test_shared_phone_keeps_different_emails_apart(tmp_path):
+    index = ContactIndex(str(tmp_path / 'index.sqlite'))
+    index.merge(contact_rows(
+        {'phone': '3615550100', 'email': 'bob@example.com', 'source': 'http://a.example.com/'},
+        {'phone': '3615550100', 'email': 'ann@example.com', 'source': 'http://a.example.com/'},
+    ))
+    assert sorted(index.read_contacts()['email']) == ['ann@example.com', 'bob@example.com']
+    index.close()
@@ -0,0 +1,75 @@
+import pytest
+
+from src import email_validation
+from src.email_validation import DomainDeliverabilityCache, EmailStandardizer
+
+
+class StubResolver:
+    # Answers deliverability from a fixed set of domains and counts lookups
+    def __init__(self, deliverable, failing=()):
+        self.deliverable = deliverable
+        self.failing = failing
+        self.lookups = []
+
+    def __call__(self, domain, timeout=5):
+        self.lookups.append(domain)
+        if domain in self.failing:
+            raise OSError("no nameservers")
+        return domain in self.deliverable
+
+
+def test_cached_mode_looks_up_each_domain_once():
+    resolver = StubResolver({'example.com'})
+    standardizer = EmailStandardizer('cached', DomainDeliverabilityCache(resolver=resolver))
+    assert standardizer.standardize('Bob@Example.com') == 'Bob@example.com'
+    assert standardizer.standardize('ann@example.com') == 'ann@example.com'
+    assert standardizer.standardize('bob@nomail.example') == ''
+    assert standardizer.standardize('ann@nomail.example') == ''
+    assert resolver.lookups == ['example.com', 'nomail.example']
+    assert standardizer.stats['undeliverable'] == 2
+
+
+def test_cached_mode_keeps_emails_when_lookups_fail():
+    resolver = StubResolver(set(), failing={'example.com'})
+    cache = DomainDeliverabilityCache(resolver=resolver)
+    standardizer = EmailStandardizer('cached', cache)
+    assert standardizer.standardize('bob@example.com') == 'bob@example.com'
+    assert standardizer.standardize('ann@example.com') == 'ann@example.com'
+    # A failed lookup is not retried until error_ttl passes
+    assert resolver.lookups == ['example.com']
+    assert cache.stats['errors'] == 1
+
+
+def test_cached_domains_persist(tmp_path):
+    filepath = str(tmp_path / 'email_domains.json')
+    cache = DomainDeliverabilityCache(filepath, resolver=StubResolver({'example.com'}))
+    assert cache.is_deliverable('example.com')
+    cache.save()
+    resolver = StubResolver(set())
+    assert DomainDeliverabilityCache(filepath, resolver=resolver).is_deliverable('example.com')
+    assert resolver.lookups == []
+
+
+def test_full_mode_checks_every_email(monkeypatch):
+    lookups = []
+
+    def validate_email(email, check_deliverability):
+        lookups.append((email, check_deliverability))
+        if email.endswith('@nomail.example'):
+            raise email_validation.EmailUndeliverableError("The domain name nomail.example does not accept email.")
+        return real_validate_email(email, check_deliverability=False)
+
+    real_validate_email = email_validation.validate_email
+    monkeypatch.setattr(email_validation, 'validate_email', validate_email)
+    standardizer = EmailStandardizer()
+    assert standardizer.mode == 'full'
+    assert standardizer.standardize('bob@example.com') == 'bob@example.com'
+    assert standardizer.standardize('ann@example.com') == 'ann@example.com'
+    assert standardizer.standardize('bob@nomail.example') == ''
+    assert lookups == [('bob@example.com', True), ('ann@example.com', True), ('bob@nomail.example', True)]
+    assert standardizer.stats['invalid'] == 1
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        EmailStandardizer('dns')
@@ -0,0 +1,36 @@
+from src.data_processing import proximity_based_extraction
+from src.html_parser import ParsedPage, parse_html
+
+
+def extract(strings, blocks):
+    return [
+        (contact['salutation'], contact['first_name'], contact['last_name'], contact['email'], contact['phone'])
+        for contact in proximity_based_extraction(ParsedPage(strings, blocks, []), 'http://example.com/')
+    ]
+
+
+def test_name_and_phone_spanning_strings():
+    strings = ['Capt.', 'John', 'Smith', 'john@example.com', '(361)', '555-0100']
+    assert extract(strings, [(0, 6)]) == [('Capt.', 'John', 'Smith', 'john@example.com', '(361) 555-0100')]
+
+
+def test_block_end_cuts_a_match_short():
+    strings = ['john@example.com', 'Capt. John', 'Smith', 'and more']
+    # The inner block ends before the last name, and without whitespace after the first name there is no match
+    assert extract(strings, [(0, 2)]) == []
+    assert extract(strings, [(0, 3)]) == [('Capt.', 'John', 'Smith', 'john@example.com', '')]
+    assert extract(strings, [(0, 4), (0, 3)]) == [('Capt.', 'John', 'Smith', 'john@example.com', '')]
+
+
+def test_each_block_uses_its_own_first_matches():
+    strings = ['Mr. Bob Jones', 'bob@example.com', 'Ms. Kim Lee', 'kim@example.com', '(361) 555-0100']
+    assert extract(strings, [(0, 5), (2, 5)]) == [
+        ('Mr.', 'Bob', 'Jones', 'bob@example.com', '(361) 555-0100'),
+        ('Ms.', 'Kim', 'Lee', 'kim@example.com', '(361) 555-0100'),
+    ]
+
+
+def test_deeply_nested_page():
+    depth = 500
+    html = '<div><p>Trip notes</p>' * depth + '<p>Capt. John Smith john@example.com (361) 555-0100</p>' + '</div>' * depth
+    assert extract(*parse_html(html)[:2]) == [('Capt.', 'John', 'Smith', 'john@example.com', '(361) 555-0100')]
@@ -0,0 +1,111 @@
+import threading
+
+import pytest
+
+from src.frontier import FrontierBackend, RedisFrontier, SQLiteFrontier
+
+
+@pytest.fixture(params=['sqlite', 'redis'])
+def frontier(request, tmp_path):
+    if request.param == 'sqlite':
+        backend = SQLiteFrontier(str(tmp_path / 'frontier.sqlite'), 'job')
+    else:
+        fakeredis = pytest.importorskip('fakeredis')
+        backend = RedisFrontier(fakeredis.FakeRedis(), 'job')
+    yield backend
+    backend.close()
+
+
+def test_backend_is_abstract():
+    with pytest.raises(TypeError):
+        FrontierBackend()
+
+
+def test_push_dedup(frontier):
+    assert frontier.push('http://a.com/', 1.0)
+    assert not frontier.push('http://a.com/', 5.0)
+    assert frontier.push_many([('http://b.com/', 1.0, 1), ('http://a.com/', 1.0, 0), ('http://c.com/', 2.0, 1)]) == [True, False, True]
+    assert frontier.counts()['queued'] == 3
+    assert frontier.counts()['seen'] == 3
+
+
+def test_lease_best_score_first(frontier):
+    frontier.push_many([('http://a.com/', 1.0, 0), ('http://b.com/', 3.0, 2), ('http://c.com/', 2.0, 1)])
+    leased = frontier.lease('worker', 2, 60)
+    assert [(entry.url, entry.score, entry.depth) for entry in leased] == [('http://b.com/', 3.0, 2), ('http://c.com/', 2.0, 1)]
+    assert [entry.url for entry in frontier.lease('other', 5, 60)] == ['http://a.com/']
+    assert frontier.lease('other', 5, 60) == []
+    assert frontier.counts()['leased'] == 3
+
+
+def test_expired_lease_is_requeued(frontier):
+    frontier.push('http://a.com/', 1.0)
+    assert [entry.url for entry in frontier.lease('crashed', 1, -1)] == ['http://a.com/']
+    assert [entry.url for entry in frontier.lease('worker', 1, 60)] == ['http://a.com/']
+    assert frontier.lease('other', 1, 60) == []
+
+
+def test_ack_and_release(frontier):
+    frontier.push_many([('http://a.com/', 2.0, 0), ('http://b.com/', 1.0, 0)])
+    first, second = frontier.lease('worker', 2, 60)
+    frontier.ack(first.url)
+    frontier.release([second.url])
+    assert frontier.counts() == {'queued': 1, 'leased': 0, 'done': 1, 'seen': 2}
+    assert [entry.url for entry in frontier.lease('worker', 2, 60)] == [second.url]
+    assert not frontier.push(first.url)
+    assert not frontier.is_drained()
+    frontier.ack(second.url)
+    assert frontier.is_drained()
+
+
+def test_claim_task(frontier):
+    assert frontier.claim_task('search', 'first', 60)
+    assert not frontier.claim_task('search', 'second', 60)
+    assert frontier.claim_task('search', 'first', 60)
+    assert not frontier.is_drained()
+    frontier.finish_task('search')
+    assert not frontier.claim_task('search', 'first', 60)
+    assert frontier.is_drained()
+
+
+def test_expired_task_claim_is_taken_over(frontier):
+    assert frontier.claim_task('search', 'crashed', -1)
+    assert frontier.claim_task('search', 'second', 60)
+    assert not frontier.claim_task('search', 'crashed', 60)
+
+
+def test_redis_push_failing_part_way_leaves_nothing(monkeypatch):
+    fakeredis = pytest.importorskip('fakeredis')
+    frontier = RedisFrontier(fakeredis.FakeRedis(), 'job')
+
+    def zadd(*args, **kwargs):
+        raise ConnectionError("worker died")
+
+    # Fails while queueing the queue write, after the seen set write was queued
+    pipeline_class = type(frontier.client.pipeline())
+    with monkeypatch.context() as patch:
+        patch.setattr(pipeline_class, 'zadd', zadd)
+        with pytest.raises(ConnectionError):
+            frontier.push('http://a.com/')
+    assert frontier.counts()['seen'] == 0
+    assert frontier.push('http://a.com/')
+    assert frontier.counts()['queued'] == 1
+
+
+def test_concurrent_leases_never_share_a_url(frontier):
+    frontier.push_many([(f"http://site{index}.com/", float(index), 0) for index in range(200)])
+    leased = []
+
+    def lease_all():
+        while True:
+            batch = frontier.lease(threading.current_thread().name, 7, 60)
+            if not batch:
+                return
+            leased.extend(entry.url for entry in batch)
+
+    workers = [threading.Thread(target=lease_all) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    assert sorted(leased) == sorted(f"http://site{index}.com/" for index in range(200))
@@ -0,0 +1,64 @@
+import time
+
+from src.contact_information_web_scraper import URLProcessingManager
+
+
+def host_urls(host, count):
+    return [f"http://{host}/page{index}" for index in range(count)]
+
+
+def dispatch_all(manager):
+    # Every URL that can be dispatched right now, without marking any as processed
+    urls = []
+    url = manager.get_next_url()
+    while url:
+        urls.append(url)
+        url = manager.get_next_url()
+    return urls
+
+
+def test_hosts_are_served_round_robin():
+    manager = URLProcessingManager(host_urls('big.example.com', 6) + host_urls('small.example.com', 2),
+                                   max_per_host=10, min_host_delay=0.0)
+    hosts = [manager.get_host(url) for url in dispatch_all(manager)[:4]]
+    assert hosts == ['big.example.com', 'small.example.com'] * 2
+
+
+def test_per_host_concurrency_is_capped():
+    manager = URLProcessingManager(host_urls('example.com', 5) + host_urls('example.org', 5), max_per_host=2, min_host_delay=0.0)
+    urls = dispatch_all(manager)
+    assert sorted(manager.get_host(url) for url in urls) == ['example.com'] * 2 + ['example.org'] * 2
+    # Only a finished page frees its host's slot
+    assert manager.seconds_until_ready() is None
+    manager.increment_processed(urls[0])
+    assert manager.get_host(manager.get_next_url()) == manager.get_host(urls[0])
+
+
+def test_host_delay_spaces_out_requests():
+    delays = {'slow.example.com': 0.2}
+    manager = URLProcessingManager(host_urls('slow.example.com', 2) + host_urls('fast.example.com', 2),
+                                   max_per_host=10, min_host_delay=0.0, crawl_delay_lookup=delays.get)
+    assert [manager.get_host(url) for url in dispatch_all(manager)] == ['slow.example.com', 'fast.example.com', 'fast.example.com']
+    assert 0.1 < manager.seconds_until_ready() <= 0.2
+    time.sleep(manager.seconds_until_ready())
+    assert manager.get_host(manager.get_next_url()) == 'slow.example.com'
+
+
+def test_host_stats_report_queue_depth_and_rate():
+    manager = URLProcessingManager(host_urls('example.com', 3), max_per_host=1, min_host_delay=0.0)
+    url = manager.get_next_url()
+    stats = manager.host_stats()['example.com']
+    assert (stats['queued'], stats['active'], stats['dispatched']) == (2, 1, 1)
+    manager.increment_processed(url)
+    assert manager.host_stats()['example.com']['active'] == 0
+
+
+def test_max_pages_per_host_drops_the_rest_of_the_host():
+    manager = URLProcessingManager(host_urls('example.com', 5) + host_urls('example.org', 1),
+                                   max_per_host=10, min_host_delay=0.0, max_pages_per_host=2)
+    urls = dispatch_all(manager)
+    assert sorted(manager.get_host(url) for url in urls) == ['example.com'] * 2 + ['example.org']
+    assert manager.skipped['max_pages_per_host'] == 3
+    # Links found later on the host are not queued either
+    manager.add_urls(['http://example.com/late'])
+    assert manager.get_next_url() is None
@@ -0,0 +1,57 @@
+import random
+
+from src.contact_information_web_scraper import URLProcessingManager, get_contact_info_from_urls_pipelined
+from src.metrics import Reservoir, metrics
+
+
+def test_reservoir_keeps_exact_count_and_mean_in_fixed_memory():
+    reservoir = Reservoir(size=100)
+    for value in range(10000):
+        reservoir.observe(value)
+    assert len(reservoir.values) == 100
+    assert reservoir.count == 10000
+    assert reservoir.mean() == 4999.5
+
+
+def test_reservoir_percentiles_track_the_full_distribution():
+    random.seed(0)
+    reservoir = Reservoir(size=1000)
+    for value in range(100000):
+        reservoir.observe(value / 100000)
+    percentiles = reservoir.percentiles((50, 99))
+    assert abs(percentiles[50] - 0.5) < 0.05
+    assert abs(percentiles[99] - 0.99) < 0.01
+
+
+def test_manager_latency_stats_are_bounded():
+    manager = URLProcessingManager([])
+    for _ in range(20000):
+        manager.record_latency('fetch', 0.1)
+    assert len(manager.latencies['fetch'].values) <= Reservoir().size
+    assert manager.latency_stats()['fetch'] == {'count': 20000, 'p50': 0.1, 'p99': 0.1}
+    assert abs(manager.mean_latency('fetch') - 0.1) < 1e-9
+    assert manager.mean_latency('extract') == 0.0
+
+
+class StubFetcher:
+    def __init__(self, pages):
+        self.pages = pages
+
+    def fetch(self, url):
+        return self.pages.get(url), 'http', None
+
+
+def test_extract_process_timings_reach_the_parent_registry():
+    pages = {'http://example.com/': '<p>Capt. John Smith john@example.com (361) 555-0100</p>'}
+    metrics.reset()
+    metrics.enabled = True
+    try:
+        manager = URLProcessingManager(list(pages), min_host_delay=0.0)
+        contacts = get_contact_info_from_urls_pipelined(1, 1, manager, StubFetcher(pages))
+        snapshot = metrics.snapshot()['histograms']
+    finally:
+        metrics.enabled = False
+        metrics.reset()
+    assert [contact['email'] for contact in contacts] == ['john@example.com']
+    assert snapshot['stage_seconds{stage="parse"}']['count'] == 1
+    assert snapshot['stage_seconds{stage="extraction"}']['count'] == 1
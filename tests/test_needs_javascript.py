@@ -0,0 +1,87 @@
+import pytest
+
+from src import web_interface
+from src.web_interface import HttpResponse, PageFetcher, get_page_source, needs_javascript
+
+NAV = '<nav><a href="/contact">Contact</a></nav>'
+
+
+def test_static_page_with_contact_text():
+    assert needs_javascript(f"<html><body>{NAV}<p>Call (361) 555-0100</p></body></html>") is None
+    assert needs_javascript('<html><body><a href="mailto:bob@example.com">Email Bob</a></body></html>') is None
+
+
+def test_spa_shell_with_contact_menu_is_escalated():
+    assert needs_javascript(f'<html><body>{NAV}<div id="root"></div><script src="/app.js"></script></body></html>') == "SPA marker"
+
+
+def test_noscript_shell_with_contact_menu_is_escalated():
+    html = f"<html><body>{NAV}<noscript>You need to enable JavaScript to run this app.</noscript></body></html>"
+    assert needs_javascript(html) == "noscript shell"
+
+
+def test_contact_text_hidden_in_markup_does_not_count():
+    html = (
+        '<html><body><div class="contact-form"></div><!-- contact info@example.com -->'
+        '<script>var contact = "info@example.com";</script><p>Fishing trips</p></body></html>'
+    )
+    assert needs_javascript(html) == "no contact text"
+
+
+class StubHttpClient:
+    def __init__(self, status, text='', truncated=False):
+        self.response = HttpResponse(status, 'http://example.com/', {'Content-Type': 'text/html'}, text, truncated)
+
+    def get(self, url, headers=None):
+        return self.response
+
+
+@pytest.fixture
+def escalations(monkeypatch):
+    # Robots checks pass at once and Selenium is replaced by a recorder
+    escalated = []
+    monkeypatch.setattr(web_interface, 'is_allowed', lambda url: True)
+    monkeypatch.setattr(web_interface.robots_cache, 'wait_for_crawl_delay', lambda url: None)
+    monkeypatch.setattr(web_interface, 'fetch_html', lambda url, *args, **kwargs: escalated.append(url) or ('<p>rendered</p>', None))
+    return escalated
+
+
+@pytest.mark.parametrize('status', [404, 410, 500, 503])
+def test_statuses_a_browser_cannot_fix_are_not_escalated(status, escalations):
+    result = PageFetcher(http_client=StubHttpClient(status)).fetch('http://example.com/')
+    assert result == (None, 'http', f"HTTP status {status}")
+    assert escalations == []
+
+
+@pytest.mark.parametrize('status', [403, 429])
+def test_bot_walls_are_escalated(status, escalations):
+    result = PageFetcher(http_client=StubHttpClient(status)).fetch('http://example.com/')
+    assert result == ('<p>rendered</p>', 'selenium', f"HTTP status {status}")
+    assert escalations == ['http://example.com/']
+
+
+def test_javascript_shell_is_escalated(escalations):
+    shell = '<html><body><div id="root"></div></body></html>'
+    result = PageFetcher(http_client=StubHttpClient(200, shell)).fetch('http://example.com/')
+    assert result.tier == 'selenium'
+    assert escalations == ['http://example.com/']
+
+
+def test_truncated_shell_is_not_downloaded_again(escalations):
+    shell = '<html><body><div id="root"></div>'
+    result = PageFetcher(http_client=StubHttpClient(200, shell, truncated=True)).fetch('http://example.com/')
+    assert result == (shell, 'http', "SPA marker, partial: truncated")
+    assert escalations == []
+
+
+class StubDriver:
+    page_source = '<html><body>' + 'x' * 100 + '</body></html>'
+
+    def execute_script(self, script, max_dom_chars):
+        return [len(self.page_source), self.page_source[:max_dom_chars]]
+
+
+def test_rendered_dom_is_capped_in_characters():
+    assert get_page_source(StubDriver()) == (StubDriver.page_source, False)
+    assert get_page_source(StubDriver(), 20) == (StubDriver.page_source[:20], True)
+    assert get_page_source(StubDriver(), 1000) == (StubDriver.page_source, False)
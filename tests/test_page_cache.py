@@ -0,0 +1,68 @@
+import pytest
+
+from src import web_interface
+from src.contact_information_web_scraper import URLProcessingManager, replay_cached_pages
+from src.page_cache import PageCache
+from src.web_interface import HttpResponse, PageFetcher
+
+URL = 'http://example.com/contact'
+PAGE = '<html><body><p>Capt. John Smith john@example.com (361) 555-0100</p></body></html>'
+
+
+class RecordingHttpClient:
+    # Serves the page with validators the first time and 304 Not Modified once asked conditionally
+    def __init__(self):
+        self.requests = []
+
+    def get(self, url, headers=None):
+        self.requests.append(headers)
+        if headers and headers.get('If-None-Match') == '"v1"':
+            return HttpResponse(304, url, {}, '', False)
+        headers = {'Content-Type': 'text/html', 'ETag': '"v1"', 'Last-Modified': 'Mon, 05 Oct 2026 10:00:00 GMT'}
+        return HttpResponse(200, url, headers, PAGE, False)
+
+
+@pytest.fixture
+def page_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(web_interface, 'is_allowed', lambda url: True)
+    monkeypatch.setattr(web_interface.robots_cache, 'wait_for_crawl_delay', lambda url: None)
+    page_cache = PageCache(str(tmp_path / 'pages'))
+    yield page_cache
+    page_cache.close()
+
+
+def test_cached_page_is_revalidated_with_a_conditional_get(page_cache):
+    http_client = RecordingHttpClient()
+    fetcher = PageFetcher(http_client=http_client, page_cache=page_cache)
+    assert fetcher.fetch(URL) == (PAGE, 'http', None)
+    assert fetcher.fetch(URL) == (PAGE, 'cache', "revalidated")
+    assert http_client.requests == [
+        None, {'If-None-Match': '"v1"', 'If-Modified-Since': 'Mon, 05 Oct 2026 10:00:00 GMT'},
+    ]
+    assert page_cache.stats['revalidated'] == 1
+
+
+def test_fresh_page_is_served_without_a_request(page_cache):
+    page_cache.max_age = 60
+    http_client = RecordingHttpClient()
+    fetcher = PageFetcher(http_client=http_client, page_cache=page_cache)
+    fetcher.fetch(URL)
+    assert fetcher.fetch(URL) == (PAGE, 'cache', None)
+    assert len(http_client.requests) == 1
+
+
+def test_identical_bodies_are_stored_once(page_cache):
+    page_cache.put(URL, PAGE)
+    page_cache.put('http://example.com/about', PAGE)
+    assert len(page_cache) == 2
+    assert page_cache.connection.execute("SELECT COUNT(*) FROM bodies").fetchone()[0] == 1
+
+
+def test_replay_extracts_from_cached_pages_without_fetching(page_cache):
+    page_cache.put(URL, PAGE, tier='http')
+    page_cache.put('http://example.com/about', '<html><body><p>Fishing trips</p></body></html>', tier='http')
+    manager = URLProcessingManager([])
+    contacts = replay_cached_pages(page_cache, manager)
+    assert [(contact['email'], contact['source']) for contact in contacts] == [('john@example.com', URL)]
+    assert manager.processed_count == 2
+    assert manager.tier_counts['cache'] == 2
@@ -0,0 +1,31 @@
+from src import page_memory
+from src.page_memory import PageMemoryTracker, PageStats, measured
+
+
+def test_growth_is_measured_from_current_rss():
+    rss_before = page_memory.get_rss_bytes()
+    assert rss_before is not None
+    data, _, growth = measured(lambda: bytearray(64 * 1024 * 1024))
+    assert growth >= 32 * 1024 * 1024
+    assert len(data) == 64 * 1024 * 1024
+
+
+def test_growth_is_none_without_current_rss(monkeypatch):
+    monkeypatch.setattr(page_memory, 'get_rss_bytes', lambda: None)
+    result, _, growth = measured(lambda: 'page')
+    assert (result, growth) == ('page', None)
+    tracker = PageMemoryTracker(warn_bytes=1)
+    tracker.record('http://example.com/', PageStats('full', 0.1, 100, None))
+    assert tracker.worst_pages() == []
+    tracker.log_stats()
+
+
+def test_peak_rss_units(monkeypatch):
+    class Usage:
+        ru_maxrss = 2048
+
+    monkeypatch.setattr(page_memory.resource, 'getrusage', lambda who: Usage())
+    monkeypatch.setattr(page_memory.sys, 'platform', 'linux')
+    assert page_memory.get_peak_rss_bytes() == 2048 * 1024
+    monkeypatch.setattr(page_memory.sys, 'platform', 'darwin')
+    assert page_memory.get_peak_rss_bytes() == 2048
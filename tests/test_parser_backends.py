@@ -0,0 +1,13 @@
+import pytest
+
+from benchmarks.corpus import random_corpus
+from benchmarks.parser_backends import compare_parser_backends
+from src.html_parser import get_available_backends
+
+
+@pytest.mark.parametrize('backend', [backend for backend in get_available_backends() if backend != 'html.parser'])
+@pytest.mark.parametrize('corpus', ['synthetic', 'fixture'])
+def test_backend_finds_the_same_contacts_and_links(backend, corpus, fixture_pages):
+    pages = random_corpus(200) if corpus == 'synthetic' else fixture_pages
+    report = compare_parser_backends(pages, [backend])
+    assert report[backend]['mismatched_pages'] == []
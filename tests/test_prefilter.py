@@ -0,0 +1,44 @@
+import pytest
+
+from benchmarks.corpus import random_corpus
+from benchmarks.prefilter import compare_prefilter
+from src.data_processing import extract_page, has_contact_signals
+from src.html_parser import get_available_backends
+
+
+def test_prefilter_finds_the_same_contacts_on_the_fixture_corpus(fixture_pages):
+    pages = fixture_pages
+    report = compare_prefilter(pages)
+    assert report['mismatched_pages'] == []
+    # The corpus has pages for the prefilter to skip and pages with contacts it must not skip
+    assert 0 < report['links_only'] < report['pages']
+    assert any(extract_page(page, 'http://example.com/', 'html.parser', True)[0] for page in pages)
+
+
+def test_prefilter_finds_the_same_contacts_on_the_synthetic_corpus():
+    report = compare_prefilter(random_corpus(200))
+    assert report['mismatched_pages'] == []
+
+
+@pytest.mark.parametrize('backend', get_available_backends())
+@pytest.mark.parametrize('html', [
+    # Numeric references parsers decode without the ';'
+    '<div>Capt&#46 John Smith a@b.com</div>',
+    '<div>Capt&#x2e John Smith a@b.com</div>',
+    "<div>Cap&#39n John Smith a@b.com</div>",
+    '<div>Capt. John Smith a&#64b.com</div>',
+    '<div>Capt. John Smith a&#x40b.com</div>',
+    # Hidden-content tags inside attribute values are not tags
+    '<div title="<script>">Capt. John Smith a@b.com</div><script>var a = 1</script>',
+    "<div data-css='<style>'>Capt. John Smith a@b.com</div><style>p {}</style>",
+    '<div title="<!--">Capt. John Smith a@b.com</div><!-- -->',
+    '<p>Capt. John Smith a@b.com</p><script>x</script >',
+])
+def test_prefilter_keeps_contacts_on_malformed_markup(html, backend):
+    expected = extract_page(html, 'http://example.com/', backend, False)[0]
+    assert extract_page(html, 'http://example.com/', backend, True)[0] == expected
+
+
+def test_prefilter_skips_signals_only_in_hidden_content():
+    assert not has_contact_signals('<p>Capt. John Smith</p><script>var email = "a@b.com"</script>')
+    assert not has_contact_signals('<p title="<b>">Capt. John Smith</p><!-- a@b.com -->')
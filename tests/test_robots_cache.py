@@ -0,0 +1,119 @@
+import http.server
+import threading
+import time
+
+import pytest
+
+from src.robots_cache import RobotsCache
+
+ROBOTS = ['User-agent: *', 'Disallow: /private', 'Crawl-delay: 2']
+
+
+class CountingRobotsCache(RobotsCache):
+    # Serves fixed rules without the network, slowly enough for concurrent lookups to overlap
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.fetched = []
+
+    def fetch(self, origin):
+        self.fetched.append(origin)
+        time.sleep(0.05)
+        return self.build_entry(f"{origin}/robots.txt", 'ok', ROBOTS, time.time(), self.ttl)
+
+
+def test_rules_are_fetched_once_per_origin():
+    robots_cache = CountingRobotsCache()
+    assert robots_cache.can_fetch('http://example.com/contact')
+    assert not robots_cache.can_fetch('http://example.com/private/page')
+    assert robots_cache.crawl_delay('http://EXAMPLE.com/about') == 2
+    assert robots_cache.can_fetch('https://example.com/contact')
+    assert robots_cache.fetched == ['http://example.com', 'https://example.com']
+    assert robots_cache.peek_crawl_delay('example.com') == 2
+    assert robots_cache.peek_crawl_delay('unknown.example.com') == 0
+
+
+def test_concurrent_lookups_share_one_fetch():
+    robots_cache = CountingRobotsCache()
+    threads = [threading.Thread(target=robots_cache.can_fetch, args=('http://example.com/',)) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert robots_cache.fetched == ['http://example.com']
+    assert robots_cache.stats['misses'] == 1
+
+
+def test_expired_rules_are_fetched_again():
+    robots_cache = CountingRobotsCache(ttl=0)
+    robots_cache.can_fetch('http://example.com/')
+    robots_cache.can_fetch('http://example.com/')
+    assert len(robots_cache.fetched) == 2
+
+
+def test_crawl_delay_slots_are_reserved_per_host():
+    robots_cache = CountingRobotsCache(max_crawl_delay=0.1)
+    robots_cache.can_fetch('http://example.com/')
+    start_time = time.time()
+    for _ in range(3):
+        robots_cache.wait_for_crawl_delay('http://example.com/')
+    assert 0.2 <= time.time() - start_time < 1
+    assert robots_cache.stats['delayed'] == 2
+
+
+def test_saved_rules_load_without_fetching(tmp_path):
+    filepath = str(tmp_path / 'robots.json')
+    robots_cache = CountingRobotsCache()
+    robots_cache.can_fetch('http://example.com/')
+    robots_cache.save(filepath)
+
+    loaded = CountingRobotsCache()
+    loaded.load(filepath)
+    assert not loaded.can_fetch('http://example.com/private')
+    assert loaded.fetched == []
+
+
+class RobotsHandler(http.server.BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(self.server.status)
+        self.end_headers()
+        if self.server.status == 200:
+            self.wfile.write('\n'.join(ROBOTS).encode('utf-8'))
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def robots_server():
+    # Returns the origin of a local server answering every robots.txt request with the given status
+    servers = []
+
+    def start(status):
+        server = http.server.ThreadingHTTPServer(('127.0.0.1', 0), RobotsHandler)
+        server.status = status
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return f"http://127.0.0.1:{server.server_address[1]}"
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+@pytest.mark.parametrize('status, allowed, error', [
+    (200, True, False), (404, True, False), (401, False, False), (403, False, False), (503, False, True),
+])
+def test_fetch_follows_robotparser_status_rules(robots_server, status, allowed, error):
+    robots_cache = RobotsCache(ttl=100, error_ttl=10)
+    origin = robots_server(status)
+    assert robots_cache.can_fetch(f"{origin}/contact") == allowed
+    assert robots_cache.entries[origin]['ttl'] == (10 if error else 100)
+
+
+def test_unreachable_host_is_disallowed_and_retried_sooner():
+    robots_cache = RobotsCache(ttl=100, error_ttl=10, timeout=1)
+    # Nothing listens on port 9 locally, the connection is refused at once
+    assert not robots_cache.can_fetch('http://127.0.0.1:9/contact')
+    assert robots_cache.entries['http://127.0.0.1:9']['ttl'] == 10
+    assert robots_cache.stats['errors'] == 1
@@ -0,0 +1,65 @@
+from src.contact_information_web_scraper import URLProcessingManager, start_search
+from src.search_producer import SearchProducer
+
+
+class StubResultCache:
+    # Every query replays as cached, so no browser is needed
+    def __init__(self, results):
+        self.results = results
+        self.queries = []
+
+    def get(self, query, clicks):
+        self.queries.append(query)
+        return [self.results[query]]
+
+    def put(self, query, clicks, batches):
+        pass
+
+
+RESULTS = {
+    'fishing guides': ['http://a.example.com/', 'http://b.example.com/'],
+    'charter boats': ['http://b.example.com/', 'http://c.example.com/'],
+}
+
+
+def run_search(manager, result_cache, producer_states=None):
+    producer = start_search(list(RESULTS), 0, None, False, manager, result_cache=result_cache, producer_states=producer_states)
+    if producer is not None:
+        producer.join()
+    return producer
+
+
+def test_finished_search_is_not_run_again_on_resume():
+    manager = URLProcessingManager([])
+    run_search(manager, StubResultCache(RESULTS))
+    state = manager.snapshot()
+    assert sorted(state['producers'][0]['finished_queries']) == sorted(RESULTS)
+
+    resumed = URLProcessingManager.from_checkpoint(state)
+    result_cache = StubResultCache(RESULTS)
+    assert run_search(resumed, result_cache, state['producers']) is None
+    assert result_cache.queries == []
+    assert resumed.total_count == manager.total_count == 3
+
+
+def test_unfinished_search_only_runs_the_queries_left():
+    added = []
+    producer = SearchProducer(list(RESULTS), added.extend, result_cache=StubResultCache(RESULTS))
+    producer.run_query('fishing guides')
+    state = producer.snapshot()
+
+    manager = URLProcessingManager([])
+    result_cache = StubResultCache(RESULTS)
+    resumed = run_search(manager, result_cache, [state])
+    assert result_cache.queries == ['charter boats']
+    # URLs the first run already found are not added again
+    assert added == RESULTS['fishing guides']
+    assert manager.total_count == 1
+    assert sorted(resumed.urls) == ['http://a.example.com/', 'http://b.example.com/', 'http://c.example.com/']
+
+
+def test_old_checkpoints_search_again():
+    manager = URLProcessingManager([])
+    result_cache = StubResultCache(RESULTS)
+    run_search(manager, result_cache, None)
+    assert sorted(result_cache.queries) == sorted(RESULTS)
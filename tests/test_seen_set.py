@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from src.seen_set import ExactSeenSet, create_seen_set, load_seen_set
+
+URLS = [f"http://example{index % 7}.com/page{index}" for index in range(3000)]
+UNSEEN = [f"http://example.org/other{index}" for index in range(3000)]
+
+SEEN_SETS = [
+    ('exact', {}),
+    ('fingerprint', {'capacity': 16}),
+    # A small first filter, so the round trip covers more than one filter
+    ('bloom', {'initial_capacity': 500}),
+]
+
+
+@pytest.mark.parametrize('kind, options', SEEN_SETS)
+def test_state_round_trips_through_json(kind, options):
+    seen_set = create_seen_set(kind, **options)
+    assert all(seen_set.add(url) for url in URLS)
+    state = json.loads(json.dumps(seen_set.to_state()))
+
+    loaded = load_seen_set(state)
+    assert loaded.kind == kind
+    assert len(loaded) == len(URLS)
+    assert all(url in loaded for url in URLS)
+    assert not any(loaded.add(url) for url in URLS)
+    assert sum(url in loaded for url in UNSEEN) == 0
+    # The loaded set keeps growing like the original
+    assert loaded.add('http://example.net/new')
+    assert len(loaded) == len(URLS) + 1
+
+
+def test_legacy_url_list_loads_as_exact_set():
+    loaded = load_seen_set(URLS[:10])
+    assert isinstance(loaded, ExactSeenSet)
+    assert all(url in loaded for url in URLS[:10])
+
+
+def test_unknown_kind_is_rejected():
+    with pytest.raises(ValueError):
+        create_seen_set('cuckoo')
@@ -0,0 +1,116 @@
+import multiprocessing
+import time
+
+import pytest
+
+from src.contact_information_web_scraper import SharedURLProcessingManager, get_contact_info_from_urls
+from src.contact_store import ContactSink
+from src.data_processing import clean_contact_store
+from src.frontier import RedisFrontier, SQLiteFrontier
+
+
+class CountingFrontier(SQLiteFrontier):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.leases = 0
+
+    def lease(self, worker_id, count, visibility_timeout):
+        self.leases += 1
+        return super().lease(worker_id, count, visibility_timeout)
+
+
+def make_manager(tmp_path, **kwargs):
+    backend = CountingFrontier(str(tmp_path / 'frontier.sqlite'), 'job')
+    return SharedURLProcessingManager(backend, lease_size=8, min_host_delay=0.0, max_per_host=100, **kwargs), backend
+
+
+def test_refill_waits_for_low_water(tmp_path):
+    manager, backend = make_manager(tmp_path)
+    manager.add_urls([f"http://example.com/page{index}" for index in range(20)])
+    assert manager.get_next_url()
+    assert backend.leases == 1
+    # 7 left locally, above the low-water mark of 2, so no lease until the queue drains that far
+    for _ in range(5):
+        assert manager.get_next_url()
+    assert backend.leases == 1
+    assert manager.get_next_url()
+    assert backend.leases == 2
+
+
+def test_empty_lease_backs_off(tmp_path):
+    manager, backend = make_manager(tmp_path)
+    for _ in range(50):
+        assert manager.get_next_url() is None
+    assert backend.leases == 1
+    manager.next_lease_time = 0.0
+    manager.add_url("http://example.com/")
+    assert manager.get_next_url() == "http://example.com/"
+    assert manager.lease_backoff == 0.0
+
+
+def test_task_of_a_crashed_worker_is_taken_over_before_stopping(tmp_path):
+    manager, backend = make_manager(tmp_path)
+    assert backend.claim_task('search', 'crashed', 0.2)
+    started = []
+    assert manager.run_task('search', lambda: started.append(True)) is None
+    # The claim has not expired yet, so the frontier is not drained and nothing is taken over
+    assert manager.has_queued()
+    assert started == []
+    time.sleep(0.3)
+    assert backend.is_drained()
+    assert manager.has_queued()
+    assert started == [True]
+
+
+URLS = [f"http://site{index % 4}.example.com/page{index}" for index in range(40)]
+
+
+class StubFetcher:
+    def fetch(self, url):
+        index = url.rsplit('page', 1)[1]
+        return f"<p>Capt. John Smith john{index}@example.com</p>", 'http', None
+
+
+def crawl_worker(frontier_filepath, sink_filepath, worker_id):
+    # One worker process of a job: whoever claims the search adds every URL, both crawl from the shared frontier
+    backend = SQLiteFrontier(frontier_filepath, 'job')
+    manager = SharedURLProcessingManager(backend, lease_size=4, min_host_delay=0.0, max_per_host=100, worker_id=worker_id)
+    manager.run_task('search', lambda: manager.add_urls(URLS))
+    sink = backend.create_sink(sink_filepath)
+    get_contact_info_from_urls(2, manager, StubFetcher(), sink=sink)
+    sink.close()
+    backend.close()
+
+
+def test_two_processes_crawl_each_url_once(tmp_path):
+    frontier_filepath, sink_filepath = str(tmp_path / 'frontier.sqlite'), str(tmp_path / 'job.sqlite')
+    context = multiprocessing.get_context('spawn')
+    workers = [context.Process(target=crawl_worker, args=(frontier_filepath, sink_filepath, f"w{index}")) for index in range(2)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(60)
+    assert [worker.exitcode for worker in workers] == [0, 0]
+    backend = SQLiteFrontier(frontier_filepath, 'job')
+    assert backend.counts() == {'queued': 0, 'leased': 0, 'done': 40, 'seen': 40}
+    sink = ContactSink(sink_filepath)
+    assert sink.count_raw() == 40
+    assert len(clean_contact_store(sink)) == 40
+
+
+def test_redis_sink_gathers_every_worker_s_contacts(tmp_path):
+    fakeredis = pytest.importorskip('fakeredis')
+    server = fakeredis.FakeServer()
+    sinks = [RedisFrontier(fakeredis.FakeRedis(server=server), 'job').create_sink(str(tmp_path / f"host{index}.sqlite"))
+             for index in range(2)]
+    sinks[0].write([{'email': 'a@example.com', 'phone': '3615550100', 'source': 'http://a.example.com/'}])
+    sinks[1].write([{'email': 'b@example.com', 'source': 'http://b.example.com/'}])
+    # Nothing is written locally until the exporting worker pulls
+    assert sinks[0].count_raw() == 0
+    assert sinks[0].pull() == 2
+    sinks[1].write([{'email': 'c@example.com', 'source': 'http://c.example.com/'}])
+    assert sinks[0].pull() == 1
+    assert sinks[0].pull() == 0
+    assert sinks[0].count_raw() == 3
+    cleaned = clean_contact_store(sinks[0])
+    assert sorted(cleaned['email']) == ['a@example.com', 'b@example.com', 'c@example.com']